@@ -1,17 +1,37 @@
 import sys
 import os
-import json
 import base64
 import uuid
+import logging
 from PySide6.QtWidgets import (QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QMenu, QTextEdit, QDialog, QCheckBox)
-from PySide6.QtGui import QPainter, QBrush, QColor, QAction
-from PySide6.QtCore import Qt, QPoint, QTimer
+from PySide6.QtGui import QAction
+from PySide6.QtCore import Qt, QPoint, QTimer, QRect
+from CPCore.ImageCache import imageCache
+from CPCore.Settings import load_app_settings
+from CPCore import Overlay
+from CPCore.StyleSheet import styleRegistry, NOTE_QSS
+from CPCore.Binding import bindingHub, BoundLabel
+from CPCore.Scheduler import scheduler
+from CPCore.SystemState import systemState
+from CPCore.NoteSync import NoteSyncer
+from CPCore.NoteStore import NoteFile
+from CPCore.Memory import memoryAccountant, surfaceBytes
+from CPCore import Snapshot, Startup, Log, Profile, Metrics, NoteBatch
+from CPCore.Startup import bootScheduler
+from CPCore.Quality import renderQuality, paintBackground
+from CPCore.ScreenGeometry import screenCache
+from CPCore.NoteStore import loadMeta
+from CPCore.Search import noteIndex, SearchServer
+
+log = logging.getLogger(__name__)
 
 class HtmlWidget(QWidget):
     def __init__(self, config_path, parent=None, manager=None):
         super().__init__(parent)
         self.manager = manager
         self.config_path = config_path
+        self.note = NoteFile(config_path)  # 元数据和正文分开存储
+        self.snapshot_dirty = True  # 外观变化后在下次自动保存时更新开机快照
         self.draggable = True
         self.raw_text = ""
         self.custom_style = ""  # 新增：用于存储自定义样式
@@ -21,31 +41,29 @@ class HtmlWidget(QWidget):
 
     def loadSettings(self):
         if os.path.exists(self.config_path):
-            with open(self.config_path, "r") as f:
-                config = json.load(f)
-                self.move(config["position"]["x"], config["position"]["y"])
-                self.draggable = config.get("draggable", True)
-                self.raw_text = base64.b64decode(config["content"]).decode("utf-8")
-                self.custom_style = config.get("style", "")  # 新增：加载自定义样式
-                self.updateText(self.raw_text)
-                self.applyStyle()  # 新增：应用样式
+            meta, content = self.note.load()
+            Overlay.moveGlobal(self, QPoint(meta["position"]["x"], meta["position"]["y"]))
+            self.draggable = meta.get("draggable", True)
+            self.custom_style = meta.get("style", "")  # 新增：加载自定义样式
+            self.updateText(content)
+            noteIndex().update(self.config_path, content, "html")
+            self.applyStyle()  # 新增：应用样式
 
     def saveSettings(self):
-        config = {
-            "position": {"x": self.pos().x(), "y": self.pos().y()},
+        meta = {
+            "position": {"x": Overlay.globalPos(self).x(), "y": Overlay.globalPos(self).y()},
             "draggable": self.draggable,
-            "content": base64.b64encode(self.raw_text.encode("utf-8")).decode("utf-8"),
             "style": self.custom_style  # 新增：保存自定义样式
         }
-        with open(self.config_path, "w") as f:
-            json.dump(config, f, indent=4)
+        if self.note.save(meta, self.raw_text):  # 没有变化时不写盘
+            noteIndex().update(self.config_path, self.raw_text, "html")
+        if self.snapshot_dirty and self.isVisible():
+            Snapshot.save(self, self.note.snapshotPath())
+            self.snapshot_dirty = False
 
     def applyStyle(self):
-        """应用自定义样式"""
-        if self.custom_style:
-            self.setStyleSheet(self.custom_style)
-        else:
-            self.setStyleSheet("font-family: Microsoft YaHei;")
+        """应用自定义样式，相同的样式在应用级只编译一份"""
+        styleRegistry().apply(self, self.custom_style)
 
     def showSettings(self):
         dialog = QDialog(self)
@@ -88,24 +106,26 @@ class HtmlWidget(QWidget):
         dialog.close()
 
     def initAutoSaveTimer(self):
-        self.auto_save_timer = QTimer(self)
-        self.auto_save_timer.timeout.connect(self.saveSettings)
-        self.auto_save_timer.start(3000)
+        # 由中央调度器统一对齐唤醒，锁屏/关屏/演示时暂停
+        self.auto_save_job = scheduler().register(3000, self.saveSettings, "autosave")
 
     def initUI(self):
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.Tool)
-        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.setStyleSheet("font-family: Microsoft YaHei;")
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, renderQuality().translucent)
+        renderQuality().watch(self)
+        self.setObjectName("note")
+        styleRegistry().addBase(NOTE_QSS)  # 公共样式在应用级只编译一次
 
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(15, 15, 15, 15)
 
-        self.text_label = QLabel(self)
+        self.text_label = BoundLabel(self)  # 绑定数据刷新时只改写变化的几个字
         self.text_label.setWordWrap(True)
         self.text_label.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        self.text_label.setStyleSheet("font-size: 14px; color: black;")
+        self.text_label.setObjectName("noteText")
         self.text_label.mousePressEvent = self.mousePressEvent
         self.text_label.mouseMoveEvent = self.mouseMoveEvent
+        self.text_label.mouseReleaseEvent = self.mouseReleaseEvent
         self.layout.addWidget(self.text_label)
 
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
@@ -114,15 +134,33 @@ class HtmlWidget(QWidget):
         self.drag_position = QPoint()
 
     def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.setBrush(QBrush(QColor(255, 255, 255, 200)))
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawRoundedRect(self.rect(), 15, 15)
+        paintBackground(self, 15)  # 机器跟不上时按渲染等级关闭抗锯齿或透明
+
+    def layoutState(self):
+        """切换配置时据此判断两边的笔记是否完全相同"""
+        return (self.raw_text, Overlay.globalPos(self).toTuple(), self.draggable, self.custom_style)
+
+    def retarget(self, config_path, note=None):
+        """改为对应另一个文件，切换配置时复用小组件"""
+        self.config_path = config_path
+        self.note = note or NoteFile(config_path)
+        self.snapshot_dirty = True
 
     def updateText(self, text):
         self.raw_text = text
-        self.text_label.setText(text)
+        # {{time}}等占位符绑定到共享的刷新中心，图片经进程级缓存解码并共享
+        self.binding = bindingHub().bind(self, text)
+        self.snapshot_dirty = True
+        self.rendered_html = imageCache().prepareLabel(self.text_label, self.binding.skeleton)
+        self.text_label.setContent(self.rendered_html, self.binding)
+        self.fitText()
+
+    def renderBinding(self):
+        """数据变化时由BindingHub调用，只改写变化的占位符；文字的宽度和高度不变时不重新计算窗口大小"""
+        if self.text_label.setValues(self.binding.values):
+            self.fitText()
+
+    def fitText(self):
         self.adjustSize()
         self.resize(min(self.width(), 800), self.height())
 
@@ -149,78 +187,292 @@ class HtmlWidget(QWidget):
     def refreshWidget(self):
         """刷新小组件，重新加载配置并更新显示内容"""
         if os.path.exists(self.config_path):
-            with open(self.config_path, "r") as f:
-                config = json.load(f)
-                self.move(config["position"]["x"], config["position"]["y"])
-                self.draggable = config.get("draggable", True)
-                self.raw_text = base64.b64decode(config["content"]).decode("utf-8")
-                self.updateText(self.raw_text)
+            meta, content = self.note.load()
+            Overlay.moveGlobal(self, QPoint(meta["position"]["x"], meta["position"]["y"]))
+            self.draggable = meta.get("draggable", True)
+            self.custom_style = meta.get("style", "")
+            self.updateText(content)
+            noteIndex().update(self.config_path, content, "html")
+            self.applyStyle()
         else:
             self.close()  # 如果配置文件不存在，关闭小组件
 
     def createNewWidget(self):
-        config_path = os.path.join("data/note/html", f"{uuid.uuid4()}.json")
-        default_config = {
-            "position": {"x": 100, "y": 100},
-            "draggable": True,
-            "content": base64.b64encode("<h1>Hello World!</h1>".encode("utf-8")).decode("utf-8")
-        }
-        with open(config_path, "w") as f:
-            json.dump(default_config, f, indent=4)
+        config_path = os.path.join(self.manager.note_dir, f"{uuid.uuid4()}.json")
+        NoteFile(config_path).save({"position": {"x": 100, "y": 100}, "draggable": True}, "<h1>Hello World!</h1>")
 
         new_widget = HtmlWidget(config_path, manager=self.manager)
+        self.manager.hostWidget(new_widget)
         self.manager.widgets.append(new_widget)
         new_widget.show()
 
     def deleteWidget(self):
         """删除小组件及其配置文件"""
-        if os.path.exists(self.config_path):
-            os.remove(self.config_path)
-        self.auto_save_timer.stop()
+        self.note.delete()
+        noteIndex().remove(self.config_path)
+        scheduler().unregister(self.auto_save_job)
+        bindingHub().unbind(self)
+        styleRegistry().apply(self, "")
         self.close()
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton and self.draggable:
-            self.drag_position = event.globalPosition().toPoint() - self.frameGeometry().topLeft()
+            self.drag_position = event.globalPosition().toPoint() - Overlay.globalPos(self)
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
         if event.buttons() == Qt.MouseButton.LeftButton and self.draggable:
-            self.move(event.globalPosition().toPoint() - self.drag_position)
+            Overlay.moveGlobal(self, event.globalPosition().toPoint() - self.drag_position)
         super().mouseMoveEvent(event)
 
+    def mouseReleaseEvent(self, event):
+        Overlay.settle(self)
+        super().mouseReleaseEvent(event)
+
 class HtmlWidgetManager:
-    def __init__(self):
+    def __init__(self, snapshots=None):
         self.widgets = []
-        self.first_run = not os.path.exists("data/note/html")
+        self.snapshots = snapshots  # 开机快照层，小组件显示后逐个替换
+        # 锁屏、关屏、全屏演示时挂起自动保存等非必要任务，考试模式下连重绘也停掉
+        systemState().examChanged.connect(self.pauseRendering)
+        # 单窗口合成模式下所有小组件挂在每块屏幕一个的透明宿主窗口上
+        app_settings = load_app_settings()
+        self.overlay_mode = app_settings.get("overlay_mode_enabled", False)
+        # 每位老师一套笔记和快速启动栏设置，切换时就地替换，其他配置在空闲时预载并隐藏
+        self.profile = Profile.current()
+        self.note_dir = Profile.noteDir("html", self.profile)
+        self.preloaded = {}  # 配置 -> 隐藏着的小组件
+        self.first_run = not os.path.exists(self.note_dir)
         self.initUI()
+        # 从共享文件夹或局域网HTTP源增量同步笔记，运行中直接应用
+        sync_settings = app_settings.get("note_sync", {})
+        if sync_settings.get("enabled", False):
+            bootScheduler().defer(lambda: self.startSync(sync_settings), "note-sync")
+        # 记账：小组件的窗口缓冲区和正文；回收时销毁已经关闭的小组件
+        memoryAccountant().register("html-notes", self.memoryUsage, self.releaseHidden)
+        bootScheduler().defer(lambda: memoryAccountant().start("htmlwidget"), "memory")
+        # 全文索引：加载和保存时增量更新，开机时积压到空闲再分词；快速启动栏通过本地套接字查询
+        self.search_server = SearchServer("html", self.focusNote)
+        bootScheduler().defer(noteIndex().build, "search-index")
+        Profile.profileWatcher().switched.connect(self.switchProfile)
+        bootScheduler().defer(self.preloadProfiles, "profiles")
+        memoryAccountant().register("html-profiles", self.preloadUsage, self.releasePreloaded, on_idle=False)
+        # 开启指标时由监控端抓取，平时不做任何事
+        Metrics.metrics().register("classpro_widgets", "正在显示的小组件数",
+                                   lambda: len([widget for widget in self.widgets if not widget.isHidden()]), note="html")
+        Metrics.metrics().register("classpro_preloaded_widgets", "其他配置预载的小组件数",
+                                   lambda: sum(map(len, self.preloaded.values())), note="html")
+        # 首次显示已经完成，其余工作等开机负载降下来再做
+        bootScheduler().start("htmlwidget")
 
     def initUI(self):
-        if not os.path.exists("data/note/html"):
-            os.makedirs("data/note/html")
+        if not os.path.exists(self.note_dir):
+            os.makedirs(self.note_dir)
 
         if self.first_run:
-            config_path = os.path.join("data/note/html", f"{uuid.uuid4()}.json")
-            example_config = {
-                "position": {"x": 100, "y": 100},
-                "draggable": True,
-                "content": base64.b64encode("<h1>这是一个示例html小组件</h1>".encode("utf-8")).decode("utf-8")
-            }
-            with open(config_path, "w") as f:
-                json.dump(example_config, f, indent=4)
+            config_path = os.path.join(self.note_dir, f"{uuid.uuid4()}.json")
+            NoteFile(config_path).save({"position": {"x": 100, "y": 100}, "draggable": True}, "<h1>这是一个示例html小组件</h1>")
             self.first_run = False
 
         self.widgets = []
-        for filename in os.listdir("data/note/html"):
+        for filename in os.listdir(self.note_dir):
             if filename.endswith(".json"):
-                config_path = os.path.join("data/note/html", filename)
+                config_path = os.path.join(self.note_dir, filename)
+                if bootScheduler().isBooting() and not self.isOnScreen(config_path):
+                    # 开机时屏幕外的笔记没人看得到，推迟到系统空闲后再加载
+                    bootScheduler().defer(lambda path=config_path: self.createWidget(path), "offscreen-notes")
+                    continue
+                self.createWidget(config_path)
+        if self.snapshots is not None:
+            self.snapshots.releaseAll()  # 已经不存在的笔记留下的快照
+        Startup.markIdle("interactive")
+
+    def createWidget(self, config_path):
+        widget = HtmlWidget(config_path, manager=self)
+        self.hostWidget(widget)
+        if not self.widgets:
+            Startup.markOnPaint(widget, "first-live")
+            Startup.markOnPaint(widget, "first-visible")
+        widget.show()
+        self.widgets.append(widget)
+        if self.snapshots is not None:
+            self.snapshots.release(config_path)
+        return widget
+
+    def isOnScreen(self, config_path):
+        """笔记保存的位置是否落在某块屏幕上"""
+        try:
+            position = loadMeta(config_path)["position"]
+        except (OSError, ValueError, KeyError):
+            return True  # 读不出位置的交给小组件自己处理
+        rect = QRect(position["x"], position["y"], 100, 50)
+        return any(info.geometry.intersects(rect) for info in screenCache().screens())
+
+    def focusNote(self, config_path):
+        """把搜索结果对应的小组件显示到最前，不在任何屏幕上时移到主屏"""
+        widget = next((widget for widget in self.widgets if widget.config_path == config_path), None)
+        if widget is None or widget.isHidden() and not os.path.exists(config_path):
+            return False  # 已经删除
+        point = Overlay.globalPos(widget)
+        if not any(info.geometry.contains(point) for info in screenCache().screens()):
+            Overlay.moveGlobal(widget, screenCache().screens()[0].available.topLeft() + QPoint(100, 100))
+            Overlay.settle(widget)
+        widget.show()
+        widget.raise_()
+        widget.activateWindow()
+        return True
+
+    def startSync(self, sync_settings):
+        self.syncer = NoteSyncer(self, "html", sync_settings)
+
+    def pauseRendering(self, paused):
+        for widget in self.widgets:
+            widget.setUpdatesEnabled(not paused)
+
+    def applySync(self, changes):
+        """
+        应用同步结果：新增的笔记创建小组件，修改的就地刷新，删除的关闭
+
+        同步的是默认配置的笔记目录，默认配置不在使用时只更新它预载的小组件，新增的等切换过去时再创建。
+        """
+        live = self.profile == Profile.DEFAULT_PROFILE
+        widgets = self.widgets if live else self.preloaded.get(Profile.DEFAULT_PROFILE, [])
+        existing = {widget.config_path: widget for widget in widgets}
+        for note_id, data in changes.items():
+            config_path = os.path.join(Profile.noteDir("html", Profile.DEFAULT_PROFILE), f"{note_id}.json")
+            widget = existing.get(config_path)
+            if data is None:
+                if widget is not None:
+                    widget.deleteWidget()
+                    widgets.remove(widget)
+            elif widget is not None:
+                widget.refreshWidget()
+                if not live:
+                    noteIndex().remove(config_path)
+            elif live:
+                self.createWidget(config_path)
+
+    def memoryUsage(self):
+        return sum(surfaceBytes(widget) + len(widget.raw_text) + len(getattr(widget, "rendered_html", ""))
+                   for widget in self.widgets if not widget.isHidden())
+
+    def releaseHidden(self):
+        """销毁已经关闭但仍留在列表里的小组件"""
+        for widget in [widget for widget in self.widgets if widget.isHidden()]:
+            self.destroyWidget(widget)
+            self.widgets.remove(widget)
+
+    def destroyWidget(self, widget):
+        scheduler().unregister(widget.auto_save_job)
+        bindingHub().unbind(widget)
+        styleRegistry().apply(widget, "")
+        widget.deleteLater()
+
+    def notePaths(self, name):
+        note_dir = Profile.noteDir("html", name)
+        if not os.path.isdir(note_dir):
+            return []
+        return [os.path.join(note_dir, filename) for filename in sorted(os.listdir(note_dir)) if filename.endswith(".json")]
+
+    def preloadProfiles(self):
+        """把其他配置的小组件提前建好并隐藏，切换时只需显示"""
+        for name in Profile.names():
+            if name != self.profile and name not in self.preloaded:
+                self.preloaded[name] = [self.park(HtmlWidget(config_path, manager=self)) for config_path in self.notePaths(name)]
+
+    def park(self, widget):
+        """收起不属于当前配置的小组件：隐藏、停止自动保存、移出搜索索引"""
+        widget.hide()
+        scheduler().unregister(widget.auto_save_job)
+        noteIndex().remove(widget.config_path)
+        return widget
+
+    def unpark(self, widget):
+        widget.initAutoSaveTimer()
+        noteIndex().update(widget.config_path, widget.raw_text, "html")
+        self.hostWidget(widget)
+        widget.show()
+        return widget
+
+    def switchProfile(self, name):
+        """
+        就地切换到另一个配置
+
+        对每条笔记，按下面的顺序找小组件：两边文件名、内容和位置都相同时继续用正在显示的那个，不需要任何重绘；
+        有预载的显示预载的；当前有同名笔记的把它改为新文件重新加载；都没有时才新建。
+        换下来的小组件隐藏起来，留给下次切换回来。
+        """
+        if name == self.profile:
+            return
+        for widget in self.widgets:
+            if not widget.isHidden():
+                widget.saveSettings()  # 换下来之前保存当前的位置和内容
+        ready = {os.path.basename(widget.config_path): widget for widget in self.preloaded.pop(name, [])}
+        live = {os.path.basename(widget.config_path): widget for widget in self.widgets if not widget.isHidden()}
+        closed = [widget for widget in self.widgets if widget.isHidden()]  # 要在收起任何小组件之前取
+        widgets, outgoing = [], []
+        for config_path in self.notePaths(name):
+            filename = os.path.basename(config_path)
+            widget, preloaded = live.pop(filename, None), ready.pop(filename, None)
+            if widget is not None and preloaded is not None and widget.layoutState() == preloaded.layoutState():
+                # 两个小组件交换对应的文件，正在显示的那个保持不动
+                noteIndex().remove(widget.config_path)
+                previous = (widget.config_path, widget.note)
+                widget.retarget(preloaded.config_path, preloaded.note)
+                preloaded.retarget(*previous)
+                noteIndex().update(widget.config_path, widget.raw_text, "html")
+                widgets.append(widget)
+                outgoing.append(preloaded)
+            elif preloaded is not None:
+                widgets.append(self.unpark(preloaded))
+                if widget is not None:
+                    outgoing.append(self.park(widget))
+            elif widget is not None:
+                noteIndex().remove(widget.config_path)
+                widget.retarget(config_path)
+                widget.refreshWidget()
+                widgets.append(widget)
+            else:
                 widget = HtmlWidget(config_path, manager=self)
+                self.hostWidget(widget)
                 widget.show()
-                self.widgets.append(widget)
+                widgets.append(widget)
+        outgoing += [self.park(widget) for widget in live.values()]
+        for widget in list(ready.values()) + closed:
+            self.destroyWidget(widget)  # 预载后被删除的笔记和已经关闭的小组件
+        self.preloaded[self.profile] = outgoing
+        self.widgets = widgets
+        self.profile = name
+        self.note_dir = Profile.noteDir("html", name)
+        log.info("已切换到配置%s：%d个小组件", name, len(widgets))
+
+    def preloadUsage(self):
+        return sum(len(widget.raw_text) + len(getattr(widget, "rendered_html", ""))
+                   for widgets in self.preloaded.values() for widget in widgets)
+
+    def releasePreloaded(self):
+        """超出内存预算时放弃预载，切换时再重新加载"""
+        for widgets in self.preloaded.values():
+            for widget in widgets:
+                self.destroyWidget(widget)
+        self.preloaded = {}
+
+    def hostWidget(self, widget):
+        if self.overlay_mode:
+            Overlay.overlayHost().attach(widget)
 
 def run_html_widget_manager():
     app = QApplication(sys.argv)
-    manager = HtmlWidgetManager()
+    Log.setup("htmlwidget")
+    Metrics.start("htmlwidget")
+    try:
+        NoteBatch.recover(NoteBatch.noteRoot())  # 上次中断的批量导入
+    except (OSError, ValueError) as e:
+        log.error("无法补完上次中断的批量操作，笔记保持原样: %s", e)
+    # 先画出上次保存的快照，事件循环开始后再加载真正的小组件
+    snapshots = Snapshot.SnapshotLayer(Profile.noteDir("html"))
+    managers = []
+    QTimer.singleShot(0, lambda: managers.append(HtmlWidgetManager(snapshots)))
     sys.exit(app.exec())
 
 #run_html_widget_manager()
\ No newline at end of file
@@ -2,16 +2,56 @@ import sys
 import os
 import time
 import json
+import logging
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel, QPushButton, QFileDialog, QVBoxLayout, QHBoxLayout, QMenu, 
-                             QMessageBox, QLineEdit, QCompleter)
-from PySide6.QtGui import QIcon, QPainter, QBrush, QColor, QAction
-from PySide6.QtCore import Qt, QPoint, QTimer, QPropertyAnimation, QEasingCurve
+                             QMessageBox, QLineEdit, QCompleter, QInputDialog)
+from PySide6.QtGui import QIcon, QAction
+from PySide6.QtCore import Qt, QPoint, QPropertyAnimation, QEasingCurve, QTimer
 from PIL import Image
+from CPCore.StyleSheet import styleRegistry
+from CPCore.Scheduler import scheduler
+from CPCore.SystemState import systemState
+from CPBlock.testmode import ExamHost
+from CPCore.ScreenGeometry import screenCache
+from CPCore.Weather import weatherService
+from CPCore.Memory import memoryAccountant, surfaceBytes, deepSize
+from CPCore import Startup
+from CPCore.Startup import bootScheduler
+from CPCore import Timetable
+from CPCore.Timetable import timetableClock
+from CPCore.Quality import renderQuality, paintBackground
+from CPCore import Log
+from CPCore.Search import SearchPopup
+from CPCore import Profile
+from CPCore import Metrics
+
+log = logging.getLogger(__name__)
+QS_WRITES = Metrics.metrics().counter("classpro_config_writes_total", "配置和笔记文件的写盘次数", file="qs")
+
+# 快速启动栏的全部样式，启动时在应用级编译一次
+QS_QSS = """
+#qs, #qsSettings, #qsSettings * { font-family: Microsoft YaHei; }
+#qsCentral, #qsCentral * { background-color: rgba(255, 255, 255, 200); color: black; border-radius: 10px; font-family: Microsoft YaHei; }
+#qsTitle { font-size: 20px; font-weight: bold; color: #333333; margin-bottom: 10px; }
+#qsWeather { font-size: 12px; color: blue; margin-top: 10px; }
+#qsWeather[loaded="true"] { font-size: 14px; margin-top: 0px; }
+#qsPeriod { font-size: 14px; color: #333333; }
+#qsNotice { font-size: 12px; color: #c0392b; }
+#qsNotice[level="INFO"] { color: #333333; }
+#qsEmpty { font-size: 14px; color: gray; }
+#qsAppButton { background-color: transparent; }
+#qsAppName { font-size: 14px; color: black; }
+QMenu#qsMenu { background-color: white; color: black; border: 1px solid #cccccc; padding: 5px; }
+QMenu#qsMenu::item { padding: 5px 20px 5px 10px; }
+QMenu#qsMenu::item:selected { background-color: #e0e0e0; }
+"""
 
 class QuickStart(QMainWindow):
-    def __init__(self, config_path="data/qs.json"):
+    def __init__(self, config_path=None):
         super().__init__()
-        self.config_path = config_path
+        self.config_path = config_path or Profile.qsPath()  # 默认用当前配置的设置
+        self.is_near_edge = False
+        self.edge_restore_pos = None  # 隐藏到屏幕边缘前的位置，未隐藏时为None
         self.initUI()
         self.loadSettings()
         self.restorePosition()
@@ -22,22 +62,31 @@ class QuickStart(QMainWindow):
         self.animation = QPropertyAnimation(self, b"pos")
         self.animation.setDuration(180)
         self.animation.setEasingCurve(QEasingCurve.Type.OutQuad)
+        renderQuality().watchAnimation(self.animation)  # 帧间隔超出预算时改为直接移动
 
-        self.weather_timer = QTimer(self)
-        self.weather_timer.timeout.connect(self.updateWeather)
-        self.weather_timer.start(600000)
-        self.updateWeather()
+        # 挂起期间错过的天气刷新在恢复后补一次
+        self.weather_job = scheduler().register(600000, self.updateWeather, "weather", catch_up=True)
+        bootScheduler().defer(self.updateWeather, "weather")  # 开机时等系统空闲后再联网
+        weatherService().ready.connect(self.updateWeather)  # 局域网集群选出leader后再取一次
+        Profile.profileWatcher().switched.connect(self.switchProfile)
+
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, renderQuality().translucent)
+        renderQuality().watch(self)
+        renderQuality().levelChanged.connect(lambda level: self.updateOpacity(self.settings["opacity"]))
 
-        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.setStyleSheet("font-family: Microsoft YaHei;")
+        Startup.markOnPaint(self, "first-visible")
+        Startup.markIdle("interactive")
+        bootScheduler().start("qs")
 
     def initUI(self):
         self.setWindowTitle("ClassPro_qs")
+        self.setObjectName("qs")
+        styleRegistry().addBase(QS_QSS)
         self.setGeometry(100, 100, 300, 90)  # 缩小窗口尺寸
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.Tool)
 
         self.central_widget = QWidget()
-        self.central_widget.setStyleSheet("background-color: rgba(255, 255, 255, 200); color: black; border-radius: 10px; font-family: Microsoft YaHei;")
+        self.central_widget.setObjectName("qsCentral")
         self.setCentralWidget(self.central_widget)
         self.layout = QVBoxLayout(self.central_widget)
         self.layout.setContentsMargins(12, 12, 12, 6)  # 缩小边距
@@ -45,17 +94,40 @@ class QuickStart(QMainWindow):
 
         self.title_label = QLabel("快速启动", self)
         self.title_label.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        self.title_label.setStyleSheet("font-size: 20px; font-weight: bold; color: #333333; margin-bottom: 10px;")  # 缩小字体，增加下边距
+        self.title_label.setObjectName("qsTitle")
         self.layout.addWidget(self.title_label)
 
         self.button_layout = QHBoxLayout()
         self.button_layout.setSpacing(12)  # 缩小按钮间距
         self.layout.addLayout(self.button_layout)
 
+        self.bottom_layout = QHBoxLayout()
+        self.bottom_layout.setSpacing(12)
+        self.layout.addLayout(self.bottom_layout)
+
         self.bottom_label = QLabel("天气获取中", self)
         self.bottom_label.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        self.bottom_label.setStyleSheet("font-size: 12px; color: blue; margin-top: 10px;")  # 缩小字体，增加上边距
-        self.layout.addWidget(self.bottom_label)
+        self.bottom_label.setObjectName("qsWeather")
+        self.bottom_layout.addWidget(self.bottom_label)
+
+        # 当前和下一节课，没有课程表时不显示
+        self.period_label = QLabel(self)
+        self.period_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        self.period_label.setObjectName("qsPeriod")
+        self.period_label.hide()
+        self.bottom_layout.addWidget(self.period_label)
+
+        # 出错等提示以非模态的方式显示在栏内，几秒后自动消失
+        self.notice_label = QLabel(self)
+        self.notice_label.setObjectName("qsNotice")
+        self.notice_label.setWordWrap(True)
+        self.notice_label.hide()
+        self.layout.addWidget(self.notice_label)
+        self.notice_timer = QTimer(self)
+        self.notice_timer.setSingleShot(True)
+        self.notice_timer.timeout.connect(self.hideNotice)
+        self.notice_height = None
+        Log.notifier().notice.connect(self.showNotice)
 
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self.showContextMenu)
@@ -63,28 +135,42 @@ class QuickStart(QMainWindow):
         self.drag_position = QPoint()
 
     def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.setBrush(QBrush(QColor(255, 255, 255, 200)))
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawRoundedRect(self.rect(), 15, 15)
+        paintBackground(self, 15)  # 机器跟不上时按渲染等级关闭抗锯齿或透明
 
     def initTimers(self):
-        self.position_timer = QTimer(self)
-        self.position_timer.timeout.connect(self.savePosition)
-        self.position_timer.start(5000)
-
-        self.ppt_check_timer = QTimer(self)
-        self.ppt_check_timer.timeout.connect(self.checkFullscreenPrograms)
-        self.ppt_check_timer.start(1000)
-
-        self.inactivity_timer = QTimer(self)
-        self.inactivity_timer.timeout.connect(self.checkInactivity)
-        self.inactivity_timer.start(200)
-
-        self.cursor_check_timer = QTimer(self)
-        self.cursor_check_timer.timeout.connect(self.checkCursorOverWindow)
-        self.cursor_check_timer.start(200)
+        # 所有周期任务都注册到中央调度器，由它对齐合并唤醒，并在锁屏/关屏/演示时挂起
+        self.position_job = scheduler().register(5000, self.savePosition, "qs-position")
+        self.inactivity_job = scheduler().register(200, self.checkInactivity, "qs-inactivity")
+        self.cursor_check_job = scheduler().register(200, self.checkCursorOverWindow, "qs-cursor")
+
+        # 全屏演示检测由SystemState统一完成
+        systemState().presentationChanged.connect(self.checkFullscreenPrograms)
+        systemState().presentationCheckFailed.connect(self.presentationCheckFailed)
+        systemState().examChanged.connect(self.checkFullscreenPrograms)
+
+        # 课程表只在上下课的时刻通知，不需要轮询
+        timetableClock().changed.connect(self.updatePeriod)
+        self.updatePeriod(timetableClock().current, timetableClock().next)
+
+        # 考试窗口在这里提前创建好，进入考试模式时只需显示
+        self.exam_host = ExamHost()
+
+        # 设置窗口关闭后仍会留着窗口和整份城市列表，回收时一并释放
+        memoryAccountant().register("qs-settings", self.settingsMemory, self.releaseSettings)
+        bootScheduler().defer(lambda: memoryAccountant().start("qs"), "memory")
+
+    def settingsMemory(self):
+        size = deepSize(getattr(self, "city_map", {}))
+        if getattr(self, "settings_window", None) is not None:
+            size += surfaceBytes(self.settings_window)
+        return size
+
+    def releaseSettings(self):
+        if getattr(self, "settings_window", None) is not None and not self.settings_window.isVisible():
+            self.settings_window.deleteLater()
+            self.settings_window = None
+            self.city_completer = None
+        self.city_map = {}  # 保存设置时会重新读取
 
     def checkCursorOverWindow(self):
         cursor_pos = self.cursor().pos()
@@ -109,6 +195,7 @@ class QuickStart(QMainWindow):
             }
             with open(self.settings_file, "w") as f:
                 json.dump(self.settings, f, indent=4)
+            QS_WRITES.inc()
 
     def restorePosition(self):
         if "position" in self.settings:
@@ -116,76 +203,98 @@ class QuickStart(QMainWindow):
             self.move(pos["x"], pos["y"])
             self.checkEdgeSnap()
 
+    def edgeArea(self):
+        """当前所在屏幕的可用区域，以及左/右/下三条边是否可以吸附（外侧没有相邻屏幕）"""
+        pos = self.pos()
+        center = QPoint(pos.x() + self.width() // 2, pos.y() + self.height() // 2)
+        cache = screenCache()
+        info = cache.screenAt(center)
+        area = info.available
+        open_edges = {
+            "left": cache.isOpenEdge(info, "left", center.y()),
+            "right": cache.isOpenEdge(info, "right", center.y()),
+            "bottom": cache.isOpenEdge(info, "bottom", center.x()),
+        }
+        return area, open_edges
+
     def checkEdgeSnap(self):
-        screen = self.screen()
-        screen_geometry = screen.availableGeometry()
+        area, open_edges = self.edgeArea()
         pos = self.pos()
         width = self.width()
         height = self.height()
+        left = area.left()
+        right = area.left() + area.width()
+        bottom = area.top() + area.height()
 
+        x, y = pos.x(), pos.y()
         # 检查左边缘
-        if pos.x() <= 10:
-            self.move(0, pos.y())
+        if open_edges["left"] and x <= left + 10:
+            x = left
         # 检查右边缘
-        elif pos.x() + width >= screen_geometry.width() - 15:
-            self.move(screen_geometry.width() - width, pos.y())
+        elif open_edges["right"] and x + width >= right - 15:
+            x = right - width
         # 检查下边缘
-        if pos.y() + height >= screen_geometry.height() - 15:
-            self.move(pos.x(), screen_geometry.height() - height)
+        if open_edges["bottom"] and y + height >= bottom - 15:
+            y = bottom - height
+        if (x, y) != (pos.x(), pos.y()):
+            self.move(x, y)
 
         # 检查是否靠近边缘（仅左右边缘）
-        self.is_near_edge = (pos.x() <= 10 or pos.x() + width >= screen_geometry.width() - 15)
+        self.is_near_edge = (open_edges["left"] and x == left) or (open_edges["right"] and x + width == right)
 
     def hideToEdge(self):
-        screen = self.screen()
-        screen_geometry = screen.availableGeometry()
+        if self.edge_restore_pos is not None:
+            return  # 已经隐藏
+        area, open_edges = self.edgeArea()
         pos = self.pos()
         width = self.width()
         height = self.height()
+        left = area.left()
+        right = area.left() + area.width()
+        bottom = area.top() + area.height()
 
         target_pos = None
-        if pos.x() <= 10:  # 左边缘
-            target_pos = QPoint(-width + 10, pos.y())
-        elif pos.x() + width >= screen_geometry.width() - 15:  # 右边缘
-            target_pos = QPoint(screen_geometry.width() - 10, pos.y())
-        elif pos.y() + height >= screen_geometry.height() - 15:  # 下边缘
-            target_pos = QPoint(pos.x(), screen_geometry.height() - 10)
+        if open_edges["left"] and pos.x() <= left + 10:  # 左边缘
+            target_pos = QPoint(left - width + 10, pos.y())
+        elif open_edges["right"] and pos.x() + width >= right - 15:  # 右边缘
+            target_pos = QPoint(right - 10, pos.y())
+        elif open_edges["bottom"] and pos.y() + height >= bottom - 15:  # 下边缘
+            target_pos = QPoint(pos.x(), bottom - 10)
 
         if target_pos:
-            self.animation.setStartValue(self.pos())
-            self.animation.setEndValue(target_pos)
-            self.animation.start()
+            # 记住隐藏前的位置，恢复时不用再根据屏幕尺寸反推
+            self.edge_restore_pos = QPoint(pos)
+            self.slideTo(target_pos)
 
     def restoreFromEdge(self):
-        screen = self.screen()
-        screen_geometry = screen.availableGeometry()
-        pos = self.pos()
-        width = self.width()
-        height = self.height()
-
-        target_pos = None
-        if pos.x() == -width + 10:  # 左边缘
-            target_pos = QPoint(0, pos.y())
-        elif pos.x() == screen_geometry.width() - 10:  # 右边缘
-            target_pos = QPoint(screen_geometry.width() - width, pos.y())
-        elif pos.y() == screen_geometry.height() - 10:  # 下边缘
-            target_pos = QPoint(pos.x(), screen_geometry.height() - height)
-
-        if target_pos:
-            self.animation.setStartValue(self.pos())
-            self.animation.setEndValue(target_pos)
-            self.animation.start()
+        if self.edge_restore_pos is None:
+            return
+        target_pos = self.edge_restore_pos
+        self.edge_restore_pos = None
+        self.slideTo(target_pos)
+
+    def slideTo(self, target_pos):
+        if not renderQuality().animations:
+            self.animation.stop()
+            self.move(target_pos)
+            return
+        self.animation.setStartValue(self.pos())
+        self.animation.setEndValue(target_pos)
+        self.animation.start()
 
     def updateButtons(self):
-        for i in reversed(range(self.button_layout.count())): 
-            widget = self.button_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
+        # 每个应用是一个包含按钮和名称的子布局，切换配置时要连同子布局一起清掉
+        while self.button_layout.count():
+            item = self.button_layout.takeAt(0)
+            children = [item.layout().itemAt(i).widget() for i in range(item.layout().count())] if item.layout() else []
+            for widget in [item.widget()] + children:
+                if widget:
+                    widget.setParent(None)
 
         if not self.settings["apps"]:
             no_app_label = QLabel("未添加程序", self)
             no_app_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            no_app_label.setStyleSheet("font-size: 14px; color: gray;")  # 缩小字体
+            no_app_label.setObjectName("qsEmpty")
             self.button_layout.addWidget(no_app_label)
             self.resize(150, 90)  # 缩小窗口尺寸
             return
@@ -193,23 +302,21 @@ class QuickStart(QMainWindow):
         self.resize(len(self.settings["apps"]) * 70 + 20, 100)  # 调整窗口宽度以适应更大的按钮
 
         buttons = []
+        self.app_icons = []
         for i, app in enumerate(self.settings["apps"]):
             button = QPushButton(self)
             button.setFixedSize(45, 45)  # 缩小按钮尺寸
-            button.setStyleSheet("background-color: transparent;")
+            button.setObjectName("qsAppButton")
             button.setIcon(QIcon())
             if app["icon"]:
-                icon = QIcon()
-                icon.addFile(app["icon"], mode=QIcon.Mode.Normal, state=QIcon.State.On)
-                button.setIcon(icon)
-                button.setIconSize(button.size())  # 图标尺寸与按钮尺寸一致
+                self.app_icons.append((button, app["icon"]))
 
             # 绑定按钮点击事件
             button.clicked.connect(lambda checked, command=app["command"]: self.launchApp(command))
 
             name_label = QLabel(app["name"], self)
             name_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            name_label.setStyleSheet("font-size: 14px; color: black;")  # 缩小字体
+            name_label.setObjectName("qsAppName")
             name_label.setWordWrap(True)
 
             vbox = QVBoxLayout()
@@ -221,42 +328,114 @@ class QuickStart(QMainWindow):
 
         for button in buttons:
             self.button_layout.addLayout(button)
+        # 图标要读磁盘，开机时推迟到系统空闲后加载
+        bootScheduler().defer(self.loadIcons, "qs-icons")
+
+    def loadIcons(self):
+        for button, path in self.app_icons:
+            icon = QIcon()
+            icon.addFile(path, mode=QIcon.Mode.Normal, state=QIcon.State.On)
+            button.setIcon(icon)
+            button.setIconSize(button.size())  # 图标尺寸与按钮尺寸一致
 
     def launchApp(self, command):
         if command:
             try:
                 os.startfile(command)
             except Exception as e:
-                QMessageBox.critical(self, "错误", f"无法打开应用: {str(e)}")
+                log.error("无法打开应用: %s", e)
         else:
-            QMessageBox.information(self, "提示", "未关联任何应用")
+            log.info("未关联任何应用", extra={"notify": True})
+
+    def showNotice(self, message, level):
+        """在栏内显示一条提示，不打断当前操作"""
+        if self.notice_height is None:
+            self.notice_height = self.height()
+        self.notice_label.setText(message if len(message) <= 80 else message[:80] + "…")
+        self.notice_label.setToolTip(message)
+        self.notice_label.setProperty("level", level)
+        self.notice_label.style().unpolish(self.notice_label)
+        self.notice_label.style().polish(self.notice_label)
+        self.notice_label.setMaximumWidth(self.width() - 24)
+        self.notice_label.show()
+        self.resize(self.width(), self.notice_height + self.notice_label.heightForWidth(self.width() - 24) + 12)
+        self.notice_timer.start(8000)
+
+    def hideNotice(self):
+        self.notice_label.hide()
+        if self.notice_height is not None:
+            self.resize(self.width(), self.notice_height)
+            self.notice_height = None
 
     def showContextMenu(self, pos):
         menu = QMenu(self)
-        menu.setStyleSheet("""
-            QMenu {
-                background-color: white;
-                color: black;
-                border: 1px solid #cccccc;
-                padding: 5px;
-            }
-            QMenu::item {
-                padding: 5px 20px 5px 10px;
-            }
-            QMenu::item:selected {
-                background-color: #e0e0e0;
-            }
-        """)
+        menu.setObjectName("qsMenu")
         settings_action = QAction("设置", self)
         settings_action.triggered.connect(self.showSettings)
         menu.addAction(settings_action)
+
+        search_action = QAction("搜索笔记", self)
+        search_action.triggered.connect(self.showSearch)
+        menu.addAction(search_action)
+
+        timetable_action = QAction("导入课程表", self)
+        timetable_action.triggered.connect(self.importTimetable)
+        menu.addAction(timetable_action)
+
+        profile_menu = menu.addMenu("切换配置")
+        active = Profile.current()
+        for name in Profile.names():
+            profile_action = QAction(name, self)
+            profile_action.setCheckable(True)
+            profile_action.setChecked(name == active)
+            profile_action.triggered.connect(lambda checked, name=name: self.selectProfile(name))
+            profile_menu.addAction(profile_action)
+        profile_menu.addSeparator()
+        new_profile_action = QAction("新建配置…", self)
+        new_profile_action.triggered.connect(self.createProfile)
+        profile_menu.addAction(new_profile_action)
+
+        exam_action = QAction("考试模式", self)
+        exam_action.triggered.connect(self.exam_host.enter)
+        menu.addAction(exam_action)
         menu.exec(self.mapToGlobal(pos))
 
+    def selectProfile(self, name):
+        try:
+            Profile.switch(name)  # 各进程（包括本进程）收到通知后就地切换
+        except (OSError, ValueError) as e:
+            log.error("无法切换配置: %s", e)
+
+    def createProfile(self):
+        name, ok = QInputDialog.getText(self, "新建配置", "配置名称（复制当前配置的笔记和快速启动栏设置）:")
+        if not ok or not name:
+            return
+        try:
+            Profile.create(name, copy_from=Profile.current())
+        except (OSError, ValueError) as e:
+            log.error("无法新建配置: %s", e)
+            return
+        self.selectProfile(name)
+
+    def switchProfile(self, name):
+        """换成另一位老师的应用列表、城市和位置，不重启进程"""
+        self.savePosition()
+        self.config_path = Profile.qsPath(name)
+        self.loadSettings()
+        self.restorePosition()
+        self.updateWeather()
+
+    def showSearch(self):
+        # 窗口保留复用，再次打开时保留上次的查询
+        if getattr(self, "search_popup", None) is None:
+            self.search_popup = SearchPopup()
+        self.search_popup.popup()
+
     def showSettings(self):
         self.settings_window = QMainWindow()
         self.settings_window.setWindowTitle("设置")
         self.settings_window.setGeometry(100, 100, 600, 400)
-        self.settings_window.setStyleSheet("font-family: Microsoft YaHei;")
+        self.settings_window.setObjectName("qsSettings")
         
         self.settings_window.setWindowFlags(Qt.WindowType.Window | Qt.WindowType.WindowTitleHint | Qt.WindowType.CustomizeWindowHint)
         self.settings_window.closeEvent = lambda event: event.ignore()
@@ -339,54 +518,29 @@ class QuickStart(QMainWindow):
             # 自动提取图标
             self.extractIcon(file_path)
 
-    def checkFullscreenPrograms(self):
-        import win32gui
-        import win32con
-        import win32api
-
-        # 定义要检测的关键字列表
-        ppt_keywords = ["PowerPoint ", "WPS Presentation Slide Show", "希沃白板","Microsoft Edge"]
+    def checkFullscreenPrograms(self, active):
+        # 有PPT等全屏演示或处于考试模式时隐藏主窗口
+        if systemState().isPresentationActive() or systemState().isExamActive():
+            if self.isVisible():
+                self.hide()
+        else:
+            if not self.isVisible():
+                self.show()
 
-        try:
-            # 获取当前活动窗口的句柄
-            hwnd = win32gui.GetForegroundWindow()
-            window_title = win32gui.GetWindowText(hwnd)
-
-            # 获取屏幕的尺寸
-            screen_width = win32api.GetSystemMetrics(win32con.SM_CXSCREEN)
-            screen_height = win32api.GetSystemMetrics(win32con.SM_CYSCREEN)
-
-            # 获取窗口的尺寸
-            window_rect = win32gui.GetWindowRect(hwnd)
-            window_width = window_rect[2] - window_rect[0]
-            window_height = window_rect[3] - window_rect[1]
-
-            # 判断窗口是否全屏
-            is_fullscreen = (window_width == screen_width and window_height == screen_height)
-
-            # 如果窗口标题包含PPT相关关键字且处于全屏状态，则隐藏主窗口
-            if any(keyword in window_title for keyword in ppt_keywords) and is_fullscreen:
-                if self.isVisible():
-                    self.hide()
-            else:
-                if not self.isVisible():
-                    self.show()
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"检查PPT全屏时出错: {e}")  # 使用弹窗提示错误信息
+    def presentationCheckFailed(self, error):
+        # 每秒检测一次，反复出错时由日志去重限速，不会每秒弹一次
+        log.error("检查PPT全屏时出错: %s", error)
 
     def updateWeather(self):
         try:
             import requests
             city = self.settings.get("city", "北京")
             cityid = self.settings.get("cityid", 101010100)
-            url = f"https://weatherapi.market.xiaomi.com/wtr-v3/weather/all?latitude=110&longitude=112&isLocated=true&locationKey=weathercn%3A{cityid}&days=1&appKey=weather20151024&sign=zUFJoAR2ZVrDy1vF3D07&romVersion=7.2.16&appVersion=87&alpha=false&isGlobal=false&device=cancro&modDevice=&locale=zh_cn"
-            heads={
-                "user-agent":"Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36 Edg/132.0.0.0"
-            }
-            response = requests.get(url, headers=heads, timeout=5)
-            response.raise_for_status()  # 确保请求成功
-            data = response.json()
-            if "current" in data:
+            # 开启局域网集群模式时由集群里的一个节点统一请求
+            data = weatherService().get(cityid)
+            if data is None:
+                self.bottom_label.setText("正在连接天气节点…")  # 选举有结果后由ready再次刷新
+            elif "current" in data:
                 weather_code = int(data["current"]["weather"])
                 try:
                     with open("data/weather/weather_status.data", "r", encoding="utf-8") as f:
@@ -396,7 +550,10 @@ class QuickStart(QMainWindow):
                     weather_desc = "未知"
                 temp = data["current"]["temperature"]["value"]+data["current"]["temperature"]["unit"]
                 self.bottom_label.setText(f"📍 {city} | {weather_desc} | {temp}")
-                self.bottom_label.setStyleSheet("font-size: 14px; color: blue;")
+                if not self.bottom_label.property("loaded"):
+                    self.bottom_label.setProperty("loaded", True)
+                    self.bottom_label.style().unpolish(self.bottom_label)
+                    self.bottom_label.style().polish(self.bottom_label)
             else:
                 self.bottom_label.setText("天气获取失败")
         except requests.exceptions.RequestException as e:
@@ -404,6 +561,24 @@ class QuickStart(QMainWindow):
         except Exception as e:
             self.bottom_label.setText(f"未知错误 ({str(e)})")
 
+    def updatePeriod(self, current, following):
+        if not timetableClock().timetable:
+            self.period_label.hide()
+            return
+        self.period_label.setText(Timetable.describe(current, following))
+        self.period_label.show()
+
+    def importTimetable(self):
+        path, _ = QFileDialog.getOpenFileName(self, "导入课程表", "", "课程表 (*.csv *.json)")
+        if not path:
+            return
+        try:
+            Timetable.importFile(path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.error("无法导入课程表: %s", e)
+            return
+        timetableClock().reload()
+
     def getCityList(self):
         try:
             with open("data/weather/weatherlib.data", "r", encoding="utf-8") as f:
@@ -418,7 +593,7 @@ class QuickStart(QMainWindow):
                 self.city_map = {name: int(city_num) for name, city_num in city_data}
                 return list(self.city_map.keys())  # 返回城市名称列表
         except Exception as e:
-            QMessageBox.critical(self, "错误", f"无法加载城市列表: {e}")  # 使用弹窗提示错误信息
+            log.error("无法加载城市列表: %s", e)
             return []
 
     def extractIcon(self, exe_path):
@@ -482,12 +657,13 @@ class QuickStart(QMainWindow):
 
         with open(self.settings_file, "w") as f:
             json.dump(self.settings, f, indent=4)
+        QS_WRITES.inc()
 
         QMessageBox.information(self.settings_window, "提示", "设置已保存")
         self.settings_window.destroy()
 
     def loadSettings(self):
-        self.settings_file = "data/qs.json"
+        self.settings_file = self.config_path
         if os.path.exists(self.settings_file):
             with open(self.settings_file, "r") as f:
                 self.settings = json.load(f)
@@ -507,29 +683,33 @@ class QuickStart(QMainWindow):
 
     def mouseMoveEvent(self, event):
         if event.buttons() == Qt.MouseButton.LeftButton:
+            self.edge_restore_pos = None  # 拖动后原先记住的隐藏前位置已经失效
             self.move(event.globalPosition().toPoint() - self.drag_position)
             self.checkEdgeSnap()
             self.savePosition()
             self.last_activity_time = time.time()
 
     def updateOpacity(self, opacity):
-        self.setWindowOpacity(opacity)
+        # 关闭透明时整个窗口也不再半透明
+        self.setWindowOpacity(opacity if renderQuality().translucent else 1.0)
 
 class QuickStartApp:
-    def __init__(self, config_path="data/qs.json"):
+    def __init__(self, config_path=None):
         self.config_path = config_path
 
     def run(self):
         app = QApplication(sys.argv)
+        Log.setup("qs")
+        Metrics.start("qs")
         window = QuickStart(config_path=self.config_path)
         window.show()
         sys.exit(app.exec())
 
-def run_quickstart(config_path="data/qs.json"):
+def run_quickstart(config_path=None):
     """
     启动快速启动应用的便捷方法
     
-    :param config_path: 配置文件路径
+    :param config_path: 配置文件路径，默认为当前配置的qs.json
     """
     app = QuickStartApp(config_path=config_path)
     app.run()
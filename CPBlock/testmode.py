@@ -1,28 +1,151 @@
-import tkinter as tk
-from tkinter import font
+import sys
+from PySide6.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout
+from PySide6.QtGui import QPainter, QColor, QKeySequence, QShortcut
+from PySide6.QtCore import Qt, QObject, Signal
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+from CPCore.StyleSheet import styleRegistry
+from CPCore.SystemState import systemState, EXAM_SERVER
+from CPCore.Memory import memoryAccountant, surfaceBytes
+from CPCore.Startup import bootScheduler
 
-def run():
-    # 创建主窗口
-    root = tk.Tk()
-    root.title("考试模式")
+# 考试模式宿主监听的本地套接字名
+SERVER_NAME = EXAM_SERVER
 
-    # 设置窗口全屏
-    root.attributes("-fullscreen", True)
-    root.configure(bg="black")
+EXAM_QSS = """
+#examText { font-family: Microsoft YaHei; font-size: 25pt; color: white; }
+"""
 
-    # 将窗口置于所有其他窗口之上
-    root.attributes("-topmost", True)
+class ExamWindow(QWidget):
+    """考试模式的全屏黑色窗口，由宿主进程提前创建好并隐藏"""
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("考试模式")
+        # 置于所有其他窗口之上，不显示任务栏图标
+        self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.Tool)
+        styleRegistry().addBase(EXAM_QSS)
 
-    # 设置窗口不显示任务栏图标
-    root.attributes("-toolwindow", True)
+        layout = QVBoxLayout(self)
+        label = QLabel("考试模式", self)
+        label.setObjectName("examText")
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(label)
 
-    # 创建字体
-    custom_font = font.Font(family="Microsoft YaHei", size=25)
+        # 退出考试模式
+        QShortcut(QKeySequence("Ctrl+Alt+E"), self, activated=self.close)
 
-    # 创建标签并设置文字
-    label = tk.Label(root, text="考试模式", font=custom_font, fg="white", bg="black")
-    label.place(relx=0.5, rely=0.5, anchor="center")
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(0, 0, 0))
 
-    # 运行主循环
-    root.mainloop()
-#run()
\ No newline at end of file
+class ExamHost(QObject):
+    """
+    考试模式宿主
+
+    在常驻的Qt进程里提前创建并布局好考试窗口，收到命令后只需显示，几乎没有启动开销；
+    同时通知连着的ClassPro进程（发送过watch的连接）挂起定时任务、渲染和网络请求。
+    """
+    left = Signal()
+
+    def __init__(self):
+        super().__init__()
+        self.window = None
+        bootScheduler().defer(self.preloadWindow, "exam-window")
+        # 全屏窗口的缓冲区不小，只在超出内存预算时销毁，下次进入时重新创建
+        memoryAccountant().register("exam-window", lambda: surfaceBytes(self.window) if self.window else 0,
+                                    self.releaseWindow, on_idle=False)
+
+        self.watchers = []
+        systemState().hostExam()
+        self.server = QLocalServer(self)
+        QLocalServer.removeServer(SERVER_NAME)
+        self.server.listen(SERVER_NAME)
+        self.server.newConnection.connect(self.acceptCommand)
+
+    def createWindow(self):
+        self.window = ExamWindow()
+        self.window.setGeometry(self.window.screen().geometry())
+        self.window.ensurePolished()
+        self.window.winId()  # 提前创建原生窗口
+        self.window.closeEvent = self.windowClosed
+
+    def preloadWindow(self):
+        if self.window is None:
+            self.createWindow()
+
+    def releaseWindow(self):
+        if self.window is not None and self.window.isHidden():
+            self.window.deleteLater()
+            self.window = None
+
+    def acceptCommand(self):
+        socket = self.server.nextPendingConnection()
+        socket.readyRead.connect(lambda: self.handleCommand(socket))
+        socket.disconnected.connect(lambda: self.dropWatcher(socket))
+        socket.disconnected.connect(socket.deleteLater)
+
+    def dropWatcher(self, socket):
+        if socket in self.watchers:
+            self.watchers.remove(socket)
+
+    def handleCommand(self, socket):
+        command = bytes(socket.readAll()).decode("utf-8").strip()
+        if command == "watch":
+            self.watchers.append(socket)
+            socket.write(b"on\n" if systemState().isExamActive() else b"off\n")
+            return  # 保持连接，之后进入/退出时推送
+        if command == "on":
+            self.enter()
+        elif command == "off":
+            self.leave()
+        socket.disconnectFromServer()
+
+    def notify(self, active):
+        for socket in self.watchers:
+            socket.write(b"on\n" if active else b"off\n")
+            socket.flush()
+
+    def enter(self):
+        systemState().setCondition("exam", True)
+        self.notify(True)
+        self.preloadWindow()
+        self.window.showFullScreen()
+        self.window.raise_()
+        self.window.activateWindow()
+
+    def leave(self):
+        if self.window is not None:
+            self.window.close()
+
+    def windowClosed(self, event):
+        systemState().setCondition("exam", False)
+        self.notify(False)
+        self.window.hide()
+        event.ignore()  # 只隐藏不销毁，下次进入依然是即时的
+        self.left.emit()
+
+def sendCommand(command):
+    """把命令发给已在运行的考试模式宿主，没有宿主时返回False"""
+    socket = QLocalSocket()
+    socket.connectToServer(SERVER_NAME)
+    if not socket.waitForConnected(200):
+        return False
+    socket.write(command.encode("utf-8"))
+    socket.waitForBytesWritten(200)
+    socket.disconnectFromServer()
+    return True
+
+def run(command="on"):
+    """
+    进入或退出考试模式
+
+    :param command: "on"：进入，"off"：退出。
+        快速启动栏运行时由它宿主考试窗口；否则在本进程里临时创建一个。
+    """
+    app = QApplication.instance() or QApplication(sys.argv)
+    if sendCommand(command) or command != "on":
+        return
+    host = ExamHost()
+    host.left.connect(app.quit)
+    host.enter()
+    app.exec()
+#run()
@@ -0,0 +1,511 @@
+import os
+import sys
+import time
+
+# 基准测试不需要真实显示器
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+WIDGET_COUNTS = (10, 50, 200)
+STYLES = [
+    "",
+    "font-size: 18px;",
+    "QLabel { color: #c0392b; }",
+    "font-family: SimHei;",
+    "QLabel { font-weight: bold; }",
+]
+
+def bench_style():
+    """对比每个小组件各自setStyleSheet和应用级编译两种方式的样式polish耗时"""
+    from CPBlock.HtmlWidgetManager import HtmlWidget
+    from CPCore.StyleSheet import styleRegistry
+    from CPCore.Scheduler import scheduler
+
+    for count in WIDGET_COUNTS:
+        widgets = [HtmlWidget("__bench__.json") for _ in range(count)]
+        for i, widget in enumerate(widgets):
+            scheduler().unregister(widget.auto_save_job)
+            widget.updateText(f"<h1>通知 {i}</h1><p>第{i}条</p>")
+
+        # 旧方式：每个小组件和它的标签各自解析并polish一份样式表
+        start = time.perf_counter()
+        for i, widget in enumerate(widgets):
+            widget.setStyleSheet(STYLES[i % len(STYLES)] or "font-family: Microsoft YaHei;")
+            widget.text_label.setStyleSheet("font-size: 14px; color: black;")
+            widget.ensurePolished()
+        legacy = time.perf_counter() - start
+
+        # 刷新时旧方式会再次解析同样的样式表
+        start = time.perf_counter()
+        for i, widget in enumerate(widgets):
+            widget.setStyleSheet(STYLES[i % len(STYLES)] or "font-family: Microsoft YaHei;")
+            widget.text_label.setStyleSheet("font-size: 14px; color: black;")
+        legacy_refresh = time.perf_counter() - start
+        for widget in widgets:
+            widget.setStyleSheet("")
+            widget.text_label.setStyleSheet("")
+
+        # 新方式：去重后在应用级编译一次，小组件只切换cpStyle属性
+        start = time.perf_counter()
+        for i, widget in enumerate(widgets):
+            widget.custom_style = STYLES[i % len(STYLES)]
+            widget.applyStyle()
+        styleRegistry().compile()
+        for widget in widgets:
+            widget.ensurePolished()
+        compiled = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for widget in widgets:
+            widget.applyStyle()
+        compiled_refresh = time.perf_counter() - start
+
+        print(f"style  widgets={count:<4d} "
+              f"polish per-widget={legacy * 1000:8.2f} ms  app-level={compiled * 1000:8.2f} ms | "
+              f"refresh per-widget={legacy_refresh * 1000:8.2f} ms  app-level={compiled_refresh * 1000:8.2f} ms | "
+              f"unique-styles={len(styleRegistry().scoped)}")
+        for widget in widgets:
+            widget.custom_style = ""
+            widget.applyStyle()
+            widget.deleteLater()
+        QApplication.processEvents()
+
+def bench_timers(count=50, seconds=10):
+    """count个Markdown小组件加时钟占位符时，中央调度器的实际唤醒频率"""
+    import tempfile
+    from PySide6.QtCore import QEventLoop, QTimer
+    from CPBlock.MarkdownWidgetManager import MarkdownWidget
+    from CPCore.Scheduler import scheduler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        widgets = [MarkdownWidget(os.path.join(tmp, f"{i}.json")) for i in range(count)]
+        for i, widget in enumerate(widgets):
+            widget.updateText(f"**{{{{time}}}}** 第{i}条")
+        loop = QEventLoop()
+        QTimer.singleShot(seconds * 1000, loop.quit)
+        loop.exec()
+        # 每个任务各用一个QTimer时的唤醒次数
+        independent = sum(1000 / job.interval for job in scheduler().jobs)
+        print(f"timers widgets={count:<4d} jobs={len(scheduler().jobs):<4d} "
+              f"independent={independent:6.2f}/s  scheduler={scheduler().wakeupRate():6.2f}/s")
+        for widget in widgets:
+            widget.deleteWidget()
+            widget.deleteLater()
+        QApplication.processEvents()
+
+def bench_bindings(counts=(1, 10, 50), ticks=10):
+    """带{{time}}的Markdown笔记每秒刷新一次的耗时（含重绘）：整段setText加adjustSize，和只改写变化的占位符"""
+    import tempfile
+    from PySide6.QtWidgets import QLabel
+    from CPBlock.MarkdownWidgetManager import MarkdownWidget
+    from CPCore.Binding import bindingHub
+
+    body = "\n\n".join(f"- 第{i}项：带齐课本和练习册，下课交作业" for i in range(12))
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in counts:
+            widgets = [MarkdownWidget(os.path.join(tmp, f"{i}.json")) for i in range(count)]
+            for i, widget in enumerate(widgets):
+                widget.updateText(f"# 第{i}条 **{{{{time}}}}**\n\n{body}")
+                widget.show()
+            QApplication.processEvents()
+
+            def timed(render):
+                start = time.perf_counter()
+                for tick in range(ticks):
+                    for widget in widgets:
+                        widget.binding.values = [f"08:00:{tick:02d}"]
+                        render(widget)
+                    QApplication.processEvents()  # 重绘
+                return (time.perf_counter() - start) / ticks * 1000
+
+            partial = timed(lambda widget: widget.renderBinding())
+
+            # 原来的做法：每次刷新都把整段html交给QLabel重新解析、排版，再重新计算窗口大小
+            labels = {}
+            for widget in widgets:
+                widget.text_label.hide()
+                labels[widget] = QLabel(widget)
+                labels[widget].setWordWrap(True)
+                labels[widget].setObjectName("noteText")
+                widget.layout.addWidget(labels[widget])
+
+            def legacy(widget):
+                labels[widget].setText(widget.binding.fill(widget.rendered_html, widget.binding.values))
+                widget.adjustSize()
+                widget.resize(min(widget.width(), 800), widget.height())
+
+            full = timed(legacy)
+            print(f"bind   widgets={count:<4d} per tick: setText+adjustSize={full:8.2f} ms  in-place={partial:8.2f} ms")
+            for widget in widgets:
+                bindingHub().unbind(widget)
+                widget.deleteWidget()
+                widget.deleteLater()
+            QApplication.processEvents()
+
+def bench_storage(count=20, size=1024 * 1024):
+    """count条内嵌约size字节图片的html笔记：旧格式和新格式读取位置、读取全文和无变化保存的耗时"""
+    import json
+    import base64
+    import tempfile
+    from CPCore.NoteStore import NoteFile
+
+    content = '<img src="data:image/png;base64,' + base64.b64encode(os.urandom(size * 3 // 4)).decode("utf-8") + '">'
+    meta = {"position": {"x": 100, "y": 100}, "draggable": True, "style": ""}
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_paths = [os.path.join(tmp, f"legacy{i}.json") for i in range(count)]
+        for path in legacy_paths:
+            with open(path, "w") as f:
+                json.dump(dict(meta, content=base64.b64encode(content.encode("utf-8")).decode("utf-8")), f, indent=4)
+        notes = [NoteFile(os.path.join(tmp, f"note{i}.json")) for i in range(count)]
+        for note in notes:
+            note.save(meta, content)
+
+        start = time.perf_counter()
+        for path in legacy_paths:
+            with open(path, "r") as f:
+                json.load(f)["position"]
+        legacy_meta = time.perf_counter() - start
+        start = time.perf_counter()
+        for path in legacy_paths:
+            with open(path, "r") as f:
+                base64.b64decode(json.load(f)["content"]).decode("utf-8")
+        legacy_full = time.perf_counter() - start
+        start = time.perf_counter()
+        for path in legacy_paths:
+            with open(path, "w") as f:
+                json.dump(dict(meta, content=base64.b64encode(content.encode("utf-8")).decode("utf-8")), f, indent=4)
+        legacy_save = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for note in notes:
+            note.loadMeta()["position"]
+        split_meta = time.perf_counter() - start
+        start = time.perf_counter()
+        for note in notes:
+            note.load()
+        split_full = time.perf_counter() - start
+        start = time.perf_counter()
+        for note in notes:
+            note.save(meta, content)
+        split_save = time.perf_counter() - start
+
+        legacy_bytes = sum(os.path.getsize(path) for path in legacy_paths)
+        split_bytes = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp) if name.startswith("note"))
+        print(f"store  notes={count:<4d} size={size // 1024} KiB | "
+              f"position legacy={legacy_meta * 1000:8.2f} ms split={split_meta * 1000:8.2f} ms | "
+              f"full legacy={legacy_full * 1000:8.2f} ms split={split_full * 1000:8.2f} ms | "
+              f"autosave legacy={legacy_save * 1000:8.2f} ms split={split_save * 1000:8.2f} ms | "
+              f"disk legacy={legacy_bytes / 1048576:.1f} MiB split={split_bytes / 1048576:.1f} MiB")
+
+def bench_startup(count=30):
+    """启动count个Markdown笔记的进程，分别测量无快照和有快照时首个笔记可见、可交互的时间"""
+    import json
+    import subprocess
+    import tempfile
+    from CPBlock.MarkdownWidgetManager import MarkdownWidget
+    from CPCore.NoteStore import NoteFile
+    from CPCore.Scheduler import scheduler
+    from CPCore.Binding import bindingHub
+    from CPCore import Snapshot
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as tmp:
+        note_dir = os.path.join(tmp, "data", "note", "md")
+        os.makedirs(note_dir)
+        for i in range(count):
+            NoteFile(os.path.join(note_dir, f"{i}.json")).save(
+                {"position": {"x": 40 + i % 6 * 220, "y": 40 + i // 6 * 160}, "draggable": True},
+                f"# 通知 {i}\n\n- 第一项\n- 第二项\n\n**{{{{time}}}}**")
+
+        def launch():
+            env = dict(os.environ, CLASSPRO_BOOT_T0=str(time.time()), CLASSPRO_STARTUP_TRACE="exit")
+            output = subprocess.run([sys.executable, os.path.join(root, "springboard.py"), "mdwidget"], cwd=tmp,
+                                    env=env, capture_output=True, text=True, timeout=120).stdout
+            return {entry["mark"]: entry["t"] for entry in map(json.loads, filter(None, output.splitlines()))}
+
+        cold = launch()
+        # 用运行中完全相同的方式生成快照
+        for filename in os.listdir(note_dir):
+            if filename.endswith(".json"):
+                widget = MarkdownWidget(os.path.join(note_dir, filename))
+                scheduler().unregister(widget.auto_save_job)
+                Snapshot.save(widget, widget.note.snapshotPath())
+                bindingHub().unbind(widget)
+                widget.deleteLater()
+        QApplication.processEvents()
+        warm = launch()
+
+        for name, marks in (("no-snapshot", cold), ("snapshot", warm)):
+            print(f"start  notes={count:<4d} {name:<12s} first-visible={marks.get('first-visible', 0) * 1000:8.1f} ms  "
+                  f"first-live={marks.get('first-live', 0) * 1000:8.1f} ms  "
+                  f"interactive={marks.get('interactive', 0) * 1000:8.1f} ms")
+
+def bench_timetable(terms=8, periods=12, lookups=100000):
+    """terms个学期、每天periods节课的课程表：逐条扫描和区间索引两种方式查找当前课节的耗时"""
+    import random
+    from datetime import date, datetime, timedelta
+    from CPCore.Timetable import Timetable, parseTime, parseWeekday
+
+    def weekly(term):
+        return [{"weekday": weekday, "start": f"{7 + i:02d}:{term % 2 * 10:02d}", "end": f"{7 + i:02d}:{term % 2 * 10 + 45}",
+                 "name": f"课程{term}-{weekday}-{i}"} for weekday in range(1, 6) for i in range(periods)]
+
+    first = date(2026, 9, 1)
+    data = {"weekly": weekly(99), "terms": [], "days": {}}
+    for term in range(terms):
+        start = first + timedelta(days=term * 183)
+        data["terms"].append({"name": f"学期{term}", "start": start.isoformat(),
+                              "end": (start + timedelta(days=140)).isoformat(), "weekly": weekly(term)})
+    for i in range(100):
+        data["days"][(first + timedelta(days=i * 13)).isoformat()] = [] if i % 2 else {"as": 1 + i % 5}
+    timetable = Timetable(data)
+    moments = [datetime(2026, 9, 1) + timedelta(seconds=random.randrange(terms * 183 * 86400)) for _ in range(lookups)]
+
+    def scan(now):
+        # 旧做法：每次从头遍历学期和全部课节
+        entries = data["weekly"]
+        for term in data["terms"]:
+            if date.fromisoformat(term["start"]) <= now.date() <= date.fromisoformat(term["end"]):
+                entries = term["weekly"]
+        override = data["days"].get(now.date().isoformat())
+        weekday = override["as"] if isinstance(override, dict) else now.isoweekday()
+        entries = override if isinstance(override, list) else entries
+        seconds = now.hour * 3600 + now.minute * 60 + now.second
+        for entry in entries:
+            if parseWeekday(entry.get("weekday", weekday)) == weekday and \
+                    parseTime(entry["start"]) <= seconds < parseTime(entry["end"]):
+                return entry["name"]
+        return None
+
+    start = time.perf_counter()
+    scanned = [scan(now) for now in moments]
+    linear = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = [timetable.lookup(now)[0] for now in moments]
+    bisected = time.perf_counter() - start
+    assert scanned == [lesson.name if lesson else None for lesson in indexed]
+    start = time.perf_counter()
+    events = timetable.transitions(moments[0], moments[0] + timedelta(days=1))
+    precompute = time.perf_counter() - start
+    print(f"table  terms={terms} periods/day={periods} lookups={lookups} | "
+          f"scan={linear / lookups * 1e6:8.2f} us  index={bisected / lookups * 1e6:8.2f} us (incl. next) | "
+          f"next-day transitions={len(events)} in {precompute * 1000:.2f} ms")
+
+def bench_quality(count=20, rounds=8):
+    """count个Markdown小组件在各渲染等级下的刷新耗时，以及预算不足/恢复余量时自动切换等级的过程"""
+    from CPBlock.MarkdownWidgetManager import MarkdownWidget
+    from CPCore.Scheduler import scheduler
+    from CPCore.Binding import bindingHub
+    from CPCore import Quality
+
+    quality = Quality.renderQuality()
+    widgets = []
+    for i in range(count):
+        widget = MarkdownWidget("__bench__.json")
+        scheduler().unregister(widget.auto_save_job)
+        widget.updateText(f"# 通知 {i}\n\n- 第一项\n- 第二项\n\n**加粗** *斜体* `代码`")
+        widget.move(40 + i % 6 * 220, 40 + i // 6 * 160)
+        widget.show()
+        widgets.append(widget)
+    QApplication.processEvents()
+
+    def repaint():
+        for _ in range(rounds):
+            for widget in widgets:
+                widget.update()
+            QApplication.processEvents()
+
+    for level in range(len(Quality.LEVEL_NAMES)):
+        quality.mode = level
+        quality.apply()
+        QApplication.processEvents()
+        quality.paints.clear()
+        repaint()
+        paints = list(quality.paints)
+        print(f"qual   widgets={count:<4d} level={level} {Quality.LEVEL_NAMES[level]:<6s} "
+              f"paint mean={sum(paints) / len(paints):6.3f} ms  p90={Quality.percentile(paints):6.3f} ms")
+
+    quality.mode = "auto"
+    quality.apply()
+    budget = quality.paint_budget
+    quality.paint_budget = 0.001  # 模拟跟不上的机器
+    repaint()
+    degraded = quality.level
+    quality.paint_budget = 1000  # 模拟负载下降
+    quality.cooldown = 0
+    repaint()
+    print(f"qual   auto: budget exceeded -> level {degraded}, headroom -> level {quality.level} | "
+          f"switches: {' '.join(f'{old}->{new}' for _, old, new, _ in quality.changes)}")
+    quality.paint_budget = budget
+    quality.cooldown = Quality.MIN_COOLDOWN
+    for widget in widgets:
+        bindingHub().unbind(widget)
+        widget.deleteLater()
+    QApplication.processEvents()
+
+def bench_search(count=3000, queries=200):
+    """count条中英文混合的笔记：建立索引、单条更新的耗时，以及索引查询和逐条子串扫描的耗时"""
+    import random
+    from CPCore.Search import NoteIndex, plainText, normalize
+
+    random.seed(1)
+    # 常用字两两组成的词表，词频按齐普夫分布，接近真实笔记里少数词很常见、大多数词很少见
+    chars = [chr(code) for code in random.sample(range(0x4e00, 0x4e00 + 3000), 600)]
+    words = list(dict.fromkeys("".join(random.sample(chars, random.choice((2, 2, 3)))) for _ in range(5000)))
+    words += ["homework", "exam", "unit", "review", "quiz", "chapter", "lab", "reading", "notes", "project"]
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    notes = {}
+    for i in range(count):
+        parts = random.choices(words, weights, k=random.randint(20, 200))
+        notes[f"data/note/md/{i}.json"] = f"# 笔记{i}\n" + "，".join(parts) + f" {i}"
+    index = NoteIndex()
+    index.ready = True
+    start = time.perf_counter()
+    for doc_id, content in notes.items():
+        index.update(doc_id, content)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for doc_id in list(notes)[:100]:
+        index.update(doc_id, notes[doc_id] + "，补充")
+    update = (time.perf_counter() - start) / 100
+
+    # 常见词、少见词、单字和多个关键字的组合
+    samples = [random.choice((random.choices(words, weights)[0], random.choice(words), random.choice(chars),
+                              " ".join(random.choices(words, weights, k=2)))) for _ in range(queries)]
+    texts = {doc_id: normalize(plainText(content)) for doc_id, content in notes.items()}
+
+    def scan(query):
+        # 旧做法：每条笔记逐个查找所有关键字
+        keys = normalize(query).split()
+        return [doc_id for doc_id, text in texts.items() if all(key in text for key in keys)]
+
+    def timings(method):
+        elapsed = []
+        for query in samples:
+            start = time.perf_counter()
+            method(query)
+            elapsed.append((time.perf_counter() - start) * 1000)
+        elapsed.sort()
+        return elapsed[len(elapsed) // 2], elapsed[int(len(elapsed) * 0.95)]
+
+    scan_p50, scan_p95 = timings(scan)
+    index_p50, index_p95 = timings(index.search)
+    print(f"notes={count} terms={len(index.postings)} | build={build * 1000:.0f} ms  update={update * 1000:.2f} ms | "
+          f"scan p50/p95={scan_p50:.2f}/{scan_p95:.2f} ms  index p50/p95={index_p50:.2f}/{index_p95:.2f} ms")
+
+def bench_profiles(count=30, changed=10):
+    """两个各有count条Markdown笔记的配置（其中changed条内容不同）：预载时、不预载时切换配置的耗时和复用的小组件数"""
+    import tempfile
+    from CPBlock.MarkdownWidgetManager import MarkdownWidgetManager
+    from CPCore.NoteStore import NoteFile
+    from CPCore import Profile
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            note_dir = Profile.noteDir("md", Profile.DEFAULT_PROFILE)
+            os.makedirs(note_dir)
+            for i in range(count):
+                NoteFile(os.path.join(note_dir, f"{i}.json")).save(
+                    {"position": {"x": 40 + i % 6 * 220, "y": 40 + i // 6 * 160}, "draggable": True},
+                    f"# 通知 {i}\n\n- 第一项\n- 第二项")
+            Profile.create("B", copy_from=Profile.DEFAULT_PROFILE)
+            for i in range(changed):
+                note = NoteFile(os.path.join(Profile.noteDir("md", "B"), f"{i}.json"))
+                meta, content = note.load()
+                note.save(meta, content + "\n- B老师的补充")
+            manager = MarkdownWidgetManager()
+            QApplication.processEvents()
+
+            def switch(name):
+                before = {id(widget) for widget in manager.widgets}
+                start = time.perf_counter()
+                manager.switchProfile(name)
+                QApplication.processEvents()  # 包括显示和绘制
+                elapsed = time.perf_counter() - start
+                return elapsed, len([widget for widget in manager.widgets if id(widget) in before])
+
+            manager.preloadProfiles()
+            QApplication.processEvents()
+            for name in ("B", Profile.DEFAULT_PROFILE):
+                elapsed, reused = switch(name)
+                print(f"profile notes={count} changed={changed} preloaded  -> {name:<3s} {elapsed * 1000:8.1f} ms  "
+                      f"reused in place={reused}")
+            manager.releasePreloaded()
+            elapsed, reused = switch("B")
+            print(f"profile notes={count} changed={changed} cold       -> B   {elapsed * 1000:8.1f} ms  reused in place={reused}")
+            for widget in manager.widgets:
+                manager.destroyWidget(widget)
+            manager.releasePreloaded()
+            QApplication.processEvents()
+        finally:
+            os.chdir(cwd)
+
+def bench_notes(count=3000):
+    """count条笔记（每20条有1条超过压缩阈值）的批量导入、导出、列出、删除速度，与逐条NoteFile.save对比"""
+    import json
+    import tempfile
+    from CPCore.NoteStore import NoteFile, COMPRESS_THRESHOLD
+    from CPCore import NoteBatch, Profile
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            records = [{"id": f"note-{i}", "kind": "md" if i % 4 else "html",
+                        "content": f"# 通知 {i}\n\n" + ("- 带齐课本\n" * (COMPRESS_THRESHOLD // 12 if i % 20 == 0 else 3))}
+                       for i in range(count)]
+            with open("notes.jsonl", "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+            def timed(label, action):
+                start = time.perf_counter()
+                action()
+                elapsed = time.perf_counter() - start
+                print(f"notes={count} {label:<10s} {elapsed * 1000:8.0f} ms  {count / elapsed:8.0f} notes/s")
+
+            def perNote():
+                for i, record in enumerate(records):
+                    note_dir = Profile.noteDir(record["kind"], "per-note")
+                    os.makedirs(note_dir, exist_ok=True)
+                    NoteFile(os.path.join(note_dir, record["id"] + ".json")).save(
+                        {"position": NoteBatch.gridPosition(i), "draggable": True}, record["content"])
+
+            os.makedirs(os.path.join(Profile.PROFILE_DIR, "per-note"))
+            timed("per-note", perNote)
+            timed("import", lambda: NoteBatch.importNotes("notes.jsonl"))
+            timed("reimport", lambda: NoteBatch.importNotes("notes.jsonl"))
+            timed("export", lambda: NoteBatch.exportNotes("export.jsonl"))
+            timed("export dir", lambda: NoteBatch.exportNotes("export"))
+            timed("list", lambda: sum(1 for _ in NoteBatch.iterNotes(NoteBatch.noteRoot())))
+            timed("delete", lambda: NoteBatch.deleteNotes(None))
+        finally:
+            os.chdir(cwd)
+
+BENCHMARKS = {
+    "style": bench_style,
+    "timers": bench_timers,
+    "bindings": bench_bindings,
+    "storage": bench_storage,
+    "startup": bench_startup,
+    "timetable": bench_timetable,
+    "quality": bench_quality,
+    "search": bench_search,
+    "profiles": bench_profiles,
+    "notes": bench_notes,
+}
+
+def run(names=None):
+    """
+    运行基准测试
+
+    :param names: 要运行的基准测试名称列表，为空时全部运行
+    """
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            print(f"未知的基准测试: {name}")
+            continue
+        BENCHMARKS[name]()
@@ -0,0 +1,325 @@
+import re
+import html
+import math
+import time
+from datetime import datetime
+from PySide6.QtWidgets import QLabel
+from PySide6.QtGui import QTextDocument, QTextCursor, QPainter, QPalette, QAbstractTextDocumentLayout
+from PySide6.QtCore import QEvent, QRectF, QSize
+from CPCore.Scheduler import scheduler
+
+# 模板占位符：{{名称}} 或 {{名称:参数}}
+PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*(?::([^}]*))?\}\}")
+WEEKDAYS = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"]
+
+class DataSource:
+    """
+    模板数据源
+
+    :param func: func(arg, now) -> str，now为本次刷新对齐后的datetime
+    :param resolution: 刷新周期（毫秒），也可以是根据参数返回周期的函数
+    """
+    def __init__(self, func, resolution=1000):
+        self.func = func
+        self.resolution = resolution
+
+    def resolutionFor(self, arg):
+        return self.resolution(arg) if callable(self.resolution) else self.resolution
+
+SOURCES = {}
+
+def registerSource(name, func, resolution=1000):
+    """注册模板数据源，名称即占位符中的{{name}}"""
+    SOURCES[name] = DataSource(func, resolution)
+
+def _time(arg, now):
+    return now.strftime(arg or "%H:%M:%S")
+
+def _date(arg, now):
+    return now.strftime(arg or "%Y-%m-%d")
+
+def _weekday(arg, now):
+    return WEEKDAYS[now.weekday()]
+
+def _countdown(arg, now):
+    # {{countdown:2026-06-07 09:00}} 显示“天 时:分:秒”，{{countdown:2026-06-07|d}} 只显示天数
+    target, _, unit = (arg or "").partition("|")
+    try:
+        target = datetime.fromisoformat(target.strip())
+    except ValueError:
+        return "?"
+    seconds = max(0, int((target - now).total_seconds()))
+    days, rest = divmod(seconds, 86400)
+    if unit == "d":
+        return str(days + (1 if rest else 0))
+    hours, rest = divmod(rest, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if unit == "m":
+        return f"{days}天 {hours:02d}:{minutes:02d}"
+    return f"{days}天 {hours:02d}:{minutes:02d}:{seconds:02d}"
+
+def _secondsResolution(fmt):
+    return 1000 if "%S" in fmt or "%X" in fmt or "%c" in fmt or "%T" in fmt else 60000
+
+registerSource("time", _time, lambda arg: _secondsResolution(arg or "%S"))
+registerSource("date", _date, 60000)
+registerSource("weekday", _weekday, 60000)
+registerSource("countdown", _countdown, lambda arg: 60000 if (arg or "").partition("|")[2] in ("d", "m") else 1000)
+
+class Binding:
+    """
+    一段内容里的全部占位符
+
+    模板先被替换成不会被Markdown/html改写的标记，渲染后的骨架只需在刷新时填入新值，
+    不必重新走一遍Markdown转换和图片处理。
+    """
+    def __init__(self, text):
+        self.fields = []  # (标记, 数据源名, 参数)
+
+        def replace(match):
+            name, arg = match.group(1), (match.group(2) or "").strip()
+            if name not in SOURCES:
+                return match.group(0)
+            token = f"cpbind{len(self.fields)}x"
+            self.fields.append((token, name, arg))
+            return token
+
+        self.skeleton = PLACEHOLDER_RE.sub(replace, text)
+        self.values = []
+        # 同一段内容里取最细的精度，没有占位符时为0
+        self.resolution = min((SOURCES[name].resolutionFor(arg) for _, name, arg in self.fields), default=0)
+
+    def fill(self, rendered, values):
+        for (token, _, _), value in zip(self.fields, values):
+            rendered = rendered.replace(token, html.escape(value))
+        return rendered
+
+def _units(text):
+    # QTextDocument中的位置按UTF-16计
+    return len(text.encode("utf-16-le")) // 2
+
+class BoundLabel(QLabel):
+    """
+    显示带绑定的富文本的标签
+
+    内容变化时整段设置一次html，并记下每个占位符的值在文档中的位置；之后每次刷新只用光标改写值变了的几个字，
+    文档只重新排版被改动的段落。改写后文字的宽度和高度都没变时不需要重新计算窗口大小，只重绘标签。
+    占位符不在可见文字里（如写在链接地址中）时退回整段重新设置。
+    继承QLabel只为沿用按QLabel和#noteText写的样式表，文字由自己的文档绘制，不使用setText。
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWordWrap(True)
+        # 图片缓存通过findChild(QTextDocument)把图片注册到这个文档的资源里
+        self.document = QTextDocument(self)
+        self.document.setDocumentMargin(0)
+        self.document.setUndoRedoEnabled(False)
+        self.document.setDefaultFont(self.font())
+        self.rendered = ""
+        self.binding = None
+        self.spans = []  # [占位符序号, 起点, 长度]，按文档中的顺序
+        self.shown = []
+        self.extent = None  # 上次的(最宽一行, 高度)
+        self.hints = {}  # 缓存的sizeHint和minimumSizeHint，每次计算都要重新排版整个文档
+
+    def setContent(self, rendered, binding):
+        """内容变化时调用，rendered为带占位标记的html"""
+        self.rendered = rendered
+        self.binding = binding
+        self.document.setHtml(rendered)
+        found = []
+        for index, (token, _, _) in enumerate(binding.fields):
+            cursor = self.document.find(token, 0, QTextDocument.FindFlag.FindCaseSensitively)
+            if cursor.isNull():
+                found = None
+                break
+            found.append([index, cursor.selectionStart(), _units(token)])
+        if found is None:
+            self.spans = None
+            self.document.setHtml(binding.fill(rendered, binding.values))
+        else:
+            # 从后往前替换，前面记下的位置不受影响
+            found.sort(key=lambda span: span[1])
+            cursor = QTextCursor(self.document)
+            for span in reversed(found):
+                self.replace(cursor, span, binding.values[span[0]])
+            shift = 0
+            for span in found:
+                span[1] += shift
+                shift += _units(binding.values[span[0]]) - _units(binding.fields[span[0]][0])
+                span[2] = _units(binding.values[span[0]])
+            self.spans = found
+        self.shown = list(binding.values)
+        self.extent = None
+        self.invalidate()
+        self.update()
+
+    def replace(self, cursor, span, value):
+        cursor.setPosition(span[1])
+        cursor.setPosition(span[1] + span[2], QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(value)  # 沿用被替换文字的格式
+
+    def setValues(self, values):
+        """
+        刷新占位符的值，只重绘改动的段落
+
+        :return: 文字的宽度或高度是否变化，变化时窗口需要重新计算大小
+        """
+        changed = []  # 改动过的位置
+        if self.spans is None:
+            self.document.setHtml(self.binding.fill(self.rendered, values))
+            changed = None
+        else:
+            cursor = QTextCursor(self.document)
+            cursor.beginEditBlock()
+            shift = 0
+            for span in self.spans:
+                span[1] += shift
+                value = values[span[0]]
+                if value != self.shown[span[0]]:
+                    self.replace(cursor, span, value)
+                    shift += _units(value) - span[2]
+                    span[2] = _units(value)
+                    changed.append(span[1])
+            cursor.endEditBlock()
+        self.shown = list(values)
+        extent = self.measure()
+        if extent != self.extent:
+            self.extent = extent
+            self.update()
+            self.invalidate()
+            return True
+        if changed is None:
+            self.update()
+        else:
+            # 宽高不变时其他段落的位置也不变；段落的矩形不含列表和缩进的偏移，横向按整个标签重绘
+            layout = self.document.documentLayout()
+            rect = self.contentsRect()
+            for position in changed:
+                block = layout.blockBoundingRect(self.document.findBlock(position))
+                self.update(rect.left(), rect.top() + math.floor(block.top()), rect.width(), math.ceil(block.height()) + 1)
+        return False
+
+    def invalidate(self):
+        self.hints = {}
+        self.updateGeometry()
+
+    def measure(self):
+        self.document.setTextWidth(self.contentsRect().width())
+        return (math.ceil(self.document.idealWidth()), math.ceil(self.document.size().height()))
+
+    def heightForWidth(self, width):
+        margins = self.contentsMargins()
+        self.document.setTextWidth(max(0, width - margins.left() - margins.right()))
+        return math.ceil(self.document.size().height()) + margins.top() + margins.bottom()
+
+    def hasHeightForWidth(self):
+        return True
+
+    def sizeForWidth(self, width):
+        """文字宽度为width时文档的大小，width为None时由文档按内容选一个合适的宽度（与自动换行的QLabel相同）"""
+        if width is None:
+            self.document.adjustSize()
+        else:
+            self.document.setTextWidth(width)
+        size = self.document.size()
+        margins = self.contentsMargins()
+        return QSize(math.ceil(size.width()) + margins.left() + margins.right(),
+                     math.ceil(size.height()) + margins.top() + margins.bottom())
+
+    def sizeHint(self):
+        if "size" not in self.hints:
+            self.hints["size"] = self.sizeForWidth(None)
+        return self.hints["size"]
+
+    def minimumSizeHint(self):
+        # 与QLabel相同：宽度为尽量换行后最宽的词或图片，高度为不换行时的高度
+        if "minimum" not in self.hints:
+            self.hints["minimum"] = QSize(self.sizeForWidth(0).width(),
+                                          min(self.sizeForWidth(1 << 24).height(), self.sizeHint().height()))
+        return self.hints["minimum"]
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.extent = self.measure()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.FontChange:
+            self.document.setDefaultFont(self.font())  # 样式表设置的字号
+            self.extent = None
+            self.invalidate()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = self.contentsRect()
+        painter.translate(rect.topLeft())
+        self.document.setTextWidth(rect.width())
+        context = QAbstractTextDocumentLayout.PaintContext()
+        context.palette = self.palette()
+        context.palette.setColor(QPalette.ColorRole.Text, self.palette().color(self.foregroundRole()))  # 样式表的color
+        context.clip = QRectF(event.rect().translated(-rect.topLeft()))
+        self.document.documentLayout().draw(painter, context)
+
+class BindingHub:
+    """
+    所有小组件的绑定共用的刷新中心
+
+    每种精度只向共享调度器注册一个任务；同一轮里相同的数据源只计算一次，值没变的小组件不会重绘。
+    """
+    def __init__(self):
+        self.subscribers = {}  # 小组件 -> Binding
+        self.jobs = {}  # 精度 -> 调度器任务
+
+    def bind(self, widget, text):
+        """
+        解析内容并把小组件挂到对应精度的刷新任务上
+
+        小组件需要实现renderBinding()，在值变化时用binding.fill重新填入骨架。
+        """
+        self.unbind(widget)
+        binding = Binding(text)
+        if binding.fields:
+            self.subscribers[widget] = binding
+            binding.values = self.evaluate(binding, {}, datetime.now().replace(microsecond=0))
+            if binding.resolution not in self.jobs:
+                self.jobs[binding.resolution] = scheduler().register(
+                    binding.resolution, lambda r=binding.resolution: self.tick(r), f"binding-{binding.resolution}",
+                    tolerance=0)
+        return binding
+
+    def unbind(self, widget):
+        if self.subscribers.pop(widget, None) is not None:
+            used = {binding.resolution for binding in self.subscribers.values()}
+            for resolution in [r for r in self.jobs if r not in used]:
+                scheduler().unregister(self.jobs.pop(resolution))
+
+    def evaluate(self, binding, memo, now):
+        values = []
+        for _, name, arg in binding.fields:
+            key = (name, arg)
+            if key not in memo:
+                memo[key] = SOURCES[name].func(arg, now)
+            values.append(memo[key])
+        return values
+
+    def tick(self, resolution):
+        memo = {}
+        # 取整到本轮精度的边界，定时器稍早或稍晚唤醒都不会显示错一秒
+        now = datetime.fromtimestamp(round(time.time() * 1000 / resolution) * resolution / 1000)
+        for widget, binding in list(self.subscribers.items()):
+            if binding.resolution != resolution:
+                continue
+            values = self.evaluate(binding, memo, now)
+            if values != binding.values:
+                binding.values = values
+                widget.renderBinding()
+
+_binding_hub = None
+
+def bindingHub():
+    """获取进程级的绑定刷新中心"""
+    global _binding_hub
+    if _binding_hub is None:
+        _binding_hub = BindingHub()
+    return _binding_hub
@@ -0,0 +1,316 @@
+import sys
+import json
+import time
+import uuid
+import socket
+import struct
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from CPCore import Weather
+
+# 局域网内发现天气节点用的组播地址
+GROUP = "239.255.42.99"
+DISCOVERY_PORT = 8766
+HTTP_PORT = 8765
+
+class TTLCache:
+    """带过期时间的线程安全缓存"""
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                return None
+            return entry[1]
+
+    def remaining(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            return max(0, entry[0] - time.time()) if entry else 0
+
+    def put(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+
+class _WeatherHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        node = self.server.node
+        url = urlparse(self.path)
+        if url.path != "/weather" or not node.is_leader:
+            # 不是leader时拒绝，让请求方重新发现
+            self.send_error(503 if url.path == "/weather" else 404)
+            return
+        try:
+            cityid = int(parse_qs(url.query)["cityid"][0])
+            data, ttl = node.localWeather(cityid)
+        except (KeyError, ValueError):
+            self.send_error(400)
+            return
+        except Exception as e:
+            self.send_error(502, str(e))
+            return
+        body = json.dumps({"data": data, "ttl": ttl}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class FleetNode:
+    """
+    局域网集群节点：整个学校只由一个节点请求天气接口，其他节点通过HTTP从它那里读取
+
+    :param role: "server"：本机负责请求天气接口；"client"：只从server读取；"auto"：通过组播自动选举，
+        最早启动的节点当选
+    :param server: role为client时server的"主机:端口"
+    :param port: 本机提供天气数据的HTTP端口，0表示随机
+    :param ttl: 天气数据缓存秒数
+    :param upstream: 请求天气接口的函数，默认为Weather.fetch
+    """
+    def __init__(self, role="auto", server="", port=HTTP_PORT, discovery_port=DISCOVERY_PORT,
+                 group=GROUP, interface="0.0.0.0", ttl=600, upstream=None):
+        self.role = role
+        self.server_address = server
+        self.port = port
+        self.discovery_port = discovery_port
+        self.group = group
+        self.interface = interface
+        self.upstream = upstream or Weather.fetch
+        self.cache = TTLCache(ttl)
+        # 越早启动的节点id越小，选举时优先
+        self.node_id = f"{time.time():017.6f}-{uuid.uuid4().hex[:8]}"
+        self.is_leader = role == "server"
+        self.leader = None  # (节点id, 主机, 端口)
+        self.leader_found = threading.Event()  # 本轮选举有了结果（找到leader或自己当选）
+        self.electing = None  # 正在选举时为等待回应的截止时间（单调时钟）
+        self.elected = None  # 选举有结果时在套接字线程里调用的无参函数
+        self.last_known = {}  # 城市 -> 最近一次取到的数据，选举期间代替过期的缓存
+        self.started = False
+        self.fetch_lock = threading.Lock()
+        self.upstream_requests = 0
+        self.http = None
+        self.sock = None
+
+    @classmethod
+    def fromSettings(cls, settings):
+        return cls(role=settings.get("role", "auto"), server=settings.get("server", ""),
+                   port=settings.get("port", HTTP_PORT), discovery_port=settings.get("discovery_port", DISCOVERY_PORT),
+                   interface=settings.get("interface", "0.0.0.0"), ttl=settings.get("ttl", 600))
+
+    def start(self):
+        self.started = True
+        if self.role in ("server", "auto"):
+            self.http = ThreadingHTTPServer(("", self.port), _WeatherHandler)
+            self.http.node = self
+            self.port = self.http.server_address[1]
+            threading.Thread(target=self.http.serve_forever, daemon=True).start()
+        if self.role == "client":
+            host, _, port = self.server_address.partition(":")
+            self.leader = ("", host, int(port or HTTP_PORT))
+        elif self.role == "auto":
+            self.openDiscovery()
+            threading.Thread(target=self.listen, daemon=True).start()
+            self.discover()
+
+    def stop(self):
+        if self.http is not None:
+            self.http.shutdown()
+            self.http.server_close()  # 否则端口仍在监听，其他节点连上后只能等到超时
+        if self.sock is not None:
+            self.sock.close()
+
+    def openDiscovery(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.sock.bind(("", self.discovery_port))
+        membership = struct.pack("4s4s", socket.inet_aton(self.group), socket.inet_aton(self.interface))
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.interface))
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+
+    def send(self, message):
+        message["id"] = self.node_id
+        self.sock.sendto(json.dumps(message).encode("utf-8"), (self.group, self.discovery_port))
+
+    def announce(self):
+        self.send({"type": "announce", "port": self.port})
+
+    def listen(self):
+        while True:
+            electing = self.electing
+            try:
+                # 没有选举时一直阻塞；settimeout(0)会变成非阻塞，所以至少留1毫秒
+                self.sock.settimeout(None if electing is None else max(0.001, electing - time.monotonic()))
+                payload, address = self.sock.recvfrom(1024)
+                message = json.loads(payload.decode("utf-8"))
+            except socket.timeout:
+                message = None  # 选举的截止时间到了
+            except OSError:
+                return  # 套接字已关闭
+            except ValueError:
+                continue
+            try:
+                if message is None:
+                    self.elect()
+                elif message.get("id") == self.node_id:
+                    continue
+                elif message.get("type") == "query" and self.is_leader:
+                    self.announce()
+                elif message.get("type") == "announce":
+                    self.handleAnnounce(message["id"], address[0], message["port"])
+            except OSError:
+                return  # 回应之前套接字被stop关闭
+
+    def handleAnnounce(self, node_id, host, port):
+        if self.is_leader:
+            if node_id < self.node_id:
+                self.is_leader = False  # 有更早启动的leader，让位
+            else:
+                self.announce()  # 让后来者知道已经有更早的leader
+                return
+        if self.leader is None or node_id <= self.leader[0]:
+            self.leader = (node_id, host, port)
+            if self.electing is not None:
+                self.electing = None
+                self.decided()
+
+    def discover(self, wait=0.5):
+        """
+        在局域网内寻找leader，不等待回应
+
+        回应由套接字线程处理，wait秒内没有回应时也由它让本机当选，界面线程不会被阻塞。
+        """
+        self.leader = None
+        self.leader_found.clear()
+        self.electing = time.monotonic() + wait
+        self.send({"type": "query"})  # 组播回环回来的这条查询会唤醒套接字线程，让它按新的截止时间等待
+
+    def elect(self):
+        """截止时间已过仍没有回应，自己当选（在套接字线程里调用）"""
+        self.electing = None
+        if self.leader is None:
+            self.is_leader = True
+            self.announce()
+        self.decided()
+
+    def decided(self):
+        self.leader_found.set()
+        if self.elected is not None:
+            self.elected()
+
+    def localWeather(self, cityid):
+        """leader本地取数据：缓存未过期时直接返回，否则请求一次天气接口"""
+        with self.fetch_lock:
+            data = self.cache.get(cityid)
+            if data is None:
+                self.upstream_requests += 1
+                data = self.upstream(cityid)
+                self.cache.put(cityid, data)
+            return data, self.cache.remaining(cityid)
+
+    def getWeather(self, cityid):
+        """
+        :return: 天气数据；正在选举leader时返回上次取到的数据，还从没取到过时返回None，
+            选举有结果后调用elected，由调用方再取一次
+        """
+        if self.is_leader:
+            return self.remember(cityid, self.localWeather(cityid)[0])
+        data = self.cache.get(cityid)
+        if data is not None:
+            return data
+        if self.role == "auto" and self.leader is None:
+            if self.electing is None:
+                self.discover()
+            return self.last_known.get(cityid)
+        import requests
+        if self.leader is not None:
+            _, host, port = self.leader
+            try:
+                response = requests.get(f"http://{host}:{port}/weather", params={"cityid": cityid}, timeout=2)
+                response.raise_for_status()
+                payload = response.json()
+                self.cache.put(cityid, payload["data"], payload["ttl"])
+                return self.remember(cityid, payload["data"])
+            except (requests.RequestException, ValueError, KeyError):
+                if self.role == "auto":
+                    self.discover()  # leader失联，重新选举
+                    return self.last_known.get(cityid)
+        # 集群不可用时退回直接请求
+        return self.remember(cityid, self.localWeather(cityid)[0])
+
+    def remember(self, cityid, data):
+        self.last_known[cityid] = data
+        return data
+
+def run_stub_upstream():
+    """启动一个本地的假天气接口，返回(server, 地址模板)"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.server.hits += 1
+            body = json.dumps({"current": {"weather": "0", "temperature": {"value": "20", "unit": "℃"}}}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.hits = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/weather?cityid={{cityid}}"
+
+def run_node(args):
+    """
+    模拟集群里的一台机器（由simulate在子进程中启动）
+
+    :param args: [上游地址模板, 组播端口, 请求次数, 存活秒数]
+    """
+    url, discovery_port, rounds, linger = args[0], int(args[1]), int(args[2]), float(args[3])
+    node = FleetNode(role="auto", port=0, discovery_port=discovery_port, interface="127.0.0.1",
+                     upstream=lambda cityid: Weather.fetch(cityid, url=url))
+    node.start()
+    node.leader_found.wait(2)
+    ok = 0
+    for _ in range(rounds):
+        data = node.getWeather(101010100)
+        if data is None:  # leader刚好失联，等重新选举
+            node.leader_found.wait(2)
+            data = node.getWeather(101010100)
+        if data is not None and "current" in data:
+            ok += 1
+        if not node.is_leader:
+            node.cache.put(101010100, None, 0)  # 每轮都清掉本地缓存，模拟多次刷新
+    print(json.dumps({"id": node.node_id, "leader": node.is_leader, "ok": ok, "upstream": node.upstream_requests}), flush=True)
+    time.sleep(linger)  # leader要继续为晚到的节点服务
+    node.stop()
+
+def simulate(nodes=5, rounds=3):
+    """在本机用多个进程和一个假天气接口验证：N台机器只产生1次外部请求"""
+    import random
+    import subprocess
+    server, url = run_stub_upstream()
+    discovery_port = random.randint(20000, 40000)
+    processes = []
+    for i in range(nodes):
+        processes.append(subprocess.Popen(
+            [sys.executable, sys.argv[0], "fleet-node", url, str(discovery_port), str(rounds), str(nodes * 0.3 + 2)],
+            stdout=subprocess.PIPE, text=True))
+        time.sleep(0.3)  # 错开启动，接近真实开机
+    results = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in processes]
+    leaders = sum(1 for r in results if r["leader"])
+    ok = sum(r["ok"] for r in results)
+    print(f"fleet  nodes={nodes} requests={nodes * rounds} ok={ok} leaders={leaders} upstream-requests={server.hits}")
+    server.shutdown()
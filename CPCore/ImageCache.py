@@ -0,0 +1,203 @@
+import os
+import re
+import base64
+import hashlib
+from html import unescape
+from collections import OrderedDict
+from PySide6.QtGui import QImage, QPixmap, QTextDocument
+from PySide6.QtCore import Qt, QUrl, QByteArray
+
+# 匹配<img>标签（引号里的>不算结束）及其中的属性；属性从标签名之后逐个取，引号中的内容整体属于一个值，
+# 不会把alt="x src=y"里的src、data-src或srcset当成src
+IMG_TAG_RE = re.compile(r"""<img\b(?:"[^"]*"|'[^']*'|[^'">])*>""", re.IGNORECASE)
+ATTR_RE = re.compile(r"""([^\s"'<>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?""")
+
+class ImageCache:
+    """
+    进程级图片资源缓存
+
+    同一张图片只解码一次，按显示尺寸缩放后在所有小组件间共享，超出内存预算时按LRU淘汰。
+    已经加进小组件文档资源里的图片淘汰了也释放不了内存，所以由文档持有期间不淘汰、照常计入占用，
+    文档内容更换或销毁后才可以淘汰。
+
+    :param budget_bytes: 内存预算（字节）
+    """
+    def __init__(self, budget_bytes=32 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (QImage/QPixmap, 字节数)
+        self.pins = {}  # key -> 持有它的文档数
+        self.held = {}  # 文档 -> 它持有的key
+
+    def _put(self, key, value, size):
+        if key in self._entries:
+            self.used_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.used_bytes += size
+        self.evict()
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def evict(self, budget_bytes=None):
+        """按LRU淘汰没有文档持有的缓存项，直到占用不超过预算"""
+        budget = self.budget_bytes if budget_bytes is None else budget_bytes
+        for key in list(self._entries):
+            if self.used_bytes <= budget:
+                break
+            if key not in self.pins:
+                self.used_bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        """丢掉所有没有文档持有的缓存项"""
+        self.evict(0)
+
+    def hold(self, document, keys):
+        document.setProperty("cpimgHeld", True)  # 每个文档只连接一次destroyed
+        self.held[document] = keys
+        for key in keys:
+            self.pins[key] = self.pins.get(key, 0) + 1
+
+    def release(self, document):
+        """文档不再使用之前加入的图片（已经clear或销毁）"""
+        for key in self.held.pop(document, ()):
+            self.pins[key] -= 1
+            if not self.pins[key]:
+                del self.pins[key]
+        self.evict()
+
+    def decode(self, src):
+        """解码图片源（本地文件或data URI），结果缓存为QImage"""
+        key = ("src", src)
+        image = self._get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+        self.misses += 1
+        image = QImage()
+        if src.startswith("data:"):
+            header, _, payload = src.partition(",")
+            if header.endswith(";base64"):
+                data = base64.b64decode(payload)
+            else:
+                data = QUrl.fromPercentEncoding(payload.encode("utf-8")).encode("utf-8")
+            image.loadFromData(QByteArray(data))
+        else:
+            path = QUrl(src).toLocalFile() if src.startswith("file:") else src
+            if os.path.exists(path):
+                image.load(path)
+        if image.isNull():
+            return None
+        self._put(key, image, image.sizeInBytes())
+        return image
+
+    def pixmap(self, src, width=0, height=0, ratio=1.0):
+        """获取按显示尺寸缩放后的共享QPixmap"""
+        key = _pixmapKey(src, width, height, ratio)
+        pixmap = self._get(key)
+        if pixmap is not None:
+            self.hits += 1
+            return pixmap
+        image = self.decode(src)
+        if image is None:
+            return None
+        if width or height:
+            # 只给出一边时按原图比例计算另一边
+            if not width:
+                width = round(image.width() * height / image.height())
+            if not height:
+                height = round(image.height() * width / image.width())
+            image = image.scaled(round(width * ratio), round(height * ratio),
+                                 Qt.AspectRatioMode.IgnoreAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(ratio)
+        self._put(key, pixmap, pixmap.width() * pixmap.height() * pixmap.depth() // 8)
+        return pixmap
+
+    def prepareHtml(self, html):
+        """
+        将html中可缓存的<img>改写为缓存资源地址
+
+        :return: (改写后的html, {资源地址: (src, width, height)})
+        """
+        resources = {}
+
+        def replace(match):
+            tag = match.group(0)
+            attrs = {}
+            spans = {}
+            for attr in ATTR_RE.finditer(tag, len("<img"), len(tag) - 1):
+                name = attr.group(1).lower()
+                if name not in attrs:  # 重复的属性以第一个为准
+                    attrs[name] = unescape(next((v for v in attr.groups()[1:] if v is not None), ""))
+                    spans[name] = attr.span()
+            src = attrs.get("src", "")
+            if not src or src.startswith(("http:", "https:", "cpimg:")):
+                return tag
+            width = _toInt(attrs.get("width"))
+            height = _toInt(attrs.get("height"))
+            digest = hashlib.sha1(src.encode("utf-8")).hexdigest()[:16]
+            url = f"cpimg://{digest}/{width}x{height}"
+            resources[url] = (src, width, height)
+            start, end = spans["src"]
+            return f'{tag[:start]}src="{url}"{tag[end:]}'
+
+        return IMG_TAG_RE.sub(replace, html), resources
+
+    def setLabelHtml(self, label, html):
+        """把html设置到QLabel上，图片资源从缓存中共享"""
+        label.setText(self.prepareLabel(label, html))
+
+    def prepareLabel(self, label, html):
+        """把html中的图片从缓存注册到QLabel的文档资源里，返回改写后可直接setText的html"""
+        html, resources = self.prepareHtml(html)
+        document = label.findChild(QTextDocument)
+        if document is not None and document in self.held:
+            # 内容要整个换掉，旧图片随资源一起清掉，否则文档会一直引用着它们
+            document.clear()
+            self.release(document)
+        if not resources:
+            return html
+        if document is None:
+            # QLabel在首次显示富文本时才创建内部文档
+            label.setText("<p></p>")
+            document = label.findChild(QTextDocument)
+        ratio = label.devicePixelRatioF()
+        keys = set()
+        for url, (src, width, height) in resources.items():
+            pixmap = self.pixmap(src, width, height, ratio)
+            if pixmap is not None:
+                document.addResource(QTextDocument.ResourceType.ImageResource, QUrl(url), pixmap)
+                keys.add(_pixmapKey(src, width, height, ratio))
+        if not document.property("cpimgHeld"):
+            document.destroyed.connect(lambda: self.release(document))
+        self.hold(document, keys)
+        return html
+
+def _pixmapKey(src, width, height, ratio):
+    return ("pixmap", src, width, height, ratio)
+
+def _toInt(value):
+    try:
+        return int(str(value).strip().lower().removesuffix("px"))
+    except (TypeError, ValueError):
+        return 0
+
+_image_cache = None
+
+def imageCache():
+    """获取进程级共享的图片缓存"""
+    global _image_cache
+    if _image_cache is None:
+        from CPCore.Memory import memoryAccountant
+        _image_cache = ImageCache()
+        # 仍在显示的图片由小组件的文档持有，释放缓存时只丢掉没有显示的
+        memoryAccountant().register("image-cache", lambda: _image_cache.used_bytes, _image_cache.clear)
+    return _image_cache
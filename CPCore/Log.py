@@ -0,0 +1,159 @@
+import os
+import re
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from PySide6.QtCore import QObject, Signal
+from CPCore.Settings import load_app_settings
+
+# 每个进程一个日志文件，写满后轮换
+LOG_DIR = "data/logs"
+# 内存中保留的最近日志条数
+RING_SIZE = 500
+NUMBER_RE = re.compile(r"\d+")
+
+_process_name = ""
+_listener = None
+_ring = deque(maxlen=RING_SIZE)
+
+def entryOf(record):
+    """把日志记录转换成结构化的字典，文件和环形缓冲区共用"""
+    entry = {"time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+             "level": record.levelname, "process": _process_name, "logger": record.name,
+             "message": record.getMessage()}
+    if getattr(record, "fields", None):
+        entry["fields"] = record.fields
+    if getattr(record, "repeated", 0):
+        entry["repeated"] = record.repeated
+    if record.exc_text:
+        entry["exception"] = record.exc_text
+    return entry
+
+class JsonFormatter(logging.Formatter):
+    """每条日志一行JSON"""
+    def format(self, record):
+        return json.dumps(entryOf(record), ensure_ascii=False)
+
+class RateLimitFilter(logging.Filter):
+    """
+    重复的警告和错误去重限速
+
+    同一位置、同一消息（数字忽略）、同一异常类型的记录在interval秒内只放行第一条，
+    之后放行的那条带上期间被压下的次数（repeated）。DEBUG和INFO不受限制。
+    """
+    def __init__(self, interval=60, max_keys=256):
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self.seen = OrderedDict()  # key -> [上次放行的时间, 之后被压下的次数]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.name, record.levelno, record.pathname, record.lineno,
+               NUMBER_RE.sub("#", record.getMessage()), record.exc_info[0] if record.exc_info else None)
+        with self.lock:
+            entry = self.seen.get(key)
+            if entry is not None and record.created - entry[0] < self.interval:
+                entry[1] += 1
+                return False
+            record.repeated = entry[1] if entry is not None else 0
+            self.seen[key] = [record.created, 0]
+            self.seen.move_to_end(key)
+            while len(self.seen) > self.max_keys:
+                self.seen.popitem(last=False)
+        return True
+
+class _AsyncHandler(QueueHandler):
+    """在调用线程里只做限速和格式化参数，写文件等都交给后台线程"""
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class RingHandler(logging.Handler):
+    def emit(self, record):
+        _ring.append(entryOf(record))
+
+class Notifier(QObject):
+    """需要让用户看到的日志，由界面线程接收后以非模态的方式显示"""
+    notice = Signal(str, str)  # 消息, 级别名
+
+class NoticeHandler(logging.Handler):
+    """
+    把需要提示的记录转发给Notifier
+
+    extra={"notify": True}的记录和ERROR以上的记录会提示，extra={"notify": False}可以只写日志。
+    """
+    def __init__(self, notifier):
+        super().__init__()
+        self.notifier = notifier
+
+    def emit(self, record):
+        if not getattr(record, "notify", record.levelno >= logging.ERROR):
+            return
+        message = record.getMessage()
+        if getattr(record, "repeated", 0):
+            message += f"（此前重复{record.repeated}次）"
+        self.notifier.notice.emit(message, record.levelname)
+
+_notifier = Notifier()
+
+def notifier():
+    """获取进程级的提示信号源"""
+    return _notifier
+
+def setup(process_name, settings=None):
+    """
+    配置本进程的日志，进程启动时调用一次
+
+    根日志器只挂一个异步的QueueHandler，限速在调用线程里完成，被压下的记录不会进入队列；
+    后台线程把记录写入data/logs/<进程>.log（JSON行，轮换保留）、内存环形缓冲区和界面提示。
+
+    :param settings: data/app.json中的logging配置，默认读取
+    """
+    global _process_name, _listener
+    if _listener is not None:
+        return
+    settings = load_app_settings().get("logging", {}) if settings is None else settings
+    _process_name = process_name
+    os.makedirs(LOG_DIR, exist_ok=True)
+    file_handler = RotatingFileHandler(os.path.join(LOG_DIR, f"{process_name}.log"), encoding="utf-8",
+                                       maxBytes=settings.get("max_kb", 1024) * 1024,
+                                       backupCount=settings.get("backups", 3), delay=True)
+    file_handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    handler = _AsyncHandler(log_queue)
+    handler.addFilter(RateLimitFilter(settings.get("dedup_seconds", 60)))
+    root = logging.getLogger()
+    root.setLevel(settings.get("level", "INFO"))
+    root.addHandler(handler)
+    _listener = QueueListener(log_queue, file_handler, RingHandler(), NoticeHandler(_notifier))
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    previous_hook = sys.excepthook
+
+    def excepthook(exc_type, value, tb):
+        # Qt槽函数里未捕获的异常也会走到这里
+        logging.getLogger("uncaught").error("未捕获的异常: %s", value, exc_info=(exc_type, value, tb))
+        previous_hook(exc_type, value, tb)
+
+    sys.excepthook = excepthook
+
+def recent(count=50, level=logging.DEBUG):
+    """内存中最近的count条不低于level的日志"""
+    threshold = level if isinstance(level, int) else logging.getLevelName(level)
+    entries = [entry for entry in list(_ring) if logging.getLevelName(entry["level"]) >= threshold]
+    return entries[-count:]
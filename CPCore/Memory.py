@@ -0,0 +1,185 @@
+import os
+import sys
+import gc
+import json
+import time
+import ctypes
+import tracemalloc
+from PySide6.QtCore import QObject
+from CPCore.Scheduler import scheduler
+from CPCore.Settings import load_app_settings
+from CPCore.NoteStore import writeAtomic
+
+# 各进程把自己的内存报告写到这里，托盘读取后汇总显示
+REPORT_DIR = "data/memory"
+
+def processRss():
+    """当前进程的常驻内存（字节），无法获取时返回0"""
+    if sys.platform == "win32":
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return 0
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def surfaceBytes(widget):
+    """顶层窗口或图片的像素缓冲区字节数（按32位色、当前DPI估算）"""
+    ratio = widget.devicePixelRatioF() if hasattr(widget, "devicePixelRatioF") else 1.0
+    return int(widget.width() * ratio) * int(widget.height() * ratio) * 4
+
+def deepSize(value):
+    """容器及其中字符串/数字的大致字节数，用于估算城市列表等纯Python数据"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deepSize(k) + deepSize(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(deepSize(item) for item in value)
+    return size
+
+class MemoryAccountant(QObject):
+    """
+    进程内存记账和回收
+
+    各子系统用register登记“占用多少”和“如何释放”。每30秒检查一次：常驻内存超过预算时释放所有子系统，
+    用户空闲超过设定时间或锁屏/关屏挂起时释放允许空闲释放的子系统。每次检查的结果写入data/memory/，
+    托盘菜单据此显示各进程的占用。开启tracemalloc采样后还会按模块统计Python对象的分配。
+    """
+    def __init__(self, settings=None):
+        super().__init__()
+        settings = settings or {}
+        self.budget = settings.get("budget_mb", 200) * 1024 * 1024
+        self.idle_seconds = settings.get("idle_trim_minutes", 10) * 60
+        self.trace = settings.get("tracemalloc", False)
+        self.subsystems = {}  # 名称 -> (measure, trim, on_idle)
+        self.process_name = ""
+        self.job = None
+        self.idle_trimmed = False
+        self.trims = []  # 最近的(时间, 原因, 释放字节数)
+
+    def register(self, name, measure, trim=None, on_idle=True):
+        """
+        登记一个子系统
+
+        :param measure: 返回当前占用字节数的无参函数
+        :param trim: 释放内存的无参函数，为None时只记账
+        :param on_idle: 空闲时是否也释放；为False时只在超出预算时释放（如预先创建好的考试窗口）
+        """
+        self.subsystems[name] = (measure, trim, on_idle)
+
+    def unregister(self, name):
+        self.subsystems.pop(name, None)
+
+    def start(self, process_name):
+        """在进程的事件循环就绪后开始定期检查"""
+        from CPCore.SystemState import systemState
+        self.process_name = process_name
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+        self.system_state = systemState()
+        scheduler().suspendedChanged.connect(self.suspendedChanged)
+        self.job = scheduler().register(30000, self.check, "memory")
+        self.check()
+
+    def usage(self):
+        subsystems = {}
+        for name, (measure, _, _) in self.subsystems.items():
+            try:
+                subsystems[name] = int(measure())
+            except Exception:
+                subsystems[name] = 0  # 子系统正在销毁
+        return {"process": self.process_name, "pid": os.getpid(), "time": time.time(), "rss": processRss(),
+                "budget": self.budget, "subsystems": subsystems, "python": self.pythonUsage(),
+                "trims": self.trims[-5:]}
+
+    def pythonUsage(self):
+        """按模块汇总tracemalloc采样到的Python分配，未开启时返回空"""
+        if not tracemalloc.is_tracing():
+            return {}
+        modules = {}
+        for stat in tracemalloc.take_snapshot().statistics("filename"):
+            path = stat.traceback[0].filename.replace("\\", "/")
+            if "/CPCore/" in path or "/CPBlock/" in path:
+                module = "/".join(path.rsplit("/", 2)[-2:])
+            elif "site-packages/" in path:
+                module = path.split("site-packages/", 1)[1].split("/", 1)[0]
+            else:
+                module = "other"
+            modules[module] = modules.get(module, 0) + stat.size
+        return dict(sorted(modules.items(), key=lambda item: -item[1])[:10])
+
+    def trim(self, reason, idle=False):
+        """释放子系统占用的内存，idle为True时跳过只在超出预算时释放的子系统"""
+        before = processRss()
+        for name, (_, trim, on_idle) in list(self.subsystems.items()):
+            if trim is not None and (on_idle or not idle):
+                trim()
+        gc.collect()
+        self.trims.append((time.time(), reason, max(0, before - processRss())))
+        del self.trims[:-20]
+
+    def check(self):
+        usage = self.usage()
+        if usage["rss"] > self.budget:
+            self.trim("budget")
+            usage = self.usage()
+        idle = self.system_state.idleSeconds() >= self.idle_seconds
+        if idle and not self.idle_trimmed:
+            self.trim("idle", idle=True)
+            usage = self.usage()
+        self.idle_trimmed = idle
+        self.writeReport(usage)
+
+    def suspendedChanged(self, suspended):
+        # 锁屏、关屏、演示期间没人看桌面，顺便释放
+        if suspended:
+            self.trim("suspend", idle=True)
+
+    def writeReport(self, usage):
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        writeAtomic(os.path.join(REPORT_DIR, f"{self.process_name}.json"),
+                    json.dumps(usage, indent=4, ensure_ascii=False).encode("utf-8"))
+
+def readReports(max_age=120):
+    """读取各进程最近的内存报告，忽略已经退出的进程留下的旧报告"""
+    reports = []
+    if not os.path.isdir(REPORT_DIR):
+        return reports
+    for filename in sorted(os.listdir(REPORT_DIR)):
+        try:
+            with open(os.path.join(REPORT_DIR, filename), "r") as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if time.time() - report.get("time", 0) <= max_age:
+            reports.append(report)
+    return reports
+
+def summary():
+    """托盘显示用的内存占用摘要"""
+    lines = [f"托盘 {processRss() / 1048576:.0f} MB"]
+    for report in readReports():
+        parts = [f"{name} {size / 1048576:.1f}" for name, size in report["subsystems"].items() if size >= 51200]
+        line = f"{report['process']} {report['rss'] / 1048576:.0f}/{report['budget'] / 1048576:.0f} MB"
+        lines.append(line + (f"（{'，'.join(parts)} MB）" if parts else ""))
+    return "\n".join(lines)
+
+_memory_accountant = None
+
+def memoryAccountant():
+    """获取进程级的内存记账器，预算等配置来自data/app.json中的memory"""
+    global _memory_accountant
+    if _memory_accountant is None:
+        _memory_accountant = MemoryAccountant(load_app_settings().get("memory"))
+    return _memory_accountant
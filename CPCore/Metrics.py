@@ -0,0 +1,146 @@
+import logging
+from PySide6.QtCore import QObject
+from PySide6.QtNetwork import QTcpServer, QHostAddress
+from CPCore.Settings import load_app_settings
+
+log = logging.getLogger(__name__)
+
+# data/app.json中metrics.port为快速启动栏的端口，笔记进程依次加一
+PORT_OFFSETS = {"qs": 0, "mdwidget": 1, "htmlwidget": 2}
+DEFAULT_PORT = 9464
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Counter:
+    """只增不减的计数器，热路径上只是一次整数加法"""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+class Summary:
+    """耗时等观测值的次数和总和，平均值和速率由监控端计算"""
+    __slots__ = ("count", "sum")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+
+class MetricsRegistry:
+    """
+    进程内的指标
+
+    计数器和摘要由各模块在导入时创建、在热路径上直接累加；控件数、内存等当前值登记为测量函数，
+    只在被抓取时调用。同名指标按标签区分。
+    """
+    def __init__(self):
+        self.families = {}  # 名称 -> [类型, 说明, {标签: 来源}]
+        self.labels = {}  # 所有指标共有的标签（进程名）
+
+    def family(self, name, kind, doc):
+        return self.families.setdefault(name, [kind, doc, {}])[2]
+
+    def counter(self, name, doc, **labels):
+        return self.family(name, "counter", doc).setdefault(tuple(sorted(labels.items())), Counter())
+
+    def summary(self, name, doc, **labels):
+        return self.family(name, "summary", doc).setdefault(tuple(sorted(labels.items())), Summary())
+
+    def register(self, name, doc, measure, kind="gauge", **labels):
+        """
+        登记一个测量函数，同名同标签的会被替换
+
+        :param measure: 返回当前值的无参函数
+        :param kind: gauge，或者由别处累计的counter（如图片缓存的命中次数）
+        """
+        self.family(name, kind, doc)[tuple(sorted(labels.items()))] = measure
+
+    def render(self):
+        """Prometheus文本格式"""
+        lines = []
+        for name, (kind, doc, series) in sorted(self.families.items()):
+            lines.append(f"# HELP {name} {doc}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, source in series.items():
+                text = formatLabels({**self.labels, **dict(labels)})
+                if isinstance(source, Summary):
+                    lines.append(f"{name}_sum{text} {source.sum}")
+                    lines.append(f"{name}_count{text} {source.count}")
+                    continue
+                try:
+                    value = source.value if isinstance(source, Counter) else source()
+                except Exception:
+                    continue  # 对应的对象正在销毁
+                lines.append(f"{name}{text} {value}")
+        return "\n".join(lines) + "\n"
+
+def formatLabels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+_metrics = MetricsRegistry()
+
+def metrics():
+    """获取进程级的指标"""
+    return _metrics
+
+class MetricsServer(QObject):
+    """
+    只监听本机地址的HTTP服务，GET /metrics返回全部指标
+
+    跑在界面线程的事件循环里，只在被抓取时工作，不额外唤醒进程。
+    """
+    def __init__(self, port):
+        super().__init__()
+        self.server = QTcpServer(self)
+        self.server.newConnection.connect(self.accept)
+        if not self.server.listen(QHostAddress(QHostAddress.SpecialAddress.LocalHost), port):
+            log.warning("指标端口%d无法监听: %s", port, self.server.errorString())
+
+    def accept(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self.handle(socket))
+            socket.disconnected.connect(socket.deleteLater)  # 否则每次抓取都留下一个server的子对象
+
+    def handle(self, socket):
+        if not socket.canReadLine():
+            return  # 请求行还没收完整
+        request = bytes(socket.readLine()).decode("latin-1").split()
+        if len(request) >= 2 and request[0] == "GET" and request[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", metrics().render().encode("utf-8")
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        socket.write(f"HTTP/1.1 {status}\r\nContent-Type: {CONTENT_TYPE}\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + body)
+        socket.disconnectFromHost()  # 等数据写完后再断开
+
+_server = None
+
+def start(process_name, settings=None):
+    """
+    按data/app.json中的metrics配置（默认关闭）开始提供指标，进程的事件循环就绪后调用一次
+
+    :param settings: metrics配置，如{"enabled": true, "port": 9464}，默认读取
+    """
+    global _server
+    settings = load_app_settings().get("metrics", {}) if settings is None else settings
+    if _server is not None or not settings.get("enabled", False):
+        return
+    from CPCore.Memory import processRss
+    from CPCore.Scheduler import scheduler
+    from CPCore.ImageCache import imageCache
+    _metrics.labels = {"process": process_name}
+    _metrics.register("classpro_resident_memory_bytes", "进程的常驻内存", processRss)
+    _metrics.register("classpro_timer_wakeups_per_second", "中央调度器最近10秒每秒的唤醒次数", scheduler().wakeupRate)
+    _metrics.register("classpro_image_cache_hits_total", "图片缓存命中次数", lambda: imageCache().hits, kind="counter")
+    _metrics.register("classpro_image_cache_misses_total", "图片缓存未命中次数", lambda: imageCache().misses, kind="counter")
+    _server = MetricsServer(settings.get("port", DEFAULT_PORT) + PORT_OFFSETS.get(process_name, 0))
@@ -0,0 +1,354 @@
+import os
+import sys
+import json
+import uuid
+import shutil
+import hashlib
+import tempfile
+from CPCore.NoteStore import NoteFile, writeAtomic, isNoteId
+from CPCore import Profile
+
+# 笔记根目录（<配置>/note）下未完成的批量操作记录和暂存目录
+JOURNAL = ".batch-journal.json"
+STAGING_PREFIX = ".batch-"
+# 批量操作从暂存到执行完日志期间一直持有的锁，recover拿不到锁时不动任何文件
+LOCK = ".batch.lock"
+EXTENSIONS = {".md": "md", ".markdown": "md", ".html": "html", ".htm": "html"}
+SUFFIXES = {"md": ".md", "html": ".html"}
+# 目录导出时与正文文件放在一起的元数据清单
+MANIFEST = "manifest.jsonl"
+
+class NoteBatch:
+    """
+    一批笔记的写入和删除，作为一个整体提交
+
+    所有文件先写进笔记根目录下的暂存目录（同一文件系统，之后的替换是原子的），
+    然后原子地写出记录本批全部替换和删除的日志，再按日志执行。日志写出之前中断，笔记目录没有任何变化；
+    之后中断，下次运行recover时按日志补完。同一批里每条笔记只能出现一次。
+    整个过程持有笔记根目录的锁，期间启动的笔记进程不会清理本批的暂存文件；另一批正在进行时抛出OSError。
+
+    :param note_root: 笔记根目录，其下为md和html目录
+    """
+    def __init__(self, note_root):
+        self.note_root = note_root
+        os.makedirs(note_root, exist_ok=True)
+        self.lock = lockFile(os.path.join(note_root, LOCK))
+        if self.lock is None:
+            raise OSError("另一个批量操作正在进行")
+        self.staging = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=note_root)
+        self.moves = []  # (暂存文件, 目标, 摘要)，正文在元数据之前
+        self.deletes = []
+        self.ids = set()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def claim(self, kind, note_id):
+        if kind not in SUFFIXES or not isNoteId(note_id):
+            raise ValueError(f"无效的笔记: {kind}/{note_id}")
+        if (kind, note_id) in self.ids:
+            raise ValueError(f"同一批中重复的笔记: {kind}/{note_id}")
+        self.ids.add((kind, note_id))
+        return NoteFile(os.path.join(self.note_root, kind, f"{note_id}.json"))
+
+    def put(self, kind, note_id, meta, content):
+        """新建或覆盖一条笔记"""
+        note = self.claim(kind, note_id)
+        content_path, encode_content, meta_data = note.encode(meta, content)
+        for target, data in ((content_path, encode_content()), (note.config_path, meta_data)):
+            staged = os.path.join(self.staging, str(len(self.moves)))
+            with open(staged, "wb") as f:
+                f.write(data)
+            self.moves.append((staged, target, hashlib.sha256(data).hexdigest()))
+        # 旧的另一种格式的正文和外观已经过时的快照
+        self.deletes += [note.stalePath(content_path), note.snapshotPath()]
+
+    def delete(self, kind, note_id):
+        note = self.claim(kind, note_id)
+        self.deletes += [note.config_path, note.snapshotPath()] + note.contentPaths()  # 元数据最先删
+
+    def commit(self):
+        journal = {"staging": self.staging, "moves": self.moves, "deletes": self.deletes}
+        try:
+            writeAtomic(os.path.join(self.note_root, JOURNAL), json.dumps(journal, ensure_ascii=False).encode("utf-8"))
+            replay(self.note_root, journal)
+        finally:
+            self.lock.close()
+
+    def abort(self):
+        shutil.rmtree(self.staging, ignore_errors=True)
+        self.lock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+def lockFile(path):
+    """
+    以独占方式锁住path（不存在时创建），拿不到时返回None
+
+    :return: 打开的文件，关闭或进程退出时释放锁
+    """
+    f = open(path, "a+b")
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+def fileDigest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def replay(note_root, journal):
+    """
+    按日志执行替换和删除，可以重复执行，调用方要持有锁
+
+    暂存文件不在时，只有目标与日志记下的摘要一致才算这一步已经做过；否则日志和文件对不上，
+    不做任何改动、保留日志并抛出OSError，免得照常执行删除、丢掉唯一一份正文。
+    """
+    for staged, target, digest in journal["moves"]:
+        if not os.path.exists(staged) and fileDigest(target) != digest:
+            raise OSError(f"批量操作的暂存文件丢失，已保留日志{JOURNAL}: {staged}")
+    for kind in SUFFIXES:
+        os.makedirs(os.path.join(note_root, kind), exist_ok=True)
+    for staged, target, _ in journal["moves"]:
+        if os.path.exists(staged):
+            os.replace(staged, target)
+    for path in journal["deletes"]:
+        if os.path.exists(path):
+            os.remove(path)
+    os.remove(os.path.join(note_root, JOURNAL))
+    cleanup(note_root)
+
+def cleanup(note_root):
+    """删除没有日志引用的暂存目录，调用方要持有锁"""
+    if os.path.exists(os.path.join(note_root, JOURNAL)):
+        return  # 日志还要用到暂存文件
+    for name in os.listdir(note_root):
+        if name.startswith(STAGING_PREFIX) and os.path.isdir(os.path.join(note_root, name)):
+            shutil.rmtree(os.path.join(note_root, name), ignore_errors=True)
+
+def recover(note_root):
+    """
+    补完上次中断的批量操作，清理没有提交的暂存文件；笔记进程启动和每个命令开始时调用
+
+    另一个进程的批量操作正在进行时什么都不做，由它自己完成。日志和文件对不上时抛出OSError并保留日志。
+    """
+    if not os.path.isdir(note_root):
+        return
+    lock = lockFile(os.path.join(note_root, LOCK))
+    if lock is None:
+        return
+    try:
+        path = os.path.join(note_root, JOURNAL)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                replay(note_root, json.load(f))
+        else:
+            cleanup(note_root)
+    finally:
+        lock.close()
+
+def noteRoot(profile=None):
+    return os.path.dirname(Profile.noteDir("md", profile))
+
+def iterNotes(note_root, kinds=SUFFIXES):
+    """(种类, 笔记, 元数据, 正文)，按文件名排序"""
+    for kind in kinds:
+        note_dir = os.path.join(note_root, kind)
+        if not os.path.isdir(note_dir):
+            continue
+        for filename in sorted(os.listdir(note_dir)):
+            if filename.endswith(".json"):
+                meta, content = NoteFile(os.path.join(note_dir, filename)).load()
+                meta.pop("content_file", None)
+                meta.pop("content", None)
+                yield kind, filename[:-len(".json")], meta, content
+
+def gridPosition(index):
+    """没有位置的笔记按网格排开，超出一屏后错开重叠"""
+    return {"x": 40 + index % 6 * 220 + index // 30 % 5 * 20, "y": 40 + index // 6 % 5 * 160 + index // 30 % 5 * 20}
+
+def readRecords(source, kind=None):
+    """
+    读取要导入的笔记
+
+    JSONL每行一条：{"id", "kind", "content", "position", "draggable", "style", ...}，只有content必填；
+    目录中每个.md/.html文件一条，文件名（不含扩展名）作为笔记，清单manifest.jsonl中有同名记录时使用其中的元数据。
+    """
+    if os.path.isdir(source):
+        manifest = {}
+        if os.path.exists(os.path.join(source, MANIFEST)):
+            with open(os.path.join(source, MANIFEST), "r", encoding="utf-8") as f:
+                manifest = {record["id"]: record for record in map(json.loads, filter(str.strip, f))}
+        for filename in sorted(os.listdir(source)):
+            stem, extension = os.path.splitext(filename)
+            if extension.lower() not in EXTENSIONS:
+                continue
+            with open(os.path.join(source, filename), "r", encoding="utf-8-sig") as f:
+                content = f.read()
+            yield dict(manifest.get(stem, {}), id=stem, kind=EXTENSIONS[extension.lower()], content=content)
+        return
+    f = sys.stdin if source == "-" else open(source, "r", encoding="utf-8-sig")
+    try:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record.get("content"), str):
+                    raise ValueError("缺少content")
+            except ValueError as e:
+                raise ValueError(f"第{number}行: {e}") from None
+            if kind is not None:
+                record.setdefault("kind", kind)
+            yield record
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def noteId(value):
+    """导入记录中的笔记名；不能直接作为文件名的按名称生成固定的uuid，重复导入时覆盖而不是新增"""
+    if value is None:
+        return str(uuid.uuid4())
+    value = str(value)
+    return value if isNoteId(value) else str(uuid.uuid5(uuid.NAMESPACE_URL, value))
+
+def importNotes(source, profile=None, kind=None, replace=False):
+    """
+    把source中的笔记作为一批写入配置的笔记目录，任何一条出错时都不写入
+
+    :param kind: 记录中没有kind时的种类，默认md
+    :param replace: 同时删除导入的种类中不在source里的笔记
+    :return: (写入条数, 删除条数)
+    """
+    note_root = noteRoot(profile)
+    recover(note_root)
+    with NoteBatch(note_root) as batch:
+        written = {}
+        for index, record in enumerate(readRecords(source, kind)):
+            record = dict(record)
+            note_kind = record.pop("kind", None) or kind or "md"
+            note_id = noteId(record.pop("id", None))
+            content = record.pop("content")
+            meta = {"position": gridPosition(index), "draggable": True}
+            meta.update(record)
+            batch.put(note_kind, note_id, meta, content)
+            written.setdefault(note_kind, set()).add(note_id)
+        removed = 0
+        if replace:
+            for note_kind, ids in written.items():
+                for existing_kind, note_id, _, _ in list(iterNotes(note_root, [note_kind])):
+                    if note_id not in ids:
+                        batch.delete(existing_kind, note_id)
+                        removed += 1
+    return sum(map(len, written.values())), removed
+
+def exportNotes(target, profile=None, kinds=SUFFIXES):
+    """
+    导出为JSONL（target为.jsonl文件或-）或目录（每条笔记一个正文文件，外加manifest.jsonl）
+
+    :return: 导出条数
+    """
+    note_root = noteRoot(profile)
+    recover(note_root)
+    count = 0
+    if target == "-" or target.endswith(".jsonl"):
+        f = sys.stdout if target == "-" else open(target, "w", encoding="utf-8")
+        try:
+            for kind, note_id, meta, content in iterNotes(note_root, kinds):
+                f.write(json.dumps(dict(meta, id=note_id, kind=kind, content=content), ensure_ascii=False) + "\n")
+                count += 1
+        finally:
+            if f is not sys.stdout:
+                f.close()
+        return count
+    os.makedirs(target, exist_ok=True)
+    with open(os.path.join(target, MANIFEST), "w", encoding="utf-8") as manifest:
+        for kind, note_id, meta, content in iterNotes(note_root, kinds):
+            with open(os.path.join(target, note_id + SUFFIXES[kind]), "w", encoding="utf-8") as f:
+                f.write(content)
+            manifest.write(json.dumps(dict(meta, id=note_id, kind=kind), ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+def deleteNotes(ids, profile=None, kinds=SUFFIXES):
+    """
+    作为一批删除笔记，ids为None时删除kinds中的全部笔记
+
+    :return: 删除条数
+    """
+    note_root = noteRoot(profile)
+    recover(note_root)
+    existing = [(kind, name[:-len(".json")]) for kind in kinds if os.path.isdir(os.path.join(note_root, kind))
+                for name in sorted(os.listdir(os.path.join(note_root, kind))) if name.endswith(".json")]
+    targets = existing if ids is None else [(kind, note_id) for kind, note_id in existing if note_id in ids]
+    with NoteBatch(note_root) as batch:
+        for kind, note_id in targets:
+            batch.delete(kind, note_id)
+    return len(targets)
+
+def option(args, name, default=None):
+    """取出args中的 --name 值，返回值并从args中移除"""
+    if name not in args:
+        return default
+    index = args.index(name)
+    value = args[index + 1] if index + 1 < len(args) else default
+    del args[index:index + 2]
+    return value
+
+def main(args):
+    """
+    springboard.py notes <命令> [--profile 配置] [--kind md|html]
+
+    list：列出笔记
+    import <JSONL文件|目录|-> [--replace]：批量导入，同名笔记覆盖；--replace同时删除不在导入内容中的笔记
+    export <JSONL文件|目录|->：批量导出
+    delete <笔记...>|--all：批量删除
+
+    不启动界面；正在运行的笔记进程在下次启动时显示变化。
+    """
+    args = list(args)
+    profile = option(args, "--profile")
+    kind = option(args, "--kind")
+    kinds = [kind] if kind else list(SUFFIXES)
+    command = args[0] if args else None
+    try:
+        if command == "list":
+            note_root = noteRoot(profile)
+            recover(note_root)
+            count = 0
+            for note_kind, note_id, meta, content in iterNotes(note_root, kinds):
+                position = meta.get("position", {})
+                first_line = next((line.strip() for line in content.splitlines() if line.strip()), "")
+                print(f"{note_kind:<4s} {note_id}  ({position.get('x')}, {position.get('y')})  {first_line[:40]}")
+                count += 1
+            print(f"共 {count} 条", file=sys.stderr)
+        elif command == "import" and len(args) > 1:
+            written, removed = importNotes(args[1], profile, kind, replace="--replace" in args)
+            print(f"已导入 {written} 条，删除 {removed} 条")
+        elif command == "export" and len(args) > 1:
+            count = exportNotes(args[1], profile, kinds)
+            print(f"已导出 {count} 条", file=sys.stderr)
+        elif command == "delete" and len(args) > 1:
+            print(f"已删除 {deleteNotes(None if '--all' in args else set(args[1:]), profile, kinds)} 条")
+        else:
+            print(main.__doc__)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"操作失败，笔记没有任何变化: {e}", file=sys.stderr)
+        sys.exit(1)
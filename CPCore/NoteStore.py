@@ -0,0 +1,132 @@
+import os
+import re
+import gzip
+import json
+import base64
+import tempfile
+from CPCore.Metrics import metrics
+
+# 正文超过这个大小时压缩保存（内嵌data URI图片的html笔记可达数MB）
+COMPRESS_THRESHOLD = 64 * 1024
+NOTE_WRITES = metrics().counter("classpro_config_writes_total", "配置和笔记文件的写盘次数", file="note")
+# 笔记的文件名（不含扩展名），本机新建的是uuid
+NOTE_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+def isNoteId(value):
+    """能否直接用作笔记文件名，从外部（同步源、导入文件）来的名字都要先检查，防止写到笔记目录之外"""
+    return isinstance(value, str) and NOTE_ID_RE.fullmatch(value) is not None
+
+def writeAtomic(path, data):
+    """先写临时文件再替换，运行中的小组件不会读到写了一半的文件"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+class NoteFile:
+    """
+    一条笔记的存储
+
+    config_path（<uuid>.json）只保存位置、是否可拖动、样式等元数据；正文以UTF-8原文保存在旁边的
+    <uuid>.content中，较大时压缩为<uuid>.content.gz。读取位置不需要解析和解码正文，
+    保存时元数据和正文各自只在变化时写入。旧版把正文base64编码后放在json里的文件可以直接读取，
+    下次保存时自动转换成新格式。
+    """
+    def __init__(self, config_path):
+        self.config_path = config_path
+        self.base = os.path.splitext(config_path)[0]
+        self.saved_meta = None
+        self.saved_content = None
+
+    def loadMeta(self):
+        with open(self.config_path, "rb") as f:
+            data = f.read()
+        meta = json.loads(data)
+        self.saved_meta = data
+        return meta
+
+    def loadContent(self, meta=None):
+        """读取正文，meta为loadMeta的结果，省略时重新读取元数据"""
+        if meta is None:
+            meta = self.loadMeta()
+        if "content" in meta:
+            content = base64.b64decode(meta["content"]).decode("utf-8")  # 旧格式
+        else:
+            path = os.path.join(os.path.dirname(self.config_path), meta["content_file"])
+            if path.endswith(".gz"):
+                with gzip.open(path, "rb") as f:
+                    content = f.read().decode("utf-8")
+            else:
+                with open(path, "rb") as f:
+                    content = f.read().decode("utf-8")
+        self.saved_content = content
+        return content
+
+    def load(self):
+        meta = self.loadMeta()
+        return meta, self.loadContent(meta)
+
+    def contentPaths(self):
+        return [self.base + ".content", self.base + ".content.gz"]
+
+    def snapshotPath(self):
+        """小组件上次外观的PNG快照，只在本机使用，不参与同步"""
+        return self.base + ".snapshot.png"
+
+    def save(self, meta, content):
+        """
+        保存笔记，没有变化的部分不会写盘
+
+        :param meta: 元数据，不含正文
+        :param content: 正文
+        :return: 正文是否有变化
+        """
+        content_path, encode_content, meta_data = self.encode(meta, content)
+        changed = content != self.saved_content
+        if changed or not os.path.exists(content_path):
+            writeAtomic(content_path, encode_content())
+            NOTE_WRITES.inc()
+            self.saved_content = content
+        # 正文写好后再写元数据，中途退出时元数据总是指向完整的正文
+        if meta_data != self.saved_meta:
+            writeAtomic(self.config_path, meta_data)
+            NOTE_WRITES.inc()
+            self.saved_meta = meta_data
+        stale = self.stalePath(content_path)
+        if os.path.exists(stale):
+            os.remove(stale)
+        return changed
+
+    def encode(self, meta, content):
+        """
+        按存储格式编码，批量写入时也用它
+
+        :return: (正文文件路径, 返回正文字节的函数, 元数据字节)，正文只在需要写盘时才编码和压缩
+        """
+        compressed = len(content) > COMPRESS_THRESHOLD
+        content_path = self.contentPaths()[compressed]
+        meta = dict(meta, content_file=os.path.basename(content_path))
+        meta_data = json.dumps(meta, indent=4, ensure_ascii=False).encode("utf-8")
+
+        def encodeContent():
+            data = content.encode("utf-8")
+            return gzip.compress(data) if compressed else data
+
+        return content_path, encodeContent, meta_data
+
+    def stalePath(self, content_path):
+        """另一种格式（压缩或不压缩）的正文文件，保存后应当删除"""
+        paths = self.contentPaths()
+        return paths[1] if content_path == paths[0] else paths[0]
+
+    def delete(self):
+        for path in [self.config_path, self.snapshotPath()] + self.contentPaths():
+            if os.path.exists(path):
+                os.remove(path)
+        self.saved_meta = None
+        self.saved_content = None
+
+def loadMeta(config_path):
+    """只读取一条笔记的元数据（位置等），不读取正文"""
+    return NoteFile(config_path).loadMeta()
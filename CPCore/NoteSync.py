@@ -0,0 +1,290 @@
+import os
+import gzip
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from PySide6.QtCore import QObject, Signal
+from CPCore.Scheduler import scheduler
+from CPCore.NoteStore import NoteFile, writeAtomic, isNoteId
+
+# 每种笔记在本机的目录，和发布目录中的子目录同名
+NOTE_KINDS = ("md", "html")
+
+def noteHash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def packNote(config_path):
+    """把一条笔记（元数据和正文）打包成与存储格式无关的传输内容"""
+    meta, content = NoteFile(config_path).load()
+    meta = {key: value for key, value in meta.items() if key not in ("content", "content_file")}
+    return json.dumps({"meta": meta, "content": content}, sort_keys=True, ensure_ascii=False).encode("utf-8")
+
+def publish(out_dir, note_root="data/note"):
+    """
+    把本机的笔记发布成可供同步的笔记集
+
+    out_dir下生成manifest.json.gz（每条笔记的内容哈希）、manifest.sha256（清单本身的哈希，
+    客户端轮询时只读这一个小文件）和<种类>/<uuid>.json.gz（压缩后的笔记），哈希没变的笔记不会重新压缩。
+
+    :return: 本次新写入的笔记数
+    """
+    manifest_path = os.path.join(out_dir, "manifest.json.gz")
+    old = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "rb") as f:
+            old = json.loads(gzip.decompress(f.read())).get("notes", {})
+    notes = {}
+    written = 0
+    for kind in NOTE_KINDS:
+        source_dir = os.path.join(note_root, kind)
+        os.makedirs(os.path.join(out_dir, kind), exist_ok=True)
+        if not os.path.isdir(source_dir):
+            continue
+        for filename in os.listdir(source_dir):
+            if not filename.endswith(".json"):
+                continue
+            data = packNote(os.path.join(source_dir, filename))
+            key = f"{kind}/{filename[:-len('.json')]}"
+            notes[key] = noteHash(data)
+            blob_path = os.path.join(out_dir, key + ".json.gz")
+            if old.get(key) != notes[key] or not os.path.exists(blob_path):
+                writeAtomic(blob_path, gzip.compress(data))
+                written += 1
+    for key in old:
+        if key not in notes and os.path.exists(os.path.join(out_dir, key + ".json.gz")):
+            os.remove(os.path.join(out_dir, key + ".json.gz"))
+    manifest = json.dumps({"version": 1, "notes": notes}, sort_keys=True).encode("utf-8")
+    writeAtomic(manifest_path, gzip.compress(manifest))
+    writeAtomic(os.path.join(out_dir, "manifest.sha256"), noteHash(manifest).encode("utf-8"))
+    return written
+
+class SyncResult:
+    """一次拉取的结果：changes为{uuid: packNote打包的内容，删除时为None}"""
+    def __init__(self, changes, state, transferred):
+        self.changes = changes
+        self.state = state
+        self.transferred = transferred
+
+class SyncClient:
+    """
+    从共享文件夹或HTTP地址拉取某一种笔记
+
+    先比较清单的哈希，没变化时只读取几十字节；清单变化时按每条笔记的哈希和上次同步时记录的哈希比较，
+    变化的笔记才下载，本机新建的笔记不受影响。
+
+    :param source: 共享文件夹路径或http(s)地址
+    :param kind: "md"或"html"
+    """
+    def __init__(self, source, kind, note_root="data/note"):
+        self.source = source
+        self.kind = kind
+        self.note_dir = os.path.join(note_root, kind)
+        self.state_path = os.path.join(note_root, f"sync_state_{kind}.json")
+
+    def read(self, name):
+        if self.source.startswith(("http://", "https://")):
+            import requests
+            response = requests.get(self.source.rstrip("/") + "/" + name, timeout=10)
+            response.raise_for_status()
+            return response.content
+        with open(os.path.join(self.source, name), "rb") as f:
+            return f.read()
+
+    def loadState(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        return {"manifest": "", "notes": {}}
+
+    def owns(self, key):
+        """清单中的键是否为这种笔记；名字不是普通文件名的（如md/../../x）一律忽略，不下载也不写入"""
+        kind, _, note_id = key.partition("/")
+        return kind == self.kind and isNoteId(note_id)
+
+    def fetchChanges(self):
+        """下载有变化的笔记（可在后台线程中调用，不写本地文件）"""
+        state = self.loadState()
+        manifest_digest = self.read("manifest.sha256").decode("utf-8").strip()
+        transferred = len(manifest_digest)
+        if manifest_digest == state["manifest"]:
+            return SyncResult({}, state, transferred)
+        manifest_data = self.read("manifest.json.gz")
+        transferred += len(manifest_data)
+        manifest_data = gzip.decompress(manifest_data)
+        if noteHash(manifest_data) != manifest_digest:
+            return SyncResult({}, state, transferred)  # 发布方正在更新，下次再取
+        remote = {key: value for key, value in json.loads(manifest_data)["notes"].items() if self.owns(key)}
+        local = {key: value for key, value in state["notes"].items() if self.owns(key)}
+        state["notes"] = local
+        changes = {}
+        complete = True
+        for key, digest in remote.items():
+            if local.get(key) == digest:
+                continue
+            blob = self.read(key + ".json.gz")
+            transferred += len(blob)
+            data = gzip.decompress(blob)
+            if noteHash(data) != digest:
+                complete = False  # 发布方正在更新，下次再取
+                continue
+            changes[key.split("/", 1)[1]] = data
+            local[key] = digest
+        for key in [key for key in local if key not in remote]:
+            changes[key.split("/", 1)[1]] = None
+            del local[key]
+        if complete:
+            state["manifest"] = manifest_digest
+        return SyncResult(changes, state, transferred)
+
+    def writeChanges(self, result):
+        """把拉取结果写入本机笔记目录"""
+        invalid = [uuid for uuid in result.changes if not isNoteId(uuid)]
+        if invalid:
+            raise ValueError(f"无效的笔记名: {invalid[0]!r}")
+        os.makedirs(self.note_dir, exist_ok=True)
+        for uuid, data in result.changes.items():
+            note = NoteFile(os.path.join(self.note_dir, f"{uuid}.json"))
+            if data is None:
+                note.delete()
+            else:
+                bundle = json.loads(data)
+                note.save(bundle["meta"], bundle["content"])
+        writeAtomic(self.state_path, json.dumps(result.state, indent=4).encode("utf-8"))
+
+    def pull(self):
+        result = self.fetchChanges()
+        self.writeChanges(result)
+        return result
+
+class NoteSyncer(QObject):
+    """
+    运行中的小组件管理器使用的同步器
+
+    下载在后台线程进行，写文件和刷新小组件回到界面线程完成，避免和自动保存互相覆盖。
+    """
+    fetched = Signal(object)
+
+    def __init__(self, manager, kind, settings):
+        super().__init__()
+        self.manager = manager
+        self.client = SyncClient(settings["source"], kind)
+        self.busy = False
+        self.fetched.connect(self.apply)
+        self.job = scheduler().register(settings.get("interval", 300) * 1000, self.poll,
+                                        f"note-sync-{kind}", catch_up=True)
+        self.poll()
+
+    def poll(self):
+        if self.busy:
+            return
+        self.busy = True
+        threading.Thread(target=self.fetch, daemon=True).start()
+
+    def fetch(self):
+        try:
+            result = self.client.fetchChanges()
+        except Exception:
+            result = None  # 共享源暂时不可用，下次再试
+        self.fetched.emit(result)
+
+    def apply(self, result):
+        self.busy = False
+        if result is None or not result.changes:
+            return
+        self.client.writeChanges(result)
+        self.manager.applySync(result.changes)
+
+def serve(directory, port=8770):
+    """用HTTP提供一个已发布的笔记集"""
+    import functools
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(("", port), handler)
+    print(f"正在提供 {directory}，端口 {server.server_address[1]}")
+    server.serve_forever()
+
+def simulate(clients=50, notes=200, changed=5):
+    """
+    在本机模拟一个发布源和clients台客户端，验证只传输变化的笔记
+
+    先全量同步一次，再修改changed条笔记重新发布，比较两次传输的字节数并校验所有客户端内容一致。
+    """
+    import uuid
+    import functools
+    import time
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    root = tempfile.mkdtemp(prefix="cpsync-")
+    try:
+        admin = os.path.join(root, "admin")
+        published = os.path.join(root, "published")
+        os.makedirs(os.path.join(admin, "md"))
+        ids = [str(uuid.uuid4()) for _ in range(notes)]
+        for i, note_id in enumerate(ids):
+            NoteFile(os.path.join(admin, "md", f"{note_id}.json")).save(
+                {"position": {"x": 100, "y": 100 + i}, "draggable": True}, f"# 通知 {i}\n" * 20)
+        publish(published, admin)
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=published))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        source = f"http://127.0.0.1:{server.server_address[1]}"
+        client_roots = [os.path.join(root, f"client{i}") for i in range(clients)]
+
+        def pullAll():
+            start = time.perf_counter()
+            results = [SyncClient(source, "md", client_root).pull() for client_root in client_roots]
+            return time.perf_counter() - start, results
+
+        full_time, full = pullAll()
+        for note_id in ids[:changed]:
+            note = NoteFile(os.path.join(admin, "md", f"{note_id}.json"))
+            note.save(note.loadMeta(), "# 已更新\n")
+        publish(published, admin)
+        delta_time, delta = pullAll()
+        idle_time, idle = pullAll()
+        server.shutdown()
+
+        consistent = all(
+            sorted(os.listdir(os.path.join(client_root, "md"))) == sorted(os.listdir(os.path.join(admin, "md")))
+            for client_root in client_roots)
+        for note_id in ids[:changed]:
+            expected = packNote(os.path.join(admin, "md", f"{note_id}.json"))
+            for client_root in client_roots:
+                consistent = consistent and packNote(os.path.join(client_root, "md", f"{note_id}.json")) == expected
+        print(f"sync   clients={clients} notes={notes} "
+              f"full: {sum(r.transferred for r in full) / clients / 1024:8.1f} KiB/client {full_time * 1000:8.1f} ms | "
+              f"delta({changed} changed): {sum(r.transferred for r in delta) / clients / 1024:8.1f} KiB/client "
+              f"{sum(len(r.changes) for r in delta) // clients} notes/client {delta_time * 1000:8.1f} ms | "
+              f"unchanged: {sum(r.transferred for r in idle) // clients} B/client {idle_time * 1000:8.1f} ms | "
+              f"consistent={consistent}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def main(args):
+    """
+    springboard.py sync <命令>
+
+    publish <输出目录> [笔记目录]：发布笔记集
+    serve <目录> [端口]：用HTTP提供笔记集
+    pull <来源>：把来源中的md和html笔记同步到本机
+    sim [客户端数] [笔记数] [修改数]：本机模拟多客户端同步
+    """
+    command = args[0] if args else None
+    if command == "publish":
+        print(f"已写入 {publish(*args[1:3])} 条笔记")
+    elif command == "serve":
+        serve(args[1], int(args[2]) if len(args) > 2 else 8770)
+    elif command == "pull":
+        for kind in NOTE_KINDS:
+            result = SyncClient(args[1], kind).pull()
+            print(f"{kind}: 更新 {len(result.changes)} 条，传输 {result.transferred} 字节")
+    elif command == "sim":
+        simulate(*[int(arg) for arg in args[1:4]])
+    else:
+        print(main.__doc__)
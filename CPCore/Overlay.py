@@ -0,0 +1,118 @@
+from PySide6.QtWidgets import QWidget
+from PySide6.QtGui import QGuiApplication, QRegion
+from PySide6.QtCore import Qt, QPoint, QEvent, QTimer
+from CPCore.ScreenGeometry import screenCache
+from CPCore.Quality import renderQuality
+
+class OverlayWindow(QWidget):
+    """
+    单窗口合成模式下覆盖整个屏幕的透明宿主窗口
+
+    所有小组件作为它的子控件绘制，只占用一个原生窗口和一块合成缓冲区；
+    窗口遮罩随子控件区域更新，没有小组件的地方鼠标事件会穿透到桌面。
+    """
+    def __init__(self, screen):
+        super().__init__()
+        self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.Tool)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.setAttribute(Qt.WidgetAttribute.WA_NoSystemBackground)
+        renderQuality().watch(self, translucency=False)  # 宿主覆盖整个屏幕，必须保持透明
+        self.setScreen(screen)
+        self.setGeometry(screen.geometry())
+        screen.geometryChanged.connect(self.setGeometry)
+
+        self.mask_timer = QTimer(self)
+        self.mask_timer.setSingleShot(True)
+        self.mask_timer.timeout.connect(self.updateMask)
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QEvent.Type.Move, QEvent.Type.Resize, QEvent.Type.Show, QEvent.Type.Hide):
+            self.mask_timer.start(0)  # 合并同一轮事件循环中的多次更新
+        return False
+
+    def childEvent(self, event):
+        if event.child().isWidgetType():
+            if event.added():
+                event.child().installEventFilter(self)
+            self.mask_timer.start(0)
+        super().childEvent(event)
+
+    def updateMask(self):
+        """只有可见小组件所在区域接收输入"""
+        region = QRegion()
+        for child in self.children():
+            if isinstance(child, QWidget) and not child.isHidden():
+                region = region.united(child.geometry())
+        if region.isEmpty():
+            self.hide()
+            return
+        self.setMask(region)
+        if not self.isVisible():
+            self.show()
+
+class OverlayHost:
+    """按屏幕管理OverlayWindow，把小组件挂到其所在屏幕的宿主上"""
+    def __init__(self):
+        self.overlays = {}
+        app = QGuiApplication.instance()
+        for screen in app.screens():
+            self.addScreen(screen)
+        app.screenAdded.connect(self.addScreen)
+        app.screenRemoved.connect(self.removeScreen)
+
+    def addScreen(self, screen):
+        self.overlays[screen] = OverlayWindow(screen)
+
+    def removeScreen(self, screen):
+        overlay = self.overlays.pop(screen, None)
+        if overlay is None:
+            return
+        for child in overlay.findChildren(QWidget, options=Qt.FindChildOption.FindDirectChildrenOnly):
+            self.attach(child)
+        overlay.deleteLater()
+
+    def overlayAt(self, point):
+        screen = screenCache().screenAt(point).screen
+        if screen not in self.overlays:
+            self.addScreen(screen)
+        return self.overlays[screen]
+
+    def attach(self, widget):
+        """把小组件挂到它当前全局坐标所在屏幕的宿主窗口中"""
+        point = globalPos(widget)
+        overlay = self.overlayAt(point)
+        if widget.parentWidget() is overlay:
+            return
+        visible = widget.isVisible()
+        widget.setParent(overlay)
+        widget.move(overlay.mapFromGlobal(point))
+        if visible:
+            widget.show()
+
+def globalPos(widget):
+    """小组件左上角的全局坐标，独立窗口和宿主子控件两种模式通用"""
+    if widget.parentWidget() is None:
+        return widget.pos()
+    return widget.mapToGlobal(QPoint(0, 0))
+
+def moveGlobal(widget, point):
+    """按全局坐标移动小组件"""
+    parent = widget.parentWidget()
+    if parent is None:
+        widget.move(point)
+    else:
+        widget.move(parent.mapFromGlobal(point))
+
+def settle(widget):
+    """拖动结束后，如果小组件被拖到了另一块屏幕，改挂到该屏幕的宿主上"""
+    if isinstance(widget.parentWidget(), OverlayWindow) and _overlay_host is not None:
+        _overlay_host.attach(widget)
+
+_overlay_host = None
+
+def overlayHost():
+    """获取进程级的宿主管理器"""
+    global _overlay_host
+    if _overlay_host is None:
+        _overlay_host = OverlayHost()
+    return _overlay_host
@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+import shutil
+from PySide6.QtCore import QObject, QFileSystemWatcher, Signal
+from CPCore.Settings import load_app_settings, APP_SETTINGS_FILE
+from CPCore.NoteStore import writeAtomic
+
+# 默认配置沿用原来的data/note和data/qs.json，其他配置各自一个目录
+DEFAULT_PROFILE = "默认"
+PROFILE_DIR = "data/profiles"
+NOTE_KINDS = ("md", "html")
+
+def names():
+    """所有配置，默认配置在最前"""
+    others = sorted(name for name in os.listdir(PROFILE_DIR)
+                    if os.path.isdir(os.path.join(PROFILE_DIR, name))) if os.path.isdir(PROFILE_DIR) else []
+    return [DEFAULT_PROFILE] + others
+
+def current():
+    """data/app.json中记录的当前配置，配置已被删除时回到默认配置"""
+    try:
+        name = load_app_settings().get("profile", DEFAULT_PROFILE)
+    except (OSError, ValueError):
+        return DEFAULT_PROFILE
+    return name if name in names() else DEFAULT_PROFILE
+
+def root(name=None):
+    name = current() if name is None else name
+    return "data" if name == DEFAULT_PROFILE else os.path.join(PROFILE_DIR, name)
+
+def noteDir(kind, name=None):
+    """配置的笔记目录（md/html）"""
+    return os.path.join(root(name), "note", kind)
+
+def qsPath(name=None):
+    """配置的快速启动栏设置（应用列表、城市、位置等）"""
+    return os.path.join(root(name), "qs.json")
+
+def create(name, copy_from=None):
+    """
+    新建配置
+
+    :param copy_from: 复制哪个配置的笔记和快速启动栏设置，为None时新建空配置。
+        复制出来的笔记保留原来的文件名，切换时两边相同的笔记直接沿用正在显示的小组件。
+    """
+    if not name or name != os.path.basename(name) or name in (".", "..") or name in names():
+        raise ValueError(f"无效或已存在的配置名: {name}")
+    os.makedirs(os.path.join(PROFILE_DIR, name))
+    if copy_from is None:
+        return
+    for kind in NOTE_KINDS:
+        source = noteDir(kind, copy_from)
+        target = noteDir(kind, name)
+        os.makedirs(target, exist_ok=True)
+        if not os.path.isdir(source):
+            continue
+        for filename in os.listdir(source):
+            # 同步状态属于原配置，临时文件是写到一半的
+            if not filename.startswith("sync_state") and not filename.endswith(".tmp"):
+                shutil.copy2(os.path.join(source, filename), target)
+    if os.path.exists(qsPath(copy_from)):
+        shutil.copy2(qsPath(copy_from), qsPath(name))
+
+def delete(name):
+    if name == DEFAULT_PROFILE or name == current():
+        raise ValueError("不能删除默认配置或正在使用的配置")
+    if name not in names():
+        raise ValueError(f"没有这个配置: {name}")
+    shutil.rmtree(os.path.join(PROFILE_DIR, name))
+
+def switch(name):
+    """写入data/app.json，各进程的ProfileWatcher收到后就地切换"""
+    if name not in names():
+        raise ValueError(f"没有这个配置: {name}")
+    settings = load_app_settings()
+    settings["profile"] = name
+    os.makedirs(os.path.dirname(APP_SETTINGS_FILE), exist_ok=True)
+    writeAtomic(APP_SETTINGS_FILE, json.dumps(settings).encode("utf-8"))
+
+class ProfileWatcher(QObject):
+    """监视data/app.json，当前配置变化时发出switched"""
+    switched = Signal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.name = current()
+        self.watcher = QFileSystemWatcher(self)
+        if os.path.isdir(os.path.dirname(APP_SETTINGS_FILE)):
+            self.watcher.addPath(os.path.dirname(APP_SETTINGS_FILE))  # app.json还不存在或被整个替换时
+        if os.path.exists(APP_SETTINGS_FILE):
+            self.watcher.addPath(APP_SETTINGS_FILE)
+        self.watcher.fileChanged.connect(self.settingsChanged)
+        self.watcher.directoryChanged.connect(self.settingsChanged)
+
+    def settingsChanged(self, path):
+        if os.path.exists(APP_SETTINGS_FILE) and APP_SETTINGS_FILE not in self.watcher.files():
+            self.watcher.addPath(APP_SETTINGS_FILE)  # 文件被替换后要重新监视
+        name = current()
+        if name != self.name:
+            self.name = name
+            self.switched.emit(name)
+
+_profile_watcher = None
+
+def profileWatcher():
+    """获取进程级的配置切换通知"""
+    global _profile_watcher
+    if _profile_watcher is None:
+        _profile_watcher = ProfileWatcher()
+    return _profile_watcher
+
+def main(args):
+    """
+    springboard.py profile list|switch <名称>|create <名称> [--copy <来源>]|delete <名称>
+
+    切换只修改data/app.json，正在运行的快速启动栏和小组件进程会就地切换，不需要重启。
+    """
+    command = args[0] if args else "list"
+    name = args[1] if len(args) > 1 and args[1] != "--copy" else None
+    copy_from = args[args.index("--copy") + 1] if "--copy" in args[:-1] else None
+    try:
+        if command == "list":
+            active = current()
+            for profile in names():
+                counts = [len([f for f in os.listdir(noteDir(kind, profile)) if f.endswith(".json")])
+                          if os.path.isdir(noteDir(kind, profile)) else 0 for kind in NOTE_KINDS]
+                print(f"{'*' if profile == active else ' '} {profile}  md={counts[0]} html={counts[1]}")
+        elif command == "switch" and name:
+            switch(name)
+        elif command == "create" and name and ("--copy" not in args or copy_from):
+            create(name, copy_from)
+        elif command == "delete" and name:
+            delete(name)
+        else:
+            print(main.__doc__)
+    except (OSError, ValueError) as e:
+        print(f"操作失败: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,210 @@
+import os
+import time
+from collections import deque
+from PySide6.QtCore import QObject, QEvent, QFileSystemWatcher, Qt, Signal
+from PySide6.QtGui import QPainter, QColor
+from shiboken6 import isValid
+from CPCore.Settings import load_app_settings, APP_SETTINGS_FILE
+
+# 渲染等级，数字越大越省：依次关闭抗锯齿、动画、窗口透明
+FULL, NO_ANTIALIAS, NO_ANIMATION, OPAQUE = range(4)
+LEVEL_NAMES = ["完整效果", "关闭抗锯齿", "关闭动画", "关闭透明"]
+# 每收到这么多个样本评估一次，评估时取最近SAMPLE_WINDOW个样本的90百分位
+EVALUATE_EVERY = 20
+SAMPLE_WINDOW = 60
+# 90百分位低于预算的这个比例才算有余量，可以恢复一级
+HEADROOM = 0.5
+# 恢复后很快又降级时，下次恢复前的等待时间加倍，最长30分钟
+MIN_COOLDOWN = 30
+MAX_COOLDOWN = 1800
+
+def percentile(samples, ratio=0.9):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+class _AnimationProbe(QObject):
+    """记录一个动画相邻两帧的间隔"""
+    def __init__(self, animation, quality):
+        super().__init__(animation)
+        self.quality = quality
+        self.last = None
+        animation.valueChanged.connect(self.frame)
+        animation.stateChanged.connect(self.restart)
+
+    def frame(self, value):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.quality.addSample(self.quality.frames, (now - self.last) * 1000)
+        self.last = now
+
+    def restart(self, new_state, old_state):
+        self.last = None
+
+class RenderQuality(QObject):
+    """
+    按实测的绘制和帧时间自动调整渲染效果
+
+    watch过的窗口每次刷新（UpdateRequest，包括绘制所有子控件和提交到屏幕）都计时，watchAnimation过的动画记录帧间隔。
+    90百分位超过预算时降一级，依次关闭抗锯齿、动画、窗口透明；有足够余量且过了冷却时间后恢复一级。
+    data/app.json中rendering.mode不为auto时固定为指定等级，设置窗口修改后各进程立即生效。
+
+    :param settings: data/app.json中的rendering配置
+    """
+    levelChanged = Signal(int)
+
+    def __init__(self, settings=None):
+        super().__init__()
+        self.paints = deque(maxlen=SAMPLE_WINDOW)
+        self.frames = deque(maxlen=SAMPLE_WINDOW)
+        self.pending = 0
+        self.auto_level = FULL
+        self.changed_at = time.time()
+        self.cooldown = MIN_COOLDOWN
+        self.changes = []  # 最近的(时间, 原等级, 新等级, 原因)
+        self.windows = []
+        self.configure(settings)
+        self.watcher = QFileSystemWatcher(self)
+        if os.path.isdir(os.path.dirname(APP_SETTINGS_FILE)):
+            self.watcher.addPath(os.path.dirname(APP_SETTINGS_FILE))  # app.json还不存在或被整个替换时
+        if os.path.exists(APP_SETTINGS_FILE):
+            self.watcher.addPath(APP_SETTINGS_FILE)
+        self.watcher.fileChanged.connect(self.settingsChanged)
+        self.watcher.directoryChanged.connect(self.settingsChanged)
+
+    def configure(self, settings):
+        settings = settings or {}
+        self.mode = settings.get("mode", "auto")
+        self.paint_budget = settings.get("paint_budget_ms", 12)
+        self.frame_budget = settings.get("frame_budget_ms", 25)
+
+    @property
+    def level(self):
+        return self.auto_level if self.mode == "auto" else max(FULL, min(OPAQUE, int(self.mode)))
+
+    @property
+    def antialias(self):
+        return self.level < NO_ANTIALIAS
+
+    @property
+    def animations(self):
+        return self.level < NO_ANIMATION
+
+    @property
+    def translucent(self):
+        return self.level < OPAQUE
+
+    def watch(self, widget, translucency=True):
+        """
+        统计widget的刷新耗时，等级变化时重绘
+
+        :param translucency: 关闭透明时是否去掉窗口的透明背景（全屏宿主窗口必须保持透明）
+        """
+        widget.installEventFilter(self)
+        if translucency:
+            self.windows.append(widget)
+
+    def watchAnimation(self, animation):
+        _AnimationProbe(animation, self)
+
+    def eventFilter(self, obj, event):
+        if event.type() != QEvent.Type.UpdateRequest:
+            return False
+        start = time.perf_counter()
+        obj.event(event)  # 由这里分发，才能量到整次刷新的耗时
+        elapsed = (time.perf_counter() - start) * 1000
+        if obj.property("cpPainted"):
+            self.addSample(self.paints, elapsed)
+        else:
+            obj.setProperty("cpPainted", True)  # 第一次刷新包含创建原生窗口，不计入
+        return True
+
+    def addSample(self, samples, elapsed):
+        samples.append(elapsed)
+        self.pending += 1
+        if self.pending >= EVALUATE_EVERY:
+            self.pending = 0
+            self.evaluate()
+
+    def evaluate(self):
+        if self.mode != "auto":
+            return
+        paint = percentile(self.paints) if len(self.paints) >= EVALUATE_EVERY else 0
+        frame = percentile(self.frames) if len(self.frames) >= EVALUATE_EVERY else 0
+        now = time.time()
+        if (paint > self.paint_budget or frame > self.frame_budget) and self.auto_level < OPAQUE:
+            if self.changes and self.changes[-1][2] < self.changes[-1][1] and now - self.changed_at < self.cooldown:
+                self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)  # 刚恢复就又卡了
+            self.setAutoLevel(self.auto_level + 1, f"paint {paint:.1f} ms, frame {frame:.1f} ms")
+        elif self.auto_level > FULL and paint < self.paint_budget * HEADROOM and frame < self.frame_budget * HEADROOM \
+                and now - self.changed_at >= self.cooldown:
+            self.setAutoLevel(self.auto_level - 1, "headroom")
+
+    def setAutoLevel(self, level, reason):
+        previous = self.level
+        self.changes.append((time.time(), previous, level, reason))
+        del self.changes[:-20]
+        self.auto_level = level
+        self.changed_at = time.time()
+        # 新等级下重新测量
+        self.paints.clear()
+        self.frames.clear()
+        self.pending = 0
+        if self.level != previous:
+            self.apply()
+
+    def settingsChanged(self, path):
+        if os.path.exists(APP_SETTINGS_FILE) and APP_SETTINGS_FILE not in self.watcher.files():
+            self.watcher.addPath(APP_SETTINGS_FILE)  # 文件被替换后要重新监视
+        previous = self.level
+        try:
+            self.configure(load_app_settings().get("rendering"))
+        except (OSError, ValueError):
+            return  # 正在写入
+        if self.level != previous:
+            self.apply()
+
+    def apply(self):
+        self.windows = [widget for widget in self.windows if isValid(widget)]
+        for widget in self.windows:
+            self.applyWindow(widget)
+        self.levelChanged.emit(self.level)
+
+    def applyWindow(self, widget):
+        if widget.parentWidget() is None and widget.testAttribute(Qt.WidgetAttribute.WA_TranslucentBackground) != self.translucent:
+            visible = widget.isVisible()
+            pos = widget.pos()
+            widget.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, self.translucent)
+            widget.setWindowFlags(widget.windowFlags())  # 重新创建原生窗口，透明属性才会生效
+            widget.move(pos)
+            if visible:
+                widget.show()
+        widget.update()
+
+    def stats(self):
+        """当前等级和最近的切换记录，供诊断使用"""
+        return {"mode": self.mode, "level": self.level, "name": LEVEL_NAMES[self.level],
+                "paint_p90": percentile(self.paints) if self.paints else 0,
+                "frame_p90": percentile(self.frames) if self.frames else 0,
+                "cooldown": self.cooldown, "changes": self.changes}
+
+def paintBackground(widget, radius, color=QColor(255, 255, 255, 200)):
+    """按当前渲染等级画小组件的圆角半透明背景，关闭透明时画不透明的矩形"""
+    quality = renderQuality()
+    painter = QPainter(widget)
+    painter.setPen(Qt.PenStyle.NoPen)
+    if quality.translucent:
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, quality.antialias)
+        painter.setBrush(color)
+        painter.drawRoundedRect(widget.rect(), radius, radius)
+    else:
+        painter.setBrush(QColor(color.red(), color.green(), color.blue()))
+        painter.drawRect(widget.rect())
+
+_render_quality = None
+
+def renderQuality():
+    """获取进程级的渲染质量控制"""
+    global _render_quality
+    if _render_quality is None:
+        _render_quality = RenderQuality(load_app_settings().get("rendering"))
+    return _render_quality
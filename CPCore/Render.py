@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+# 批量渲染在后台进行，不需要真实显示器
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+NOTE_KINDS = ("md", "html")
+
+def collectNotes(directory):
+    """
+    找出目录中的所有笔记配置，返回[(种类, 配置路径)]
+
+    directory可以是包含md/、html/子目录的笔记根目录（如data/note），也可以直接是md或html目录。
+    """
+    roots = [(kind, os.path.join(directory, kind)) for kind in NOTE_KINDS
+             if os.path.isdir(os.path.join(directory, kind))]
+    if not roots:
+        kind = os.path.basename(os.path.normpath(directory))
+        roots = [(kind if kind in NOTE_KINDS else "md", directory)]
+    return [(kind, os.path.join(root, filename)) for kind, root in roots
+            for filename in sorted(os.listdir(root)) if filename.endswith(".json")]
+
+def initWorker():
+    from PySide6.QtWidgets import QApplication
+    global _app
+    _app = QApplication.instance() or QApplication(sys.argv[:1])
+
+def renderNote(task):
+    """
+    用和运行中完全相同的小组件类渲染一条笔记为PNG
+
+    :param task: (种类, 配置路径, 输出路径)
+    :return: (输出路径, 保存的x, 保存的y)，渲染失败时为(None, 错误信息, 配置路径)
+    """
+    from PySide6.QtWidgets import QApplication
+    from CPCore.Scheduler import scheduler
+    from CPCore.Binding import bindingHub
+    from CPCore.StyleSheet import styleRegistry
+    from CPCore.NoteStore import loadMeta
+    kind, config_path, out_path = task
+    try:
+        if kind == "html":
+            from CPBlock.HtmlWidgetManager import HtmlWidget as Widget
+        else:
+            from CPBlock.MarkdownWidgetManager import MarkdownWidget as Widget
+        widget = Widget(config_path)
+        scheduler().unregister(widget.auto_save_job)  # 只读渲染，不写回配置
+        styleRegistry().compile()
+        widget.ensurePolished()
+        widget.adjustSize()
+        widget.grab().save(out_path, "PNG")
+        position = loadMeta(config_path)["position"]
+        bindingHub().unbind(widget)
+        styleRegistry().apply(widget, "")
+        widget.deleteLater()
+        QApplication.processEvents()
+        return out_path, position["x"], position["y"]
+    except Exception as e:
+        return None, str(e), config_path
+
+def renderNotes(notes, out_dir, workers=None):
+    """渲染notes（collectNotes的结果）到out_dir，workers>1时分发到进程池"""
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [(kind, path, os.path.join(out_dir, f"{kind}-{os.path.splitext(os.path.basename(path))[0]}.png"))
+             for kind, path in notes]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < 2:
+        initWorker()
+        return [renderNote(task) for task in tasks]
+    # Qt不能在fork出来的进程里安全使用，统一用spawn
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=initWorker) as pool:
+        return pool.map(renderNote, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+
+def composeLayout(results, out_path, size=(1920, 1080)):
+    """把渲染好的笔记按保存的位置合成为一张全屏布局图，画布会扩大到能容纳所有笔记"""
+    from PySide6.QtGui import QGuiApplication, QImage, QPainter, QColor
+    from PySide6.QtCore import QRect
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+    images = [(QImage(path), x, y) for path, x, y in results if path is not None]
+    canvas_rect = QRect(0, 0, *size)
+    for image, x, y in images:
+        canvas_rect = canvas_rect.united(QRect(x, y, image.width(), image.height()))
+    canvas = QImage(canvas_rect.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    canvas.fill(QColor(45, 52, 64))
+    painter = QPainter(canvas)
+    for image, x, y in images:
+        painter.drawImage(x - canvas_rect.left(), y - canvas_rect.top(), image)
+    painter.end()
+    canvas.save(out_path, "PNG")
+
+def main(args):
+    """springboard.py render <笔记目录> [输出目录] [--layout] [--workers N] [--size 宽x高]"""
+    parser = argparse.ArgumentParser(prog="springboard.py render", description="离屏批量渲染笔记为PNG")
+    parser.add_argument("directory", help="笔记根目录（含md/、html/）或单个种类的目录")
+    parser.add_argument("out_dir", nargs="?", default="render", help="输出目录，默认为render")
+    parser.add_argument("--layout", action="store_true", help="额外按保存的位置合成layout.png")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认为CPU核数")
+    parser.add_argument("--size", default="1920x1080", help="布局图的最小尺寸")
+    options = parser.parse_args(args)
+
+    notes = collectNotes(options.directory)
+    start = time.perf_counter()
+    results = renderNotes(notes, options.out_dir, options.workers)
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results if result[0] is None]
+    for _, error, path in failed:
+        print(f"渲染失败 {path}: {error}")
+    if options.layout:
+        composeLayout(results, os.path.join(options.out_dir, "layout.png"),
+                      tuple(int(v) for v in options.size.lower().split("x")))
+    print(f"render notes={len(notes)} failed={len(failed)} workers={options.workers or os.cpu_count()} "
+          f"{elapsed * 1000:.1f} ms ({len(notes) / elapsed if elapsed else 0:.1f} notes/s)")
@@ -0,0 +1,185 @@
+import time
+import logging
+from collections import deque
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+from CPCore.Metrics import metrics
+
+log = logging.getLogger(__name__)
+LOOP_LAG = metrics().summary("classpro_event_loop_lag_seconds", "调度器的定时器实际触发比计划晚的秒数")
+
+class Job:
+    """注册到调度器的周期任务"""
+    def __init__(self, interval, callback, name="", essential=False, tolerance=None, catch_up=False):
+        self.interval = interval
+        self.callback = callback
+        self.name = name
+        self.essential = essential  # 挂起期间仍要执行
+        self.catch_up = catch_up  # 挂起期间错过的话，恢复时补跑一次
+        # 允许推迟的毫秒数，用来和别的任务凑到同一次唤醒里
+        self.tolerance = min(interval // 10, 1000) if tolerance is None else tolerance
+        self.due = 0
+        self.runs = 0
+        self.missed = False
+
+    def align(self, now):
+        """
+        排定下一次到期时间
+
+        到期时间用单调时钟，挂钟被校时或手动调整时任务不会停摆或扎堆触发；只有相位取自挂钟，
+        对齐到挂钟时间interval的整数倍，相同或成倍周期的任务落在同一次唤醒里，时钟类任务在整秒、整分刷新。
+
+        :param now: 单调时钟的毫秒数
+        """
+        wall = now + _wallOffset()
+        self.due = now + self.interval - wall % self.interval
+
+class Scheduler(QObject):
+    """
+    进程级中央调度器
+
+    所有周期任务共用一个单次QTimer。每次唤醒的时间取各任务“到期时间+容差”中最早的一个，
+    唤醒时把已经到期的任务全部执行，从而把相近的唤醒合并成一次。
+    锁屏、关屏、全屏演示等挂起原因存在时，只执行essential任务。
+    """
+    suspendedChanged = Signal(bool)
+
+    def __init__(self, slack=20, window=10):
+        super().__init__()
+        self.slack = slack  # 提前这么多毫秒到期的任务会并入本次唤醒
+        self.window = window  # 统计唤醒频率的时间窗口（秒）
+        self.jobs = []
+        self.reasons = set()
+        self.wakeups = deque()
+        self.deadline = None  # 定时器计划触发的时间
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.fire)
+
+    def register(self, interval, callback, name="", essential=False, tolerance=None, catch_up=False):
+        """
+        注册周期任务
+
+        :param interval: 周期（毫秒）
+        :param callback: 到期时调用的无参函数
+        :param name: 任务名，用于统计
+        :param essential: 挂起期间是否仍然执行
+        :param tolerance: 允许推迟的毫秒数，默认为周期的10%（最多1秒）
+        :param catch_up: 挂起期间错过时，恢复后是否立即补跑一次
+        :return: Job，用于注销
+        """
+        job = Job(interval, callback, name, essential, tolerance, catch_up)
+        job.align(_now())
+        self.jobs.append(job)
+        self.reschedule()
+        return job
+
+    def unregister(self, job):
+        if job in self.jobs:
+            self.jobs.remove(job)
+            self.reschedule()
+
+    def isSuspended(self):
+        return bool(self.reasons)
+
+    def suspend(self, reason):
+        """以reason为原因挂起非必要任务，多个原因可以叠加"""
+        if reason in self.reasons:
+            return
+        self.reasons.add(reason)
+        if len(self.reasons) == 1:
+            self.suspendedChanged.emit(True)
+        self.reschedule()
+
+    def resume(self, reason):
+        if reason not in self.reasons:
+            return
+        self.reasons.discard(reason)
+        if not self.reasons:
+            self.suspendedChanged.emit(False)
+            now = _now()
+            for job in self.jobs:
+                if job.due <= now:
+                    job.align(now)  # 挂起期间过期的任务不补发多次唤醒
+                    job.missed = True
+            for job in [job for job in self.jobs if job.missed]:
+                job.missed = False
+                if job.catch_up:
+                    self.run(job)
+        self.reschedule()
+
+    def active(self):
+        return [job for job in self.jobs if job.essential or not self.reasons]
+
+    def reschedule(self):
+        jobs = self.active()
+        if not jobs:
+            self.timer.stop()
+            self.deadline = None
+            return
+        self.deadline = min(job.due + job.tolerance for job in jobs)
+        self.timer.start(max(0, self.deadline - _now()))
+
+    def fire(self):
+        now = _now()
+        if self.deadline is not None:
+            LOOP_LAG.observe(max(0, now - self.deadline) / 1000)  # 事件循环忙于别的事情时定时器会晚到
+        self.wakeups.append(now)
+        self.trimWakeups(now)
+        for job in [job for job in self.jobs if job.due <= now + self.slack]:
+            if job not in self.jobs:
+                continue  # 已被本轮之前的任务注销
+            job.align(max(now, job.due))
+            if job.essential or not self.reasons:
+                self.run(job)
+            else:
+                job.missed = True
+        self.reschedule()
+
+    def run(self, job):
+        job.runs += 1
+        try:
+            job.callback()
+        except Exception:
+            # 单个任务出错不能让整个调度器停下来；每秒执行的任务反复出错时由日志限速
+            log.exception("周期任务出错: %s", job.name, extra={"notify": False})
+
+    def wakeupRate(self):
+        """最近一个统计窗口内每秒的唤醒次数"""
+        self.trimWakeups(_now())
+        return len(self.wakeups) / self.window
+
+    def trimWakeups(self, now):
+        horizon = now - self.window * 1000
+        while self.wakeups and self.wakeups[0] < horizon:
+            self.wakeups.popleft()
+
+    def stats(self):
+        """各任务的周期和执行次数，供诊断使用"""
+        return [{"name": job.name, "interval": job.interval, "essential": job.essential, "runs": job.runs}
+                for job in self.jobs]
+
+def _now():
+    return int(time.monotonic() * 1000)
+
+def _wall():
+    return int(time.time() * 1000)
+
+_wall_offset = None
+
+def _wallOffset():
+    """挂钟与单调时钟之差；只在挂钟被调整超过1秒时更新，两次取时的毫秒误差不会让对齐来回抖动"""
+    global _wall_offset
+    offset = _wall() - _now()
+    if _wall_offset is None or abs(offset - _wall_offset) > 1000:
+        _wall_offset = offset
+    return _wall_offset
+
+_scheduler = None
+
+def scheduler():
+    """获取进程级共享调度器"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler()
+    return _scheduler
@@ -0,0 +1,89 @@
+from PySide6.QtGui import QGuiApplication
+from PySide6.QtCore import QObject, QPoint, Signal
+
+class ScreenInfo:
+    """一块屏幕的几何信息快照（逻辑坐标，已按各屏幕的DPI缩放）"""
+    def __init__(self, screen):
+        self.screen = screen
+        self.geometry = screen.geometry()
+        self.available = screen.availableGeometry()
+        self.ratio = screen.devicePixelRatio()
+
+class ScreenGeometryCache(QObject):
+    """
+    多显示器几何信息缓存
+
+    只在屏幕增减或某块屏幕的几何/DPI变化时重建，拖动和定时检查时只做矩形运算，不再查询QScreen。
+    """
+    changed = Signal()
+
+    def __init__(self):
+        super().__init__()
+        self.infos = None
+        app = QGuiApplication.instance()
+        app.screenAdded.connect(self.screenAdded)
+        app.screenRemoved.connect(self.invalidate)
+        app.primaryScreenChanged.connect(self.invalidate)
+        for screen in app.screens():
+            self.watch(screen)
+
+    def watch(self, screen):
+        screen.geometryChanged.connect(self.invalidate)
+        screen.availableGeometryChanged.connect(self.invalidate)
+        screen.logicalDotsPerInchChanged.connect(self.invalidate)
+
+    def screenAdded(self, screen):
+        self.watch(screen)
+        self.invalidate()
+
+    def invalidate(self, *args):
+        self.infos = None
+        self.changed.emit()
+
+    def screens(self):
+        if self.infos is None:
+            app = QGuiApplication.instance()
+            primary = app.primaryScreen()
+            # 主屏放在最前面，找不到所在屏幕时作为兜底
+            self.infos = [ScreenInfo(screen) for screen in sorted(app.screens(), key=lambda s: s is not primary)]
+        return self.infos
+
+    def screenAt(self, point):
+        """point所在的屏幕；不在任何屏幕上时返回距离最近的那块"""
+        infos = self.screens()
+        for info in infos:
+            if info.geometry.contains(point):
+                return info
+
+        def distance(info):
+            rect = info.geometry
+            dx = max(rect.left() - point.x(), 0, point.x() - rect.right())
+            dy = max(rect.top() - point.y(), 0, point.y() - rect.bottom())
+            return dx * dx + dy * dy
+
+        return min(infos, key=distance)
+
+    def isOpenEdge(self, info, edge, offset):
+        """
+        屏幕的某条边在offset处外侧是否没有别的屏幕，只有这样的边才能吸附和隐藏
+
+        :param edge: "left"、"right"或"bottom"
+        :param offset: 沿这条边的坐标（左右边为y，下边为x）
+        """
+        rect = info.geometry
+        if edge == "left":
+            outside = QPoint(rect.left() - 1, offset)
+        elif edge == "right":
+            outside = QPoint(rect.right() + 1, offset)
+        else:
+            outside = QPoint(offset, rect.bottom() + 1)
+        return not any(other.geometry.contains(outside) for other in self.screens() if other is not info)
+
+_screen_cache = None
+
+def screenCache():
+    """获取进程级的屏幕几何缓存"""
+    global _screen_cache
+    if _screen_cache is None:
+        _screen_cache = ScreenGeometryCache()
+    return _screen_cache
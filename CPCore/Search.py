@@ -0,0 +1,420 @@
+import re
+import sys
+import json
+import math
+import html
+import heapq
+import ctypes
+import time
+import unicodedata
+from PySide6.QtWidgets import QApplication, QWidget, QLineEdit, QListWidget, QListWidgetItem, QLabel, QVBoxLayout
+from PySide6.QtCore import Qt, QObject, QTimer, Signal
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+
+# 每种笔记的进程各自监听一个本地套接字，快速启动栏通过它查询和定位笔记
+SERVER_NAME = "ClassPro_search_{kind}"
+NOTE_KINDS = ("md", "html")
+CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"  # 假名、汉字、谚文
+TOKEN_RE = re.compile(rf"[{CJK}]+|[^\W_{CJK}]+")
+CJK_RE = re.compile(rf"[{CJK}]")
+# 内嵌图片的data URI可达数MB，既没有可搜索的文字又会拖慢分词
+DATA_URI_RE = re.compile(r"data:[\w/+.-]+;base64,[A-Za-z0-9+/=]+")
+SCRIPT_RE = re.compile(r"<(script|style)\b.*?</\1\s*>", re.S | re.I)
+TAG_RE = re.compile(r"<[^>]+>")
+
+def plainText(content, markup="md"):
+    """去掉data URI和html标签后的正文，Markdown的符号由分词忽略"""
+    text = DATA_URI_RE.sub(" ", content)
+    if markup == "html":
+        text = html.unescape(TAG_RE.sub(" ", SCRIPT_RE.sub(" ", text)))
+    return text
+
+def normalize(text):
+    # 全角字母数字转半角、大小写不敏感
+    return unicodedata.normalize("NFKC", text).lower()
+
+def tokens(text):
+    """
+    正文的索引词
+
+    中日韩文字没有空格分词，连续的一段同时切成单字和相邻两字（二元组），单字用于一个字的查询，
+    二元组让多字查询只需要求几个较短的倒排表的交集；其他文字按单词切分。
+    """
+    for run in TOKEN_RE.findall(normalize(text)):
+        if CJK_RE.match(run):
+            yield from run
+            for i in range(len(run) - 1):
+                yield run[i:i + 2]
+        else:
+            yield run
+
+def queryTerms(query):
+    """查询词：一个字的中日韩文字查单字，多字的查二元组，其他按单词"""
+    runs = TOKEN_RE.findall(normalize(query))
+    terms = []
+    for run in runs:
+        if CJK_RE.match(run) and len(run) > 1:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return runs, list(dict.fromkeys(terms))
+
+class NoteIndex:
+    """
+    笔记全文索引
+
+    倒排表为 词 -> {笔记: 词频}，每条笔记还记着自己的词频，更新或删除时只改动这条笔记涉及的词，不需要重建。
+    查询取所有查询词倒排表的交集（从最短的开始），按tf-idf排序后再用原文确认中日韩短语确实连续出现。
+    进程开机时先把笔记放进pending，等第二阶段或第一次查询时再分词。
+    """
+    def __init__(self):
+        self.postings = {}
+        self.documents = {}  # 笔记 -> (纯文本, 词频)
+        self.pending = {}  # 笔记 -> (正文, markup)
+        self.ready = False
+
+    def __len__(self):
+        return len(self.documents) + len(self.pending)
+
+    def update(self, doc_id, content, markup="md"):
+        """笔记加载或保存后调用"""
+        if not self.ready:
+            self.pending[doc_id] = (content, markup)
+            return
+        self.remove(doc_id)
+        text = plainText(content, markup)
+        counts = {}
+        for token in tokens(text):
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            self.postings.setdefault(token, {})[doc_id] = count
+        self.documents[doc_id] = (text, counts)
+
+    def remove(self, doc_id):
+        self.pending.pop(doc_id, None)
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return
+        for token in document[1]:
+            posting = self.postings[token]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[token]
+
+    def build(self):
+        """处理开机时积压的笔记"""
+        self.ready = True
+        pending, self.pending = self.pending, {}
+        for doc_id, (content, markup) in pending.items():
+            self.update(doc_id, content, markup)
+
+    def search(self, query, limit=20):
+        """
+        :return: [{"id", "title", "snippet", "score"}]，按相关度从高到低
+        """
+        if not self.ready:
+            self.build()
+        runs, terms = queryTerms(query)
+        if not terms:
+            return []
+        postings = sorted((self.postings.get(term, {}) for term in terms), key=len)
+        if not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        total = len(self.documents)
+        weights = [(posting, math.log(1 + total / len(posting))) for posting in postings]
+        scored = ((sum(posting[doc_id] * weight for posting, weight in weights), doc_id) for doc_id in candidates)
+        phrases = [run for run in runs if CJK_RE.match(run) and len(run) > 2]
+        results = []
+        for score, doc_id in heapq.nlargest(len(candidates), scored) if phrases else heapq.nlargest(limit, scored):
+            text = self.documents[doc_id][0]
+            if phrases and not all(phrase in normalize(text) for phrase in phrases):
+                continue  # 二元组都在但不连续
+            results.append({"id": doc_id, "title": title(text), "snippet": snippet(text, runs[0]),
+                            "score": round(score, 3)})
+            if len(results) >= limit:
+                break
+        return results
+
+def title(text):
+    for line in text.splitlines():
+        line = line.strip(" #*>-\t")
+        if line:
+            return line[:30]
+    return ""
+
+def snippet(text, word, width=24):
+    """正文中第一次出现word的位置前后各width个字"""
+    flat = " ".join(text.split())
+    position = flat.lower().find(word)
+    if position < 0:
+        return flat[:width * 2]
+    start = max(0, position - width)
+    return ("…" if start else "") + flat[start:position + len(word) + width]
+
+_note_index = None
+
+def noteIndex():
+    """获取进程级的笔记索引"""
+    global _note_index
+    if _note_index is None:
+        _note_index = NoteIndex()
+    return _note_index
+
+class SearchServer(QObject):
+    """
+    笔记进程里的查询服务
+
+    每个请求是一行JSON：{"query": 查询, "limit": 条数}返回结果列表，{"focus": 笔记}让对应的小组件显示到最前。
+
+    :param kind: 笔记种类（md/html）
+    :param focus: focus(笔记) -> bool，由小组件管理器提供
+    """
+    def __init__(self, kind, focus):
+        super().__init__()
+        self.kind = kind
+        self.focus = focus
+        self.server = QLocalServer(self)
+        QLocalServer.removeServer(SERVER_NAME.format(kind=kind))
+        self.server.listen(SERVER_NAME.format(kind=kind))
+        self.server.newConnection.connect(self.accept)
+
+    def accept(self):
+        socket = self.server.nextPendingConnection()
+        socket.readyRead.connect(lambda: self.handle(socket))
+        socket.disconnected.connect(socket.deleteLater)  # 否则每个连接都作为server的子对象留到进程退出
+
+    def handle(self, socket):
+        if not socket.canReadLine():
+            return  # 请求还没收完整
+        try:
+            request = json.loads(bytes(socket.readLine()).decode("utf-8"))
+            if not isinstance(request, dict):
+                raise ValueError("请求必须是JSON对象")
+            if "focus" in request:
+                if not isinstance(request["focus"], str):
+                    raise ValueError("focus必须是字符串")
+                response = self.focus(request["focus"])
+            else:
+                query, limit = request["query"], request.get("limit", 20)
+                if not isinstance(query, str) or not isinstance(limit, int) or isinstance(limit, bool):
+                    raise ValueError("query必须是字符串，limit必须是整数")
+                response = noteIndex().search(query, limit)
+                for result in response:
+                    result["kind"] = self.kind
+        except (ValueError, KeyError) as e:  # UnicodeDecodeError和JSONDecodeError都是ValueError
+            response = {"error": str(e)}
+        socket.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+        socket.flush()
+        socket.disconnectFromServer()
+
+def request(kind, message, timeout=500):
+    """向kind笔记进程发送一个请求，进程没有运行或超时时返回None；会阻塞，只用于命令行"""
+    socket = QLocalSocket()
+    socket.connectToServer(SERVER_NAME.format(kind=kind))
+    if not socket.waitForConnected(timeout):
+        return None
+    socket.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+    socket.flush()
+    data = b""
+    while not data.endswith(b"\n"):
+        if not socket.waitForReadyRead(timeout):
+            return None
+        data += bytes(socket.readAll())
+    return json.loads(data.decode("utf-8"))
+
+def search(query, limit=20):
+    """在所有正在运行的笔记进程里查询，合并后按相关度排序"""
+    results = []
+    for kind in NOTE_KINDS:
+        response = request(kind, {"query": query, "limit": limit})
+        if isinstance(response, list):
+            results.extend(response)
+    results.sort(key=lambda result: -result["score"])
+    return results[:limit]
+
+class Request(QObject):
+    """
+    不阻塞界面线程的请求
+
+    收到完整的一行回复后发出finished(回复)，进程没有运行、连接出错或超时时发出finished(None)，之后自行删除。
+
+    :param kind: 笔记种类（md/html）
+    :param message: 请求内容
+    :param timeout: 超时（毫秒）
+    """
+    finished = Signal(object)
+
+    def __init__(self, kind, message, timeout=500, parent=None):
+        super().__init__(parent)
+        self.data = b""
+        self.done = False
+        payload = json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+        self.socket = QLocalSocket(self)
+        self.socket.connected.connect(lambda: self.socket.write(payload))
+        self.socket.readyRead.connect(self.read)
+        self.socket.errorOccurred.connect(self.failed)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(lambda: self.finish(None))
+        self.timer.start(timeout)
+        # 服务不存在时connectToServer会立即报错，要等调用方连接好finished之后再连
+        self.server_name = SERVER_NAME.format(kind=kind)
+        QTimer.singleShot(0, self.connectToServer)
+
+    def connectToServer(self):
+        if not self.done:
+            self.socket.connectToServer(self.server_name)
+
+    def read(self):
+        self.data += bytes(self.socket.readAll())
+        if self.data.endswith(b"\n"):
+            try:
+                response = json.loads(self.data.decode("utf-8"))
+            except ValueError:
+                response = None
+            self.finish(response)
+
+    def failed(self, error):
+        self.read()  # 对方写完回复后立即断开，剩下的数据可能和断开一起到达
+        self.finish(None)
+
+    def finish(self, response):
+        if self.done:
+            return
+        self.done = True
+        self.timer.stop()
+        self.socket.abort()
+        self.finished.emit(response)
+        self.deleteLater()
+
+def focus(kind, doc_id, parent=None):
+    """
+    让对应进程把笔记显示到最前
+
+    :return: Request，finished的回复为True时已经显示
+    """
+    if sys.platform == "win32":
+        ctypes.windll.user32.AllowSetForegroundWindow(-1)  # ASFW_ANY，否则后台进程不能抢前台
+    return Request(kind, {"focus": doc_id}, parent=parent)
+
+class SearchPopup(QWidget):
+    """
+    搜索笔记的小窗口，边输入边查询，回车或双击结果把对应的小组件显示到最前
+
+    查询同时发给所有笔记进程，各自的结果到达后合并显示，不等待也不阻塞快速启动栏。
+    """
+    def __init__(self, limit=20):
+        super().__init__()
+        self.limit = limit
+        self.generation = 0  # 输入变化后，上一次查询迟到的结果直接丢弃
+        self.results = []
+        self.waiting = 0
+        self.activate_first = False
+        self.start = 0
+        self.setWindowTitle("搜索笔记")
+        self.setWindowFlags(Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.Tool)
+        self.resize(360, 320)
+        layout = QVBoxLayout(self)
+
+        self.query_edit = QLineEdit(self)
+        self.query_edit.setPlaceholderText("输入要查找的文字")
+        self.query_edit.textChanged.connect(lambda: self.query_timer.start())
+        self.query_edit.returnPressed.connect(self.activateFirst)
+        layout.addWidget(self.query_edit)
+
+        self.result_list = QListWidget(self)
+        self.result_list.itemActivated.connect(self.activate)
+        layout.addWidget(self.result_list)
+
+        self.status_label = QLabel(self)
+        layout.addWidget(self.status_label)
+
+        # 连续输入时只查询最后一次
+        self.query_timer = QTimer(self)
+        self.query_timer.setSingleShot(True)
+        self.query_timer.setInterval(120)
+        self.query_timer.timeout.connect(self.query)
+
+    def popup(self):
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        self.query_edit.setFocus()
+        self.query_edit.selectAll()
+
+    def query(self):
+        self.generation += 1
+        self.result_list.clear()
+        self.results = []
+        self.activate_first = False
+        text = self.query_edit.text().strip()
+        if not text:
+            self.waiting = 0
+            self.status_label.clear()
+            return
+        self.start = time.perf_counter()
+        self.waiting = len(NOTE_KINDS)
+        self.status_label.setText("正在查找…")
+        for kind in NOTE_KINDS:
+            request = Request(kind, {"query": text, "limit": self.limit}, parent=self)
+            request.finished.connect(lambda response, generation=self.generation: self.collect(generation, response))
+
+    def collect(self, generation, response):
+        """一个笔记进程的结果到达"""
+        if generation != self.generation:
+            return
+        self.waiting -= 1
+        if isinstance(response, list):
+            self.results = sorted(self.results + response, key=lambda result: -result["score"])[:self.limit]
+            self.result_list.clear()
+            for result in self.results:
+                item = QListWidgetItem(f"{result['title']}\n{result['snippet']}")
+                item.setData(Qt.ItemDataRole.UserRole, (result["kind"], result["id"]))
+                self.result_list.addItem(item)
+        if self.waiting:
+            return
+        elapsed = (time.perf_counter() - self.start) * 1000
+        self.status_label.setText(f"{len(self.results)}条结果，{elapsed:.0f} ms" if self.results else "没有找到")
+        if self.activate_first:
+            self.activateFirst()
+
+    def activateFirst(self):
+        if self.query_timer.isActive():
+            self.query_timer.stop()
+            self.query()
+        if self.waiting:
+            self.activate_first = True  # 等所有进程的结果到齐后再选第一条
+            return
+        self.activate_first = False
+        if self.result_list.count():
+            self.activate(self.result_list.item(0))
+
+    def activate(self, item):
+        kind, doc_id = item.data(Qt.ItemDataRole.UserRole)
+        focus(kind, doc_id, parent=self).finished.connect(self.focused)
+
+    def focused(self, response):
+        if response is True:
+            self.close()
+        else:
+            self.status_label.setText("笔记已被删除或笔记进程没有运行")
+
+def main(args):
+    """
+    springboard.py search [查询]
+
+    有查询时在终端输出结果，没有时打开搜索窗口（托盘菜单使用）。
+    """
+    app = QApplication.instance() or QApplication(sys.argv)
+    if args:
+        for result in search(" ".join(args)):
+            print(f"[{result['kind']}] {result['title']}  ({result['score']})\n    {result['snippet']}\n    {result['id']}")
+        return
+    popup = SearchPopup()
+    popup.popup()
+    app.exec()
@@ -1,4 +1,4 @@
-from PySide6.QtWidgets import QWidget, QTabWidget, QVBoxLayout, QLabel, QApplication, QPushButton, QCheckBox
+from PySide6.QtWidgets import QWidget, QTabWidget, QVBoxLayout, QLabel, QApplication, QPushButton, QCheckBox, QComboBox
 import sys
 import json
 import os
@@ -47,6 +47,11 @@ class SettingsWindow(QWidget):
         self.auto_start_checkbox = QCheckBox("开启自启动")
         self.auto_start_checkbox.setChecked(False)  # 默认关闭
         layout.addWidget(self.auto_start_checkbox)
+
+        # 单窗口合成模式：所有小组件画在每块屏幕一个的透明宿主窗口上
+        self.overlay_checkbox = QCheckBox("单窗口合成模式（小组件较多时节省显存）")
+        self.overlay_checkbox.setChecked(False)  # 默认关闭
+        layout.addWidget(self.overlay_checkbox)
         
         # 添加保存设置按钮
         save_button = QPushButton("保存设置")
@@ -61,13 +66,20 @@ class SettingsWindow(QWidget):
             "html_widget_enabled": self.htmlwidget.isChecked(),
             "md_widget_enabled": self.mdwidget.isChecked(),
             "qs_enabled": self.qs.isChecked(),
-            "auto_start_enabled": self.auto_start_checkbox.isChecked()
+            "auto_start_enabled": self.auto_start_checkbox.isChecked(),
+            "overlay_mode_enabled": self.overlay_checkbox.isChecked()
         }
         
         # 确保 data 文件夹存在
         data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
+
+        # 保留只能在app.json里手动配置的项（如fleet）
+        app_settings = load_app_settings()
+        settings = {**app_settings, **settings}
+        settings["rendering"] = dict(app_settings.get("rendering", {}), mode=self.rendering_combo.currentData())
+        settings["metrics"] = dict(app_settings.get("metrics", {}), enabled=self.metrics_checkbox.isChecked())
         
         # 保存设置到 app.json
         with open(os.path.join(data_dir, "app.json"), "w") as f:
@@ -92,6 +104,10 @@ class SettingsWindow(QWidget):
                 self.htmlwidget.setChecked(settings.get("html_widget_enabled", True))
                 self.mdwidget.setChecked(settings.get("md_widget_enabled", True))
                 self.qs.setChecked(settings.get("qs_enabled", True))
+                self.overlay_checkbox.setChecked(settings.get("overlay_mode_enabled", False))
+                mode = settings.get("rendering", {}).get("mode", "auto")
+                self.rendering_combo.setCurrentIndex(max(0, self.rendering_combo.findData(mode)))
+                self.metrics_checkbox.setChecked(settings.get("metrics", {}).get("enabled", False))
 
     def enable_auto_start(self):
         # 实现开机自启逻辑
@@ -110,6 +126,7 @@ class SettingsWindow(QWidget):
             shell = Dispatch('WScript.Shell')
             shortcut = shell.CreateShortCut(shortcut_path)
             shortcut.Targetpath = exe_path
+            shortcut.Arguments = "--autostart"  # 开机阶段推迟天气、图标等非关键任务
             shortcut.WorkingDirectory = os.path.dirname(exe_path)
             shortcut.save()
     
@@ -129,7 +146,27 @@ class SettingsWindow(QWidget):
     def create_advanced_tab(self):
         tab = QWidget()
         layout = QVBoxLayout()
-        layout.addWidget(QLabel("暂无设置项"))
+
+        # 渲染质量：自动时按实测的绘制和动画帧时间逐级降低效果，也可以手动固定
+        layout.addWidget(QLabel("渲染质量"))
+        self.rendering_combo = QComboBox()
+        self.rendering_combo.addItem("自动（卡顿时自动降低效果）", "auto")
+        self.rendering_combo.addItem("完整效果", 0)
+        self.rendering_combo.addItem("关闭抗锯齿", 1)
+        self.rendering_combo.addItem("关闭抗锯齿和动画", 2)
+        self.rendering_combo.addItem("关闭抗锯齿、动画和透明（最流畅）", 3)
+        layout.addWidget(self.rendering_combo)
+
+        # 供集中监控抓取的Prometheus指标，只监听本机地址，下次启动各进程时生效
+        self.metrics_checkbox = QCheckBox("开启本机指标接口（127.0.0.1:9464起，每个进程一个端口）")
+        self.metrics_checkbox.setChecked(False)  # 默认关闭
+        layout.addWidget(self.metrics_checkbox)
+        layout.addStretch()
+
+        save_button = QPushButton("保存设置")
+        save_button.clicked.connect(self.save_settings)
+        layout.addWidget(save_button)
+
         tab.setLayout(layout)
         return tab
     def create_about_tab(self):
@@ -146,6 +183,16 @@ class SettingsWindow(QWidget):
         tab.setLayout(layout)
         return tab
 
+# 全局设置文件，托盘、设置窗口和各子进程共用
+APP_SETTINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "app.json")
+
+def load_app_settings():
+    """读取data/app.json，供各子进程查询全局设置"""
+    if os.path.exists(APP_SETTINGS_FILE):
+        with open(APP_SETTINGS_FILE, "r") as f:
+            return json.load(f)
+    return {}
+
 def start_app():
     app = QApplication(sys.argv)
     window = SettingsWindow()
@@ -0,0 +1,75 @@
+import os
+from PySide6.QtWidgets import QWidget, QApplication
+from PySide6.QtGui import QPainter, QImage, QPixmap
+from PySide6.QtCore import Qt
+from CPCore.NoteStore import NoteFile
+from CPCore import Startup
+
+def save(widget, path):
+    """把小组件当前的外观保存为PNG快照，设备像素比写在图片的文本块里"""
+    image = widget.grab().toImage()
+    image.setText("dpr", str(image.devicePixelRatio()))
+    image.save(path, "PNG")
+
+def load(path):
+    image = QImage(path)
+    if image.isNull():
+        return None
+    pixmap = QPixmap.fromImage(image)
+    pixmap.setDevicePixelRatio(float(image.text("dpr") or 1))
+    return pixmap
+
+class SnapshotWindow(QWidget):
+    """只显示一张快照的窗口，外观和位置都和真正的小组件一致"""
+    def __init__(self, pixmap):
+        super().__init__()
+        self.pixmap = pixmap
+        self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.Tool)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.resize(pixmap.deviceIndependentSize().toSize())
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.pixmap)
+
+class SnapshotLayer:
+    """
+    开机时的快照层
+
+    在加载Markdown/html、解析正文和渲染之前，先按保存的位置显示每个小组件上次的外观，
+    真正的小组件初始化完成后用release逐个替换。
+    """
+    def __init__(self, note_dir):
+        self.windows = {}
+        if not os.path.isdir(note_dir):
+            return
+        for filename in os.listdir(note_dir):
+            if not filename.endswith(".json"):
+                continue
+            config_path = os.path.join(note_dir, filename)
+            note = NoteFile(config_path)
+            pixmap = load(note.snapshotPath()) if os.path.exists(note.snapshotPath()) else None
+            if pixmap is None:
+                continue
+            try:
+                position = note.loadMeta()["position"]
+            except (OSError, ValueError, KeyError):
+                continue
+            window = SnapshotWindow(pixmap)
+            window.move(position["x"], position["y"])
+            Startup.markOnPaint(window, "first-visible")
+            window.show()
+            self.windows[config_path] = window
+        # 立即处理显示和绘制事件，否则快照要等到真正的小组件加载完才会画出来
+        QApplication.processEvents()
+
+    def release(self, config_path):
+        window = self.windows.pop(config_path, None)
+        if window is not None:
+            window.close()
+            window.deleteLater()
+
+    def releaseAll(self):
+        for config_path in list(self.windows):
+            self.release(config_path)
@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import time
+import ctypes
+import logging
+from PySide6.QtCore import QObject, QEvent, QTimer
+from PySide6.QtWidgets import QApplication
+from CPCore.Scheduler import scheduler
+from CPCore.Settings import load_app_settings
+
+log = logging.getLogger(__name__)
+
+# 进程被拉起的时间，由托盘或基准测试通过环境变量传入，否则以导入本模块的时间近似
+BOOT_T0 = float(os.environ.get("CLASSPRO_BOOT_T0") or 0) or time.time()
+# 托盘由开机自启动的快捷方式拉起时为1
+BOOT = os.environ.get("CLASSPRO_BOOT") == "1"
+# 启动时间线保存目录，每个进程一个文件
+TIMELINE_DIR = "data/startup"
+# 设置后把时间线逐条打印到标准输出；值为exit时进入可交互状态后直接退出，供基准测试使用
+TRACE = os.environ.get("CLASSPRO_STARTUP_TRACE", "")
+
+_marks = {}
+
+def mark(name):
+    """记录一个启动阶段距离进程启动的秒数，同名阶段只记第一次"""
+    if name in _marks:
+        return
+    _marks[name] = time.time() - BOOT_T0
+    if TRACE:
+        print(json.dumps({"mark": name, "t": _marks[name]}), flush=True)
+
+def marks():
+    return dict(_marks)
+
+class _PaintMarker(QObject):
+    def __init__(self, widget, name):
+        super().__init__(widget)
+        self.name = name
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            mark(self.name)
+            obj.removeEventFilter(self)
+            self.deleteLater()
+        return False
+
+def markOnPaint(widget, name):
+    """widget第一次绘制时记录name"""
+    if name not in _marks:
+        widget.installEventFilter(_PaintMarker(widget, name))
+
+def markIdle(name):
+    """事件循环处理完当前积压的事件（窗口都已绘制、可以响应输入）时记录name"""
+    def done():
+        mark(name)
+        if TRACE == "exit" and name == "interactive":
+            QApplication.quit()
+    QTimer.singleShot(0, done)
+
+def systemUptime():
+    """系统已经运行的秒数，无法获取时返回None"""
+    if sys.platform == "win32":
+        ctypes.windll.kernel32.GetTickCount64.restype = ctypes.c_ulonglong
+        return ctypes.windll.kernel32.GetTickCount64() / 1000
+    try:
+        with open("/proc/uptime", "r") as f:
+            return float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+class LoadSampler:
+    """
+    整机CPU和磁盘的繁忙程度采样
+
+    sample()返回距上次采样这段时间内的(cpu, io)占用比例（0~1），第一次调用或平台不支持时返回None。
+    Windows上CPU来自GetSystemTimes，磁盘来自PDH计数器“% Idle Time”；Linux上来自/proc/stat和/proc/diskstats。
+    """
+    def __init__(self):
+        self.last = None
+        self.pdh_query = None
+        self.pdh_counter = None
+        if sys.platform == "win32":
+            self.openPdh()
+
+    def openPdh(self):
+        try:
+            pdh = ctypes.windll.pdh
+            query = ctypes.c_void_p()
+            counter = ctypes.c_void_p()
+            if pdh.PdhOpenQueryW(None, None, ctypes.byref(query)) != 0:
+                return
+            if pdh.PdhAddEnglishCounterW(query, "\\PhysicalDisk(_Total)\\% Idle Time", None, ctypes.byref(counter)) != 0:
+                pdh.PdhCloseQuery(query)
+                return
+            pdh.PdhCollectQueryData(query)
+            self.pdh_query, self.pdh_counter = query, counter
+        except (AttributeError, OSError):
+            pass
+
+    def readIo(self):
+        """距上次读取的磁盘繁忙比例"""
+        if sys.platform == "win32":
+            if self.pdh_query is None:
+                return None
+
+            class PDH_FMT_COUNTERVALUE(ctypes.Structure):
+                _fields_ = [("CStatus", ctypes.c_ulong), ("doubleValue", ctypes.c_double)]
+
+            value = PDH_FMT_COUNTERVALUE()
+            pdh = ctypes.windll.pdh
+            pdh.PdhCollectQueryData(self.pdh_query)
+            if pdh.PdhGetFormattedCounterValue(self.pdh_counter, 0x200, None, ctypes.byref(value)) != 0:  # PDH_FMT_DOUBLE
+                return None
+            return max(0.0, min(1.0, 1 - value.doubleValue / 100))
+        return None
+
+    def read(self):
+        """返回(CPU繁忙时间, CPU总时间, {磁盘: 累计I/O毫秒})，不支持时返回None"""
+        if sys.platform == "win32":
+            idle, kernel, user = (ctypes.c_ulonglong() for _ in range(3))
+            if not ctypes.windll.kernel32.GetSystemTimes(ctypes.byref(idle), ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            total = kernel.value + user.value  # 内核时间包含空闲时间
+            return total - idle.value, total, {}
+        try:
+            with open("/proc/stat", "r") as f:
+                values = [int(v) for v in f.readline().split()[1:]]
+            disks = {}
+            with open("/proc/diskstats", "r") as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) > 12 and not fields[2].startswith(("loop", "ram", "dm-", "zram")):
+                        disks[fields[2]] = int(fields[12])
+        except (OSError, ValueError):
+            return None
+        total = sum(values[:8])
+        return total - values[3] - values[4], total, disks  # idle和iowait都算空闲
+
+    def sample(self):
+        now = time.time()
+        current = self.read()
+        last, self.last = self.last, (now, current)
+        if current is None or last is None or last[1] is None:
+            return None
+        elapsed = now - last[0]
+        busy = current[0] - last[1][0]
+        total = current[1] - last[1][1]
+        cpu = busy / total if total > 0 else 0.0
+        io = self.readIo()
+        if io is None and current[2]:
+            io = max((ms - last[1][2].get(disk, ms)) / 1000 / elapsed for disk, ms in current[2].items())
+        return cpu, min(1.0, io or 0.0)
+
+class BootScheduler(QObject):
+    """
+    开机阶段调度
+
+    第一阶段只做首次显示所必需的工作（快照、屏幕内的笔记、快速启动栏本身）；天气、图标、屏幕外的笔记、
+    同步和内存记账等用defer推迟。进入可交互状态后调用start：开机自启动时每秒采样一次整机CPU和磁盘负载，
+    连续几次低于阈值（或等待超过上限）才开始第二阶段，依次执行推迟的任务，每个任务占一次事件循环，
+    避免集中爆发；手动启动时直接进入第二阶段。两个阶段的时间点都写入data/startup/<进程>.json。
+
+    :param settings: data/app.json中的boot配置
+    """
+    def __init__(self, settings=None):
+        super().__init__()
+        settings = settings or {}
+        uptime = systemUptime()
+        self.boot = BOOT or (uptime is not None and uptime < settings.get("uptime_threshold", 180))
+        self.cpu_threshold = settings.get("cpu_threshold", 0.35)
+        self.io_threshold = settings.get("io_threshold", 0.35)
+        self.settle_samples = settings.get("settle_samples", 3)
+        self.max_wait = settings.get("max_wait", 90)
+        self.sampler = LoadSampler()
+        self.pending = []
+        self.released = False
+        self.quiet = 0
+        self.loads = []
+        self.process_name = ""
+        self.job = None
+
+    def isBooting(self):
+        """是否处在开机的第一阶段"""
+        return self.boot and not self.released
+
+    def defer(self, callback, name):
+        """把非关键任务推迟到第二阶段，第二阶段已经开始时立即执行"""
+        if self.released:
+            self.run(name, callback)
+        else:
+            self.pending.append((name, callback))
+
+    def start(self, process_name):
+        """关键路径完成后调用，开始等待系统空闲"""
+        if self.process_name:
+            return  # 每个进程只有一条启动时间线
+        self.process_name = process_name
+        if not self.boot:
+            QTimer.singleShot(0, self.release)
+            return
+        self.started = time.time()
+        self.sampler.sample()
+        self.job = scheduler().register(1000, self.poll, "boot-phase", essential=True, tolerance=0)
+
+    def poll(self):
+        load = self.sampler.sample()
+        if load is not None:
+            self.loads.append([round(time.time() - BOOT_T0, 3), round(load[0], 3), round(load[1], 3)])
+        quiet = load is None or (load[0] < self.cpu_threshold and load[1] < self.io_threshold)
+        self.quiet = self.quiet + 1 if quiet else 0
+        if self.quiet >= self.settle_samples or time.time() - self.started >= self.max_wait:
+            self.release()
+
+    def release(self):
+        if self.released:
+            return
+        self.released = True
+        if self.job is not None:
+            scheduler().unregister(self.job)
+        mark("deferred-start")
+        self.runNext()
+
+    def runNext(self):
+        if not self.pending:
+            mark("deferred-done")
+            self.writeTimeline()
+            return
+        name, callback = self.pending.pop(0)
+        self.run(name, callback)
+        mark(f"deferred:{name}")
+        QTimer.singleShot(0, self.runNext)
+
+    def run(self, name, callback):
+        try:
+            callback()
+        except Exception:
+            # 一个任务出错不能让后面的天气、索引、同步等都不再启动
+            log.exception("推迟的启动任务出错: %s", name)
+
+    def writeTimeline(self):
+        if not self.process_name:
+            return
+        os.makedirs(TIMELINE_DIR, exist_ok=True)
+        with open(os.path.join(TIMELINE_DIR, f"{self.process_name}.json"), "w") as f:
+            json.dump({"boot": self.boot, "started": BOOT_T0, "marks": marks(), "load": self.loads}, f, indent=4)
+
+_boot_scheduler = None
+
+def bootScheduler():
+    """获取进程级的开机阶段调度器"""
+    global _boot_scheduler
+    if _boot_scheduler is None:
+        _boot_scheduler = BootScheduler(load_app_settings().get("boot"))
+    return _boot_scheduler
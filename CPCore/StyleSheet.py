@@ -0,0 +1,100 @@
+import re
+import hashlib
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QTimer
+
+# 小组件的公共样式，按objectName匹配，整个进程只编译一次
+NOTE_QSS = """
+#note, #note * { font-family: Microsoft YaHei; }
+#noteText { font-size: 14px; color: black; }
+"""
+
+RULE_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+
+class StyleRegistry:
+    """
+    应用级样式表注册表
+
+    公共样式和各小组件的自定义QSS合并成一份应用样式表，内容相同的自定义样式只保留一份，
+    通过小组件的cpStyle动态属性限定作用范围，避免每个小组件各自setStyleSheet、各自解析和polish。
+    """
+    def __init__(self):
+        self.base = []  # 公共样式块（去重后按注册顺序）
+        self.scoped = {}  # 样式key -> [限定作用域后的QSS, 引用计数]
+        self.compiled = None
+        self.compile_timer = None
+        self.pending = False
+
+    def addBase(self, qss):
+        if qss not in self.base:
+            self.base.append(qss)
+            self.scheduleCompile()
+
+    def scope(self, key, qss, selector="#note"):
+        """把自定义QSS限定到cpStyle属性为key的小组件上"""
+        scope = f'{selector}[cpStyle="{key}"]'
+        if "{" not in qss:
+            # 只有声明没有选择器时，和setStyleSheet一样作用于小组件自身及其子控件
+            return f"{scope}, {scope} * {{ {qss} }}"
+        rules = []
+        for selectors, body in RULE_RE.findall(qss):
+            scoped = ", ".join(f"{scope} {s.strip()}" for s in selectors.split(",") if s.strip())
+            rules.append(f"{scoped} {{{body}}}")
+        return "\n".join(rules)
+
+    def apply(self, widget, qss):
+        """设置小组件的自定义样式，空字符串表示使用公共样式"""
+        old_key = widget.property("cpStyle") or ""
+        key = "s" + hashlib.sha1(qss.encode("utf-8")).hexdigest()[:12] if qss.strip() else ""
+        if key == old_key:
+            return
+        if key:
+            if key in self.scoped:
+                self.scoped[key][1] += 1
+            else:
+                self.scoped[key] = [self.scope(key, qss), 1]
+                self.scheduleCompile()
+        self.release(old_key)
+        widget.setProperty("cpStyle", key)
+        if not self.pending:
+            # 动态属性变化后需要重新polish才能匹配新的选择器；待编译时由setStyleSheet统一polish
+            widget.style().unpolish(widget)
+            widget.style().polish(widget)
+            widget.update()
+
+    def release(self, key):
+        if key and key in self.scoped:
+            self.scoped[key][1] -= 1
+            if self.scoped[key][1] <= 0:
+                del self.scoped[key]
+                self.scheduleCompile()
+
+    def scheduleCompile(self):
+        """合并同一轮事件循环里的多次修改，只重新编译一次"""
+        if QApplication.instance() is None:
+            return
+        if self.compile_timer is None:
+            self.compile_timer = QTimer()
+            self.compile_timer.setSingleShot(True)
+            self.compile_timer.timeout.connect(self.compile)
+        if self.compiled is None:
+            self.compile()  # 第一次立即编译，让首批小组件显示时就能用上公共样式
+        else:
+            self.pending = True
+            self.compile_timer.start(0)
+
+    def compile(self):
+        self.pending = False
+        text = "\n".join(self.base + [qss for qss, _ in self.scoped.values()])
+        if text != self.compiled:
+            self.compiled = text
+            QApplication.instance().setStyleSheet(text)
+
+_style_registry = None
+
+def styleRegistry():
+    """获取进程级的样式注册表"""
+    global _style_registry
+    if _style_registry is None:
+        _style_registry = StyleRegistry()
+    return _style_registry
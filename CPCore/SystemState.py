@@ -0,0 +1,204 @@
+import sys
+import ctypes
+from PySide6.QtWidgets import QWidget, QApplication
+from PySide6.QtCore import QObject, QAbstractNativeEventFilter, Signal
+from PySide6.QtNetwork import QLocalSocket
+from CPCore.Scheduler import scheduler
+
+# 考试模式宿主监听的本地套接字名，其他ClassPro进程连上后由宿主推送进入/退出考试模式
+EXAM_SERVER = "ClassPro_testmode"
+EXAM_RETRY = 5000  # 宿主还没运行时重新连接的间隔（毫秒）
+
+# 标题包含这些关键字且全屏的前台窗口视为正在演示
+PRESENTATION_KEYWORDS = ["PowerPoint ", "WPS Presentation Slide Show", "希沃白板", "Microsoft Edge"]
+
+WM_POWERBROADCAST = 0x0218
+WM_WTSSESSION_CHANGE = 0x02B1
+PBT_POWERSETTINGCHANGE = 0x8013
+WTS_SESSION_LOCK = 0x7
+WTS_SESSION_UNLOCK = 0x8
+
+if sys.platform == "win32":
+    from ctypes import wintypes
+
+    class GUID(ctypes.Structure):
+        _fields_ = [("Data1", wintypes.DWORD), ("Data2", wintypes.WORD),
+                    ("Data3", wintypes.WORD), ("Data4", ctypes.c_ubyte * 8)]
+
+    class POWERBROADCAST_SETTING(ctypes.Structure):
+        _fields_ = [("PowerSetting", GUID), ("DataLength", wintypes.DWORD), ("Data", ctypes.c_ubyte * 1)]
+
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.UINT), ("dwTime", wintypes.DWORD)]
+
+    # GUID_CONSOLE_DISPLAY_STATE {6FE69556-704A-47A0-8F24-C28D936FDA47}
+    GUID_CONSOLE_DISPLAY_STATE = GUID(0x6FE69556, 0x704A, 0x47A0,
+                                      (ctypes.c_ubyte * 8)(0x8F, 0x24, 0xC2, 0x8D, 0x93, 0x6F, 0xDA, 0x47))
+
+class _SessionEventFilter(QAbstractNativeEventFilter):
+    """接收锁屏/解锁和显示器开关的Windows消息"""
+    def __init__(self, state):
+        super().__init__()
+        self.state = state
+
+    def nativeEventFilter(self, eventType, message):
+        if bytes(eventType) == b"windows_generic_MSG":
+            msg = wintypes.MSG.from_address(int(message))
+            if msg.message == WM_WTSSESSION_CHANGE:
+                if msg.wParam == WTS_SESSION_LOCK:
+                    self.state.setCondition("locked", True)
+                elif msg.wParam == WTS_SESSION_UNLOCK:
+                    self.state.setCondition("locked", False)
+            elif msg.message == WM_POWERBROADCAST and msg.wParam == PBT_POWERSETTINGCHANGE:
+                setting = POWERBROADCAST_SETTING.from_address(msg.lParam)
+                if bytes(setting.PowerSetting) == bytes(GUID_CONSOLE_DISPLAY_STATE):
+                    # 0：关闭，1：打开，2：变暗
+                    self.state.setCondition("screen_off", setting.Data[0] == 0)
+        return False, 0
+
+class SystemState(QObject):
+    """
+    监视锁屏、关屏、全屏演示和考试模式，并据此挂起/恢复中央调度器里的非必要任务
+
+    presentationChanged在前台全屏演示开始/结束时发出；检测出错时发出presentationCheckFailed；
+    examChanged在考试模式开始/结束时发出。考试模式由宿主通过本地套接字推送，不需要轮询。
+    """
+    presentationChanged = Signal(bool)
+    presentationCheckFailed = Signal(str)
+    examChanged = Signal(bool)
+
+    def __init__(self):
+        super().__init__()
+        self.conditions = set()
+        self.presentation_supported = sys.platform == "win32"
+        if sys.platform == "win32":
+            self.installSessionHooks()
+        if self.presentation_supported:
+            self.poll_job = scheduler().register(1000, self.poll, "system-state", essential=True)
+        self.watching_exam = True
+        self.exam_retry = None
+        self.exam_socket = QLocalSocket(self)
+        self.exam_socket.connected.connect(self.examConnected)
+        self.exam_socket.readyRead.connect(self.readExam)
+        self.exam_socket.disconnected.connect(self.examLost)
+        self.exam_socket.errorOccurred.connect(self.examLost)
+        self.connectExam()
+
+    def installSessionHooks(self):
+        # 通知需要一个原生窗口句柄，用一个不显示的QWidget即可
+        self.hook_window = QWidget()
+        hwnd = int(self.hook_window.winId())
+        self.event_filter = _SessionEventFilter(self)
+        QApplication.instance().installNativeEventFilter(self.event_filter)
+        try:
+            ctypes.windll.wtsapi32.WTSRegisterSessionNotification(hwnd, 0)  # NOTIFY_FOR_THIS_SESSION
+            ctypes.windll.user32.RegisterPowerSettingNotification(hwnd, ctypes.byref(GUID_CONSOLE_DISPLAY_STATE), 0)
+        except (AttributeError, OSError):
+            pass
+
+    def setCondition(self, name, active):
+        """记录一种空闲条件，并同步到调度器的挂起原因"""
+        if active == (name in self.conditions):
+            return
+        if active:
+            self.conditions.add(name)
+            scheduler().suspend(name)
+        else:
+            self.conditions.discard(name)
+            scheduler().resume(name)
+        if name == "presentation":
+            self.presentationChanged.emit(active)
+        elif name == "exam":
+            self.examChanged.emit(active)
+
+    def isPresentationActive(self):
+        return "presentation" in self.conditions
+
+    def isExamActive(self):
+        return "exam" in self.conditions
+
+    def idleSeconds(self):
+        """距离用户最后一次键盘/鼠标输入的秒数，无法获取时返回0"""
+        if sys.platform != "win32":
+            return 0
+        info = LASTINPUTINFO()
+        info.cbSize = ctypes.sizeof(info)
+        if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+            return 0
+        return (ctypes.windll.kernel32.GetTickCount() - info.dwTime) % 2 ** 32 / 1000
+
+    def connectExam(self):
+        if self.watching_exam and self.exam_socket.state() == QLocalSocket.LocalSocketState.UnconnectedState:
+            self.exam_socket.connectToServer(EXAM_SERVER)
+
+    def examConnected(self):
+        if self.exam_retry is not None:
+            scheduler().unregister(self.exam_retry)
+            self.exam_retry = None
+        self.exam_socket.write(b"watch")  # 宿主先回复当前状态，之后在进入/退出时推送
+
+    def readExam(self):
+        while self.exam_socket.canReadLine():
+            command = bytes(self.exam_socket.readLine()).decode("utf-8").strip()
+            self.setCondition("exam", command == "on")
+
+    def examLost(self, *args):
+        """宿主没有运行或已经退出"""
+        self.setCondition("exam", False)  # 宿主退出时考试窗口也随之关闭
+        if self.watching_exam and self.exam_retry is None:
+            self.exam_retry = scheduler().register(EXAM_RETRY, self.connectExam, "exam-watch", essential=True)
+
+    def hostExam(self):
+        """本进程就是考试模式宿主，由它直接设置条件，不再连接"""
+        self.watching_exam = False
+        if self.exam_retry is not None:
+            scheduler().unregister(self.exam_retry)
+            self.exam_retry = None
+        self.exam_socket.abort()
+
+    def poll(self):
+        if self.isExamActive():
+            return  # 考试期间连演示检测也不做，把CPU全部让给考试软件
+        self.checkPresentation()
+
+    def detectPresentation(self):
+        """前台窗口是否是全屏的演示程序"""
+        import win32gui
+        import win32con
+        import win32api
+
+        # 获取当前活动窗口的句柄
+        hwnd = win32gui.GetForegroundWindow()
+        window_title = win32gui.GetWindowText(hwnd)
+
+        # 获取屏幕的尺寸
+        screen_width = win32api.GetSystemMetrics(win32con.SM_CXSCREEN)
+        screen_height = win32api.GetSystemMetrics(win32con.SM_CYSCREEN)
+
+        # 获取窗口的尺寸
+        window_rect = win32gui.GetWindowRect(hwnd)
+        window_width = window_rect[2] - window_rect[0]
+        window_height = window_rect[3] - window_rect[1]
+
+        # 判断窗口是否全屏
+        is_fullscreen = (window_width == screen_width and window_height == screen_height)
+        return any(keyword in window_title for keyword in PRESENTATION_KEYWORDS) and is_fullscreen
+
+    def checkPresentation(self):
+        if not self.presentation_supported:
+            return
+        try:
+            active = self.detectPresentation()
+        except Exception as e:
+            self.presentationCheckFailed.emit(str(e))
+            return
+        self.setCondition("presentation", active)
+
+_system_state = None
+
+def systemState():
+    """获取进程级的系统状态监视器"""
+    global _system_state
+    if _system_state is None:
+        _system_state = SystemState()
+    return _system_state
@@ -0,0 +1,381 @@
+import os
+import csv
+import json
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time as dtime, timedelta
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+from CPCore.Scheduler import scheduler
+from CPCore.NoteStore import writeAtomic
+
+log = logging.getLogger(__name__)
+
+# 课程表文件，格式见Timetable
+TIMETABLE_PATH = "data/timetable.json"
+# 查找下一节课时最多向后看的天数（覆盖寒暑假之外的长假）
+LOOKAHEAD_DAYS = 14
+# 转换事件之间没有课时，最长隔这么久重新计算一次，系统时间被调整后也能自行纠正
+MAX_SLEEP = 6 * 3600
+WEEKDAY_NAMES = {
+    "一": 1, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "日": 7, "天": 7,
+    "mon": 1, "tue": 2, "wed": 3, "thu": 4, "fri": 5, "sat": 6, "sun": 7,
+}
+
+def parseWeekday(value):
+    """1~7、“周一”“星期一”“一”或Mon/Monday，返回1（周一）~7（周日），无法识别时返回None"""
+    value = str(value).strip().lower()
+    if value.isdigit():
+        return int(value) if 1 <= int(value) <= 7 else None
+    for prefix in ("星期", "周", "礼拜"):
+        if value.startswith(prefix):
+            value = value[len(prefix):]
+            break
+    return WEEKDAY_NAMES.get(value[:3] if value.isascii() else value)
+
+def parseTime(value):
+    """“8:00”或“08:00:30”转换为当天的秒数"""
+    parts = [int(part) for part in str(value).strip().split(":")]
+    if len(parts) == 2:
+        parts.append(0)
+    hour, minute, second = parts
+    if not (0 <= hour <= 24 and 0 <= minute < 60 and 0 <= second < 60):
+        raise ValueError(f"无效的时间: {value}")
+    return hour * 3600 + minute * 60 + second
+
+class Lesson:
+    """某一天里的一节课，start和end为datetime"""
+    def __init__(self, name, start, end):
+        self.name = name
+        self.start = start
+        self.end = end
+
+    def __eq__(self, other):
+        return isinstance(other, Lesson) and (self.name, self.start, self.end) == (other.name, other.start, other.end)
+
+    def __repr__(self):
+        return f"Lesson({self.name!r}, {self.start:%Y-%m-%d %H:%M}, {self.end:%H:%M})"
+
+class WeeklyIndex:
+    """
+    一周课表的区间索引
+
+    所有课节按“周几*86400+当天秒数”排序成一条时间轴，starts和ends是并行的有序数组，
+    取某一天的课节和查找某一时刻所在的课节都只需要二分查找。
+    """
+    def __init__(self, entries):
+        periods = []
+        for entry in entries:
+            weekday = parseWeekday(entry["weekday"])
+            if weekday is None:
+                raise ValueError(f"无效的星期: {entry['weekday']}")
+            start, end = parseTime(entry["start"]), parseTime(entry["end"])
+            if end <= start:
+                raise ValueError(f"下课时间早于上课时间: {entry}")
+            offset = (weekday - 1) * 86400
+            periods.append((offset + start, offset + end, entry.get("name", "")))
+        periods.sort()
+        self.starts = [period[0] for period in periods]
+        self.ends = [period[1] for period in periods]
+        self.names = [period[2] for period in periods]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def day(self, weekday):
+        """周weekday（1~7）的课节在数组中的下标范围"""
+        offset = (weekday - 1) * 86400
+        return bisect_left(self.starts, offset), bisect_left(self.starts, offset + 86400)
+
+    def lesson(self, i, day, weekday):
+        """把下标为i的课节放到日期day上，weekday为day使用的星期"""
+        monday = datetime.combine(day, dtime()) - timedelta(days=weekday - 1)
+        return Lesson(self.names[i], monday + timedelta(seconds=self.starts[i]), monday + timedelta(seconds=self.ends[i]))
+
+    def lessons(self, day, weekday=None):
+        """day这一天的全部课节，weekday用于调休时按另一天的课表上课"""
+        weekday = weekday or day.isoweekday()
+        first, last = self.day(weekday)
+        return [self.lesson(i, day, weekday) for i in range(first, last)]
+
+    def at(self, weekday, seconds):
+        """
+        周weekday当天第seconds秒时的课节
+
+        :return: (正在上的课的下标或None, 当天下一节课的下标或None)
+        """
+        first, last = self.day(weekday)
+        moment = (weekday - 1) * 86400 + seconds
+        i = bisect_right(self.starts, moment, first, last)
+        current = i - 1 if i > first and self.ends[i - 1] > moment else None
+        return current, i if i < last else None
+
+class Term:
+    def __init__(self, name, start, end, weekly):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.weekly = weekly
+
+class Timetable:
+    """
+    课程表
+
+    数据格式::
+
+        {
+            "weekly": [{"weekday": 1, "start": "08:00", "end": "08:45", "name": "语文"}, ...],
+            "terms": [{"name": "秋季学期", "start": "2026-09-01", "end": "2027-01-20", "weekly": [...]}],
+            "days": {"2026-10-01": [], "2026-10-11": {"as": 5}, "2026-12-31": [{"start": ..., "end": ..., "name": ...}]}
+        }
+
+    weekly是默认的周课表；terms中的学期有自己的weekly时在学期内代替默认课表，学期按开始日期排序后二分查找。
+    days按日期覆盖：空列表表示放假，{"as": 星期}表示调休按另一天的课表上课，课节列表表示当天的特殊安排。
+    """
+    def __init__(self, data=None):
+        data = data or {}
+        self.weekly = WeeklyIndex(data.get("weekly", []))
+        self.terms = []
+        for term in data.get("terms", []):
+            weekly = WeeklyIndex(term["weekly"]) if "weekly" in term else self.weekly
+            self.terms.append(Term(term.get("name", ""), date.fromisoformat(term["start"]),
+                                   date.fromisoformat(term["end"]), weekly))
+        self.terms.sort(key=lambda term: term.start)
+        self.term_starts = [term.start for term in self.terms]
+        self.days = {}
+        for key, value in data.get("days", {}).items():
+            if isinstance(value, dict):
+                weekday = parseWeekday(value["as"])
+                if weekday is None:
+                    raise ValueError(f"无效的调休星期: {value['as']}")
+                self.days[date.fromisoformat(key)] = weekday
+            else:
+                self.days[date.fromisoformat(key)] = WeeklyIndex(
+                    [dict(entry, weekday=date.fromisoformat(key).isoweekday()) for entry in value])
+
+    def __bool__(self):
+        return bool(len(self.weekly) or self.days or any(len(term.weekly) for term in self.terms))
+
+    def resolve(self, day):
+        """day这一天使用的(周课表索引, 星期)"""
+        i = bisect_right(self.term_starts, day) - 1
+        weekly = self.terms[i].weekly if i >= 0 and day <= self.terms[i].end else self.weekly
+        override = self.days.get(day)
+        if isinstance(override, WeeklyIndex):
+            return override, day.isoweekday()
+        return weekly, override or day.isoweekday()
+
+    def lessons(self, day):
+        weekly, weekday = self.resolve(day)
+        return weekly.lessons(day, weekday)
+
+    def lookup(self, now):
+        """
+        now时刻正在上的课和下一节课
+
+        :return: (Lesson或None, Lesson或None)
+        """
+        today = now.date()
+        weekly, weekday = self.resolve(today)
+        current, following = weekly.at(weekday, (now - datetime.combine(today, dtime())).total_seconds())
+        current = weekly.lesson(current, today, weekday) if current is not None else None
+        if following is not None:
+            return current, weekly.lesson(following, today, weekday)
+        for offset in range(1, LOOKAHEAD_DAYS + 1):
+            day = today + timedelta(days=offset)
+            weekly, weekday = self.resolve(day)
+            first, last = weekly.day(weekday)
+            if first < last:
+                return current, weekly.lesson(first, day, weekday)
+        return current, None
+
+    def transitions(self, since, until):
+        """(since, until]之间所有上课和下课的时刻，升序排列"""
+        moments = set()
+        day = since.date()
+        while day <= until.date():
+            for lesson in self.lessons(day):
+                moments.update(moment for moment in (lesson.start, lesson.end) if since < moment <= until)
+            day += timedelta(days=1)
+        return sorted(moments)
+
+def load(path=TIMETABLE_PATH):
+    """读取课程表，文件不存在时返回空课程表"""
+    if not os.path.exists(path):
+        return Timetable()
+    with open(path, "r", encoding="utf-8") as f:
+        return Timetable(json.load(f))
+
+def readCsv(path):
+    # 从Excel导出的CSV可能是带BOM的UTF-8，也可能是GBK
+    for encoding in ("utf-8-sig", "gbk"):
+        try:
+            with open(path, "r", encoding=encoding, newline="") as f:
+                return [row for row in csv.reader(f) if any(cell.strip() for cell in row)]
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("无法识别CSV文件的编码")
+
+CSV_COLUMNS = {
+    "weekday": ("weekday", "星期", "周"), "start": ("start", "开始", "上课"), "end": ("end", "结束", "下课"),
+    "name": ("name", "课程", "科目"), "term": ("term", "学期"),
+    "term_start": ("term_start", "学期开始"), "term_end": ("term_end", "学期结束"),
+}
+
+def parseCsv(path):
+    """
+    把CSV转换成课程表数据，支持两种布局：
+
+    - 表格：表头为“时间,周一,周二,...”，每行第一列是“08:00-08:45”，其余列是当天这一节的课程，空格表示没课
+    - 列表：表头包含weekday/start/end/name（或星期/开始/结束/课程），可选term/term_start/term_end按学期分组
+    """
+    rows = readCsv(path)
+    if not rows:
+        return {"weekly": []}
+    header = [cell.strip().lower() for cell in rows[0]]
+    weekdays = [parseWeekday(cell) if cell else None for cell in header[1:]]
+    if any(weekdays):
+        weekly = []
+        for row in rows[1:]:
+            start, _, end = row[0].replace("~", "-").replace("–", "-").partition("-")
+            for weekday, name in zip(weekdays, row[1:]):
+                if weekday and name.strip():
+                    weekly.append({"weekday": weekday, "start": start.strip(), "end": end.strip(), "name": name.strip()})
+        return {"weekly": weekly}
+
+    columns = {}
+    for key, aliases in CSV_COLUMNS.items():
+        matches = [i for i, cell in enumerate(header) if cell in aliases]
+        if matches:
+            columns[key] = matches[0]
+    missing = [key for key in ("weekday", "start", "end", "name") if key not in columns]
+    if missing:
+        raise ValueError(f"CSV缺少列: {', '.join(missing)}")
+    weekly = []
+    terms = {}
+    for row in rows[1:]:
+        cell = lambda key: row[columns[key]].strip() if key in columns and columns[key] < len(row) else ""
+        entry = {"weekday": cell("weekday"), "start": cell("start"), "end": cell("end"), "name": cell("name")}
+        if cell("term_start") and cell("term_end"):
+            key = (cell("term"), cell("term_start"), cell("term_end"))
+            terms.setdefault(key, []).append(entry)
+        else:
+            weekly.append(entry)
+    return {"weekly": weekly,
+            "terms": [{"name": name, "start": start, "end": end, "weekly": entries}
+                      for (name, start, end), entries in terms.items()]}
+
+def importFile(path, out_path=TIMETABLE_PATH):
+    """
+    从CSV或JSON导入课程表，校验通过后替换现有的课程表
+
+    :return: 导入后的Timetable
+    """
+    if path.lower().endswith(".csv"):
+        data = parseCsv(path)
+    else:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            data = json.load(f)
+    timetable = Timetable(data)  # 格式有误时在这里抛出ValueError/KeyError，不会覆盖原文件
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    writeAtomic(out_path, json.dumps(data, indent=4, ensure_ascii=False).encode("utf-8"))
+    return timetable
+
+class TimetableClock(QObject):
+    """
+    当前课节的通知
+
+    不按固定周期轮询：每次计算出接下来一天内所有上下课的时刻，只在下一个时刻到来时唤醒一次，
+    发出changed(正在上的课, 下一节课)。锁屏或睡眠恢复后立即重新计算。
+    """
+    changed = Signal(object, object)
+
+    def __init__(self, path=TIMETABLE_PATH):
+        super().__init__()
+        self.path = path
+        self.timetable = Timetable()
+        self.current = None
+        self.next = None
+        self.events = []
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.fire)
+        scheduler().suspendedChanged.connect(self.suspendedChanged)
+
+    def reload(self):
+        """重新读取课程表文件，格式有误时保留原来的课程表"""
+        try:
+            self.timetable = load(self.path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning("课程表读取失败: %s", e, extra={"notify": True})
+        self.events = []
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        now = datetime.now()
+        current, following = self.timetable.lookup(now) if self.timetable else (None, None)
+        if force or current != self.current or following != self.next:
+            self.current, self.next = current, following
+            self.changed.emit(current, following)
+        self.arm(now)
+
+    def arm(self, now):
+        self.events = [moment for moment in self.events if moment > now]
+        if not self.events and self.timetable:
+            self.events = self.timetable.transitions(now, now + timedelta(days=1))
+        wake = self.events[0] if self.events else now + timedelta(seconds=MAX_SLEEP)
+        seconds = min((wake - now).total_seconds(), MAX_SLEEP)
+        self.timer.start(max(0, int(seconds * 1000) + 1))
+
+    def fire(self):
+        self.refresh()
+
+    def suspendedChanged(self, suspended):
+        # 睡眠期间定时器可能没有按时触发
+        if not suspended:
+            self.events = []
+            self.refresh()
+
+_timetable_clock = None
+
+def timetableClock():
+    """获取进程级的课节通知，第一次获取时读取data/timetable.json"""
+    global _timetable_clock
+    if _timetable_clock is None:
+        _timetable_clock = TimetableClock()
+        _timetable_clock.reload()
+    return _timetable_clock
+
+def describe(current, following, now=None):
+    """快速启动栏显示的课节文字"""
+    now = now or datetime.now()
+    parts = []
+    if current is not None:
+        parts.append(f"{current.name} 至{current.end:%H:%M}")
+    if following is not None:
+        when = f"{following.start:%H:%M}"
+        if following.start.date() != now.date():
+            when = ("明天 " if following.start.date() == now.date() + timedelta(days=1)
+                    else f"周{'一二三四五六日'[following.start.weekday()]} ") + when
+        parts.append(f"下节 {following.name} {when}")
+    return " | ".join(parts) or "近期无课"
+
+def main(args):
+    """
+    springboard.py timetable <命令>
+
+    import <CSV或JSON文件>：导入课程表
+    show [日期时间]：显示该时刻（默认现在）的课节和当天的课程
+    """
+    command = args[0] if args else None
+    if command == "import" and len(args) > 1:
+        timetable = importFile(args[1])
+        print(f"已导入 {len(timetable.weekly)} 节周课表，{len(timetable.terms)} 个学期")
+    elif command == "show":
+        now = datetime.fromisoformat(args[1]) if len(args) > 1 else datetime.now()
+        timetable = load()
+        print(describe(*timetable.lookup(now), now=now))
+        for lesson in timetable.lessons(now.date()):
+            print(f"{lesson.start:%H:%M}-{lesson.end:%H:%M} {lesson.name}")
+    else:
+        print(main.__doc__)
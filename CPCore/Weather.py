@@ -0,0 +1,61 @@
+import time
+from PySide6.QtCore import QObject, Signal
+from CPCore.Settings import load_app_settings
+from CPCore.Metrics import metrics
+
+WEATHER_URL = "https://weatherapi.market.xiaomi.com/wtr-v3/weather/all?latitude=110&longitude=112&isLocated=true&locationKey=weathercn%3A{cityid}&days=1&appKey=weather20151024&sign=zUFJoAR2ZVrDy1vF3D07&romVersion=7.2.16&appVersion=87&alpha=false&isGlobal=false&device=cancro&modDevice=&locale=zh_cn"
+HEADERS = {
+    "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36 Edg/132.0.0.0"
+}
+
+def fetch(cityid, url=WEATHER_URL, timeout=5):
+    """直接向天气接口请求，返回解析后的json"""
+    import requests
+    response = requests.get(url.format(cityid=cityid), headers=HEADERS, timeout=timeout)
+    response.raise_for_status()  # 确保请求成功
+    return response.json()
+
+FETCH_SECONDS = metrics().summary("classpro_weather_fetch_seconds", "获取天气的耗时")
+FETCH_FAILURES = metrics().counter("classpro_weather_fetch_failures_total", "获取天气失败的次数")
+
+class WeatherService(QObject):
+    """
+    天气数据来源：默认直接请求天气接口，开启局域网集群模式时改由集群节点提供
+
+    集群选举在后台进行，期间get返回上次的数据或None，选举有结果后发出ready。
+    """
+    ready = Signal()
+
+    def __init__(self, fleet_settings=None):
+        super().__init__()
+        self.node = None
+        if fleet_settings and fleet_settings.get("enabled", False):
+            from CPCore.Fleet import FleetNode
+            self.node = FleetNode.fromSettings(fleet_settings)
+            self.node.elected = self.ready.emit  # 从套接字线程发出，排队送到界面线程
+
+    def get(self, cityid):
+        """
+        :return: 天气数据，集群正在选举且还没有数据时返回None
+        """
+        start = time.perf_counter()
+        try:
+            if self.node is not None:
+                if not self.node.started:
+                    self.node.start()  # 第一次取天气时才加入集群，开机时不抢着联网
+                return self.node.getWeather(cityid)
+            return fetch(cityid)
+        except Exception:
+            FETCH_FAILURES.inc()
+            raise
+        finally:
+            FETCH_SECONDS.observe(time.perf_counter() - start)
+
+_weather_service = None
+
+def weatherService():
+    """获取进程级的天气服务，按data/app.json中的fleet配置决定是否走集群"""
+    global _weather_service
+    if _weather_service is None:
+        _weather_service = WeatherService(load_app_settings().get("fleet"))
+    return _weather_service
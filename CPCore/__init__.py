@@ -1,3 +1,21 @@
 import CPCore.Settings as Settings
+import CPCore.ImageCache as ImageCache
+import CPCore.ScreenGeometry as ScreenGeometry
+import CPCore.Overlay as Overlay
+import CPCore.StyleSheet as StyleSheet
+import CPCore.Scheduler as Scheduler
+import CPCore.SystemState as SystemState
+import CPCore.Weather as Weather
+import CPCore.Binding as Binding
+import CPCore.NoteStore as NoteStore
+import CPCore.Memory as Memory
+import CPCore.Startup as Startup
+import CPCore.Snapshot as Snapshot
+import CPCore.Timetable as Timetable
+import CPCore.Quality as Quality
+import CPCore.Log as Log
+import CPCore.Search as Search
+import CPCore.Profile as Profile
+import CPCore.Metrics as Metrics
 
 VERSION = "1.0.0"
\ No newline at end of file
@@ -1,4 +1,4 @@
-import pystray,sys,os,threading,json
+import pystray,sys,os,threading,json,time
 from PIL import Image
 from CPCore import*
 import subprocess
@@ -20,6 +20,8 @@ def load_settings():
 def baricon():
     menu = pystray.Menu(
         pystray.MenuItem('设置', lambda: threading.Thread(target=Settings.start_app).start()), 
+        pystray.MenuItem('搜索笔记', lambda: threading.Thread(target=lambda: subprocess.run(["python", "springboard.py", "search"], creationflags=subprocess.CREATE_NO_WINDOW)).start()),
+        pystray.MenuItem('内存占用', lambda icon, item: icon.notify(Memory.summary(), "ClassPro内存占用")),
         pystray.MenuItem('退出', lambda: exitapp("defult")),
         )
 
@@ -63,6 +65,12 @@ if __name__ == "__main__":
   """)
     
     settings = load_settings()
+    Log.setup("tray")
+
+    # 子进程据此记录启动时间线，开机自启动时推迟非关键任务
+    os.environ["CLASSPRO_BOOT_T0"] = str(time.time())
+    if "--autostart" in sys.argv:
+        os.environ["CLASSPRO_BOOT"] = "1"
     
     if settings.get("qs_enabled", True):
         threading.Thread(target=lambda: subprocess.run(["python", "springboard.py", "qs"], creationflags=subprocess.CREATE_NO_WINDOW)).start()
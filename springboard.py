@@ -12,8 +12,35 @@ if __name__ == "__main__":
     if cmdvalue == "qs":
         qs.run_quickstart()
     if cmdvalue == "testmode":
-        testmode.run()
+        testmode.run(sys.argv[2] if len(sys.argv) > 2 else "on")
     if cmdvalue == "mdwidget":
         MarkdownWidgetManager.run_markdown_widget_manager()
     if cmdvalue == "htmlwidget":
-        HtmlWidgetManager.run_html_widget_manager()
\ No newline at end of file
+        HtmlWidgetManager.run_html_widget_manager()
+    if cmdvalue == "fleet-sim":
+        from CPCore import Fleet
+        Fleet.simulate(*[int(arg) for arg in sys.argv[2:4]])
+    if cmdvalue == "fleet-node":
+        from CPCore import Fleet
+        Fleet.run_node(sys.argv[2:])
+    if cmdvalue == "sync":
+        from CPCore import NoteSync
+        NoteSync.main(sys.argv[2:])
+    if cmdvalue == "render":
+        from CPCore import Render
+        Render.main(sys.argv[2:])
+    if cmdvalue == "timetable":
+        from CPCore import Timetable
+        Timetable.main(sys.argv[2:])
+    if cmdvalue == "search":
+        from CPCore import Search
+        Search.main(sys.argv[2:])
+    if cmdvalue == "profile":
+        from CPCore import Profile
+        Profile.main(sys.argv[2:])
+    if cmdvalue == "notes":
+        from CPCore import NoteBatch
+        NoteBatch.main(sys.argv[2:])
+    if cmdvalue == "bench":
+        from CPCore import Bench
+        Bench.run(sys.argv[2:])
\ No newline at end of file
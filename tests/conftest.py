@@ -0,0 +1,42 @@
+import os
+import sys
+import time
+import pytest
+
+# 测试不需要真实显示器
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QCoreApplication, QEvent, QEventLoop, QTimer
+from PySide6.QtWidgets import QApplication
+
+@pytest.fixture(scope="session")
+def qapp():
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """以临时目录为工作目录，data/app.json也指向其中，不碰真实的笔记和设置"""
+    from CPCore import Settings, Profile, Quality
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(tmp_path / "data")
+    app_settings = str(tmp_path / "data" / "app.json")
+    for module in (Settings, Profile, Quality):
+        monkeypatch.setattr(module, "APP_SETTINGS_FILE", app_settings)
+    monkeypatch.setattr(Profile, "_profile_watcher", None)
+    return tmp_path
+
+def spin():
+    """让事件循环转一圈，并执行其间的deleteLater"""
+    loop = QEventLoop()
+    QTimer.singleShot(0, loop.quit)
+    loop.exec()
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+def waitFor(condition, timeout=2.0):
+    """转动事件循环直到condition()成立，用于等待本地套接字的往返"""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        spin()
+        time.sleep(0.005)
+    return condition()
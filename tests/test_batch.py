@@ -0,0 +1,165 @@
+import os
+import json
+import pytest
+from CPCore import NoteBatch as batch_module
+from CPCore.NoteBatch import NoteBatch, recover, importNotes, exportNotes, deleteNotes, noteRoot, JOURNAL, LOCK
+from CPCore.NoteStore import NoteFile, COMPRESS_THRESHOLD
+
+def files(root):
+    """笔记根目录下所有文件的相对路径和内容，锁文件除外"""
+    result = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name == LOCK:
+                continue
+            with open(os.path.join(directory, name), "rb") as f:
+                result[os.path.relpath(os.path.join(directory, name), root)] = f.read()
+    return result
+
+def contents(root, kind="md"):
+    return {note_id: content for _, note_id, _, content in batch_module.iterNotes(root, [kind])}
+
+@pytest.fixture
+def root(tmp_path):
+    root = str(tmp_path / "note")
+    with NoteBatch(root) as batch:
+        batch.put("md", "a", {"position": {"x": 0, "y": 0}}, "甲")
+        batch.put("md", "b", {"position": {"x": 0, "y": 0}}, "乙")
+    return root
+
+def test_commit_writes_every_note(root):
+    assert contents(root) == {"a": "甲", "b": "乙"}
+    assert sorted(files(root)) == sorted(os.path.join("md", name)
+                                         for name in ("a.content", "a.json", "b.content", "b.json"))
+
+def test_exception_inside_batch_changes_nothing(root):
+    before = files(root)
+    with pytest.raises(RuntimeError):
+        with NoteBatch(root) as batch:
+            batch.put("md", "a", {}, "改过的甲")
+            batch.delete("md", "b")
+            raise RuntimeError
+    assert files(root) == before
+
+@pytest.mark.parametrize("kind, note_id", [("md", "../a"), ("md", ""), ("txt", "a"), ("md", "a/b")])
+def test_invalid_notes_are_rejected(root, kind, note_id):
+    with NoteBatch(root) as batch:
+        with pytest.raises(ValueError):
+            batch.put(kind, note_id, {}, "x")
+
+def test_duplicate_note_in_one_batch_is_rejected(root):
+    with pytest.raises(ValueError):
+        with NoteBatch(root) as batch:
+            batch.put("md", "a", {}, "一")
+            batch.delete("md", "a")
+    assert contents(root) == {"a": "甲", "b": "乙"}
+
+def test_replacing_with_other_format_removes_stale_content(root):
+    with NoteBatch(root) as batch:
+        batch.put("md", "a", {}, "长" * (COMPRESS_THRESHOLD + 1))
+    assert not os.path.exists(os.path.join(root, "md", "a.content"))
+    with NoteBatch(root) as batch:
+        batch.put("md", "a", {}, "短")
+    assert contents(root)["a"] == "短"
+    names = sorted(name for name in os.listdir(os.path.join(root, "md")) if name.startswith("a."))
+    assert names == ["a.content", "a.json"]  # 压缩的旧正文已删除
+
+def test_interrupted_before_journal_is_rolled_back(root, monkeypatch):
+    before = files(root)
+    monkeypatch.setattr(batch_module, "writeAtomic", lambda path, data: (_ for _ in ()).throw(OSError("磁盘已满")))
+    batch = NoteBatch(root)
+    batch.put("md", "c", {}, "丙")
+    with pytest.raises(OSError):
+        batch.commit()  # 模拟进程在写出日志时退出，没有走abort
+    assert any(name.startswith(".batch-") for name in os.listdir(root))
+    recover(root)
+    assert files(root) == before
+
+def test_interrupted_after_journal_is_completed(root, monkeypatch):
+    real_replace = os.replace
+    moved = []
+
+    def replace(source, target):
+        if len(moved) == 2:
+            raise OSError("进程被终止")
+        moved.append(target)
+        real_replace(source, target)
+
+    monkeypatch.setattr(batch_module.os, "replace", replace)
+    with pytest.raises(OSError):
+        with NoteBatch(root) as batch:
+            batch.put("md", "a", {"position": {"x": 1, "y": 1}}, "新甲")
+            batch.put("md", "c", {}, "丙")
+            batch.delete("md", "b")
+    assert os.path.exists(os.path.join(root, JOURNAL))
+    monkeypatch.setattr(batch_module.os, "replace", real_replace)
+    recover(root)
+    recover(root)  # 重复执行没有影响
+    assert contents(root) == {"a": "新甲", "c": "丙"}
+    assert sorted(os.listdir(root)) == [LOCK, "html", "md"]
+
+def test_recover_leaves_a_live_batch_alone(root):
+    """笔记进程在命令行导入暂存期间启动"""
+    batch = NoteBatch(root)
+    batch.put("md", "a", {}, "长" * (COMPRESS_THRESHOLD + 1))  # 换成压缩格式，旧的.content在删除之列
+    recover(root)
+    assert os.path.isdir(batch.staging)
+    batch.commit()
+    assert contents(root)["a"] == "长" * (COMPRESS_THRESHOLD + 1)
+    assert not any(name.startswith(".batch-") for name in os.listdir(root))
+
+def test_second_batch_waits_for_the_first(root):
+    batch = NoteBatch(root)
+    with pytest.raises(OSError):
+        NoteBatch(root)
+    batch.abort()
+    NoteBatch(root).abort()
+
+def test_missing_staged_file_keeps_journal_and_old_body(root, monkeypatch):
+    monkeypatch.setattr(batch_module, "replay", lambda note_root, journal: None)  # 日志写出后进程退出
+    batch = NoteBatch(root)
+    batch.put("md", "a", {}, "长" * (COMPRESS_THRESHOLD + 1))
+    batch.commit()
+    monkeypatch.undo()
+    for name in os.listdir(batch.staging):
+        os.remove(os.path.join(batch.staging, name))  # 暂存文件被误删
+    before = files(root)
+    with pytest.raises(OSError):
+        recover(root)
+    assert files(root) == before
+    assert contents(root)["a"] == "甲"
+
+def test_import_export_round_trip(workdir):
+    source = workdir / "in.jsonl"
+    source.write_text("\n".join(json.dumps(record, ensure_ascii=False) for record in [
+        {"id": "a", "content": "# 甲", "style": {"color": "red"}},
+        {"id": "名字 不能当文件名", "content": "乙"},
+        {"kind": "html", "content": "<p>丙</p>"},
+    ]), encoding="utf-8")
+    assert importNotes(str(source)) == (3, 0)
+    assert exportNotes(str(workdir / "out")) == 3
+    assert importNotes(str(workdir / "out"), replace=True) == (3, 0)  # 同名覆盖，不会新增
+    root = noteRoot()
+    assert sorted(contents(root).values()) == ["# 甲", "乙"]
+    assert NoteFile(os.path.join(root, "md", "a.json")).loadMeta()["style"] == {"color": "red"}
+
+def test_import_with_bad_line_writes_nothing(workdir):
+    source = workdir / "ok.jsonl"
+    source.write_text(json.dumps({"id": "a", "content": "甲"}), encoding="utf-8")
+    importNotes(str(source))
+    before = files(noteRoot())
+    bad = workdir / "bad.jsonl"
+    bad.write_text(json.dumps({"id": "b", "content": "乙"}) + "\n{坏的\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="第2行"):
+        importNotes(str(bad), replace=True)
+    assert files(noteRoot()) == before
+
+def test_replace_and_delete(workdir):
+    source = workdir / "in.jsonl"
+    source.write_text("\n".join(json.dumps({"id": note_id, "content": note_id}) for note_id in "abc"), encoding="utf-8")
+    importNotes(str(source))
+    source.write_text(json.dumps({"id": "a", "content": "新"}), encoding="utf-8")
+    assert importNotes(str(source), replace=True) == (1, 2)
+    assert contents(noteRoot()) == {"a": "新"}
+    assert deleteNotes({"a", "missing"}) == 1
+    assert contents(noteRoot()) == {}
@@ -0,0 +1,109 @@
+import re
+import time
+import pytest
+from PySide6.QtGui import QTextDocument
+from CPCore.Binding import Binding, BoundLabel, bindingHub
+from CPCore.Scheduler import scheduler
+from CPBlock.MarkdownWidgetManager import MarkdownWidget
+from CPBlock.HtmlWidgetManager import HtmlWidget
+from conftest import spin
+
+def plain(text):
+    # 值为空时整段重新解析会把两侧的空格合并成一个，就地改写时保留两个
+    return re.sub(" +", " ", text)
+
+def fresh(html):
+    """整段重新设置的结果，作为对照"""
+    document = QTextDocument()
+    document.setHtml(html)
+    return plain(document.toPlainText())
+
+def close(*widgets):
+    for widget in widgets:
+        scheduler().unregister(widget.auto_save_job)
+        widget.deleteLater()
+    spin()
+
+@pytest.fixture
+def label(qapp):
+    label = BoundLabel()
+    yield label
+    label.deleteLater()
+
+def bound(label, text, values):
+    binding = Binding(text)
+    binding.values = values
+    label.setContent(binding.skeleton, binding)
+    return binding
+
+@pytest.mark.parametrize("updates", [
+    [["12:00:01", "2026-10-19"], ["12:00:02", "2026-10-19"], ["9", "2026-10-20"]],
+    [["", "x"], ["很长很长的值", ""], ["😀😀", "😀"], ["a", "b"]],
+])
+@pytest.mark.parametrize("text", [
+    "<h1>标题 <b>{{time}}</b></h1><ul><li>第一项 {{date}} 结束</li></ul>",
+    "<p>{{time}}{{date}}</p>",  # 相邻的占位符
+    "<table><tr><td>{{date}}</td></tr><tr><td>😀 {{time}}</td></tr></table>",
+])
+def test_set_values_matches_full_render(label, text, updates):
+    binding = bound(label, text, updates[0])
+    assert label.spans is not None
+    assert plain(label.document.toPlainText()) == fresh(binding.fill(binding.skeleton, updates[0]))
+    for values in updates[1:]:
+        label.setValues(values)
+        assert plain(label.document.toPlainText()) == fresh(binding.fill(binding.skeleton, values))
+
+def test_replaced_values_keep_their_format(label):
+    bound(label, "<p>现在 <b>{{time}}</b> 结束</p>", ["12:00:00"])
+    label.setValues(["很长很长的时间"])
+    cursor = label.document.find("很长很长的时间")
+    assert cursor.charFormat().fontWeight() > 400
+    assert not label.document.find("结束").charFormat().fontWeight() > 400
+
+def test_placeholder_outside_visible_text_falls_back(label):
+    bound(label, '<a href="x{{date}}">链接 {{time}}</a>', ["2026-10-19", "12:00:00"])
+    assert label.spans is None
+    label.setValues(["2026-10-20", "12:00:01"])
+    assert label.document.toPlainText() == "链接 12:00:01"
+
+@pytest.mark.parametrize("widget_class", [MarkdownWidget, HtmlWidget])
+def test_ticks_only_resize_when_text_extent_changes(qapp, tmp_path, widget_class):
+    widget = widget_class(str(tmp_path / "note.json"))
+    text = "开始 {{time}} 结束" if widget_class is MarkdownWidget else "<p>开始 {{time}} 结束</p>"
+    widget.updateText(text)
+    bindingHub().unbind(widget)  # 由测试手动刷新
+    widget.show()
+    spin()
+    widget.binding.values = ["00:00:00"]
+    widget.renderBinding()
+    size = widget.size()
+    # 等宽的新值不需要重新计算大小
+    assert widget.text_label.setValues(["12:34:56"]) is False
+    # 变宽时重新计算，结果与整段重新设置一致
+    widget.binding.values = ["很长很长很长很长的时间值"]
+    widget.renderBinding()
+    reference = widget_class(str(tmp_path / "reference.json"))
+    reference.updateText(text)
+    bindingHub().unbind(reference)
+    reference.binding.values = widget.binding.values
+    reference.text_label.setContent(reference.rendered_html, reference.binding)
+    reference.fitText()
+    assert widget.size() == reference.size()
+    assert widget.size().width() > size.width()
+    assert widget.grab().toImage() == reference.grab().toImage()
+    close(widget, reference)
+
+def test_partial_repaint_matches_full_repaint(qapp, tmp_path):
+    widget = MarkdownWidget(str(tmp_path / "note.json"))
+    widget.updateText("# 标题 **{{time}}**\n\n- 第一项 {{date}} 结束\n\n正文")
+    bindingHub().unbind(widget)
+    widget.show()
+    spin()
+    widget.binding.values = ["88:88:88", "1111-11-11"]
+    widget.renderBinding()
+    for _ in range(3):
+        spin()
+        time.sleep(0.02)
+    on_screen = widget.screen().grabWindow(widget.winId()).toImage()  # 只重绘了改动的段落的窗口内容
+    assert on_screen == widget.grab().toImage()  # 整个重绘
+    close(widget)
@@ -0,0 +1,77 @@
+import os
+import pytest
+from PySide6.QtNetwork import QLocalSocket
+from CPCore import SystemState as system_state_module
+from CPCore.SystemState import SystemState
+from CPCore.Scheduler import scheduler
+from CPBlock import testmode
+from CPBlock.testmode import ExamHost
+from conftest import spin, waitFor
+
+@pytest.fixture
+def exam(qapp, monkeypatch):
+    """另一个进程里的SystemState用单独的实例模拟"""
+    name = f"ClassPro_test_exam_{os.getpid()}"
+    monkeypatch.setattr(system_state_module, "EXAM_SERVER", name)
+    monkeypatch.setattr(testmode, "SERVER_NAME", name)
+    monkeypatch.setattr(system_state_module, "_system_state", None)
+    created = []
+
+    def watcher():
+        state = SystemState()
+        created.append(state)
+        return state
+
+    yield watcher
+    for state in created + [system_state_module.systemState()]:
+        state.hostExam()  # 注销重试任务
+        state.setCondition("exam", False)
+    assert "exam" not in scheduler().reasons
+
+def test_watchers_follow_enter_and_leave(exam):
+    watcher = exam()
+    assert watcher.exam_retry is not None  # 宿主还没运行
+    changes = []
+    watcher.examChanged.connect(changes.append)
+    host = ExamHost()
+    watcher.connectExam()  # 相当于重试任务到期
+    assert waitFor(lambda: host.watchers)
+    assert watcher.exam_retry is None
+    host.enter()
+    assert waitFor(watcher.isExamActive)
+    host.leave()
+    assert waitFor(lambda: not watcher.isExamActive())
+    assert changes == [True, False]
+    host.deleteLater()
+    spin()
+
+def test_late_watcher_gets_current_state(exam):
+    host = ExamHost()
+    host.enter()
+    watcher = exam()
+    assert watcher.exam_retry is None
+    assert waitFor(watcher.isExamActive)
+    host.leave()
+    host.deleteLater()
+    spin()
+
+def test_host_exit_releases_watchers(exam):
+    host = ExamHost()
+    watcher = exam()
+    assert waitFor(lambda: host.watchers)
+    host.enter()
+    assert waitFor(watcher.isExamActive)
+    host.window.hide()
+    host.deleteLater()  # 宿主进程退出，连接随之断开
+    assert waitFor(lambda: not watcher.isExamActive())
+    assert watcher.exam_retry in scheduler().jobs
+
+def test_one_shot_commands_are_released(exam):
+    host = ExamHost()
+    assert testmode.sendCommand("on")
+    assert waitFor(lambda: system_state_module.systemState().isExamActive())
+    assert testmode.sendCommand("off")
+    assert waitFor(lambda: not system_state_module.systemState().isExamActive())
+    assert waitFor(lambda: not host.server.findChildren(QLocalSocket))
+    host.deleteLater()
+    spin()
@@ -0,0 +1,81 @@
+import random
+import time
+import pytest
+from CPCore.Fleet import FleetNode
+from CPCore.Weather import WeatherService
+from conftest import waitFor
+
+CITY = 101010100
+
+@pytest.fixture
+def fleet():
+    """本机回环上的一个集群，每个测试用不同的组播端口互不干扰"""
+    discovery_port = random.randint(20000, 40000)
+    calls = []
+    nodes = []
+
+    def upstream(cityid):
+        calls.append(cityid)
+        return {"current": {"city": cityid}}
+
+    def node(**kwargs):
+        node = FleetNode(role="auto", port=0, discovery_port=discovery_port, interface="127.0.0.1",
+                         upstream=upstream, **kwargs)
+        nodes.append(node)
+        return node
+
+    node.calls = calls
+    node.discovery_port = discovery_port
+    yield node
+    for item in nodes:
+        if item.started:
+            item.stop()
+
+def test_start_does_not_wait_for_election(fleet):
+    node = fleet()
+    start = time.monotonic()
+    node.start()
+    assert node.getWeather(CITY) is None  # 选举还没有结果，也没有旧数据
+    assert time.monotonic() - start < 0.2
+    assert node.leader_found.wait(2)
+    assert node.is_leader
+    assert node.getWeather(CITY) == {"current": {"city": CITY}}
+
+def test_later_node_reads_from_leader(fleet):
+    leader = fleet()
+    leader.start()
+    assert leader.leader_found.wait(2)
+    follower = fleet()
+    follower.start()
+    assert follower.leader_found.wait(2)
+    assert not follower.is_leader and follower.leader[0] == leader.node_id
+    assert follower.getWeather(CITY) == leader.getWeather(CITY)
+    assert fleet.calls == [CITY]
+
+def test_lost_leader_returns_last_known_data(fleet):
+    leader = fleet()
+    leader.start()
+    assert leader.leader_found.wait(2)
+    follower = fleet()
+    follower.start()
+    assert follower.leader_found.wait(2)
+    data = follower.getWeather(CITY)
+    leader.stop()
+    follower.cache.put(CITY, None, 0)  # 缓存过期
+    start = time.monotonic()
+    assert follower.getWeather(CITY) == data  # 重新选举期间先用上次的数据
+    assert time.monotonic() - start < 0.2
+    assert follower.leader_found.wait(2)
+    assert follower.is_leader
+
+def test_service_signals_when_election_is_decided(qapp, fleet):
+    service = WeatherService({"enabled": True, "port": 0, "discovery_port": fleet.discovery_port,
+                              "interface": "127.0.0.1"})
+    service.node.upstream = lambda cityid: {"current": {"city": cityid}}
+    ready = []
+    service.ready.connect(lambda: ready.append(True))
+    assert not service.node.started  # 第一次取天气时才加入集群
+    assert service.get(CITY) is None
+    assert waitFor(lambda: ready)
+    assert service.get(CITY) == {"current": {"city": CITY}}
+    service.node.stop()
@@ -0,0 +1,71 @@
+import pytest
+from PySide6.QtGui import QImage, QColor, QTextDocument
+from PySide6.QtCore import QUrl
+from PySide6.QtWidgets import QLabel
+from CPCore.ImageCache import ImageCache
+from conftest import spin
+
+@pytest.mark.parametrize("tag, src, rest", [
+    ("""<img src='a.png' alt="x src=y">""", "a.png", ' alt="x src=y">'),
+    ("""<img data-src="q.png" srcset="z.png 2x" src=a.png width=10>""", "a.png", " width=10>"),
+    ("""<IMG title="a>b" SRC="a&amp;b.png"/>""", "a&b.png", "/>"),
+    ("""<img alt='src="y"' src="a.png" src="b.png">""", "a.png", ' src="b.png">'),  # 重复的属性以第一个为准
+])
+def test_only_the_real_src_attribute_is_rewritten(qapp, tag, src, rest):
+    html, resources = ImageCache().prepareHtml(f"<p>{tag}</p>")
+    assert [value[0] for value in resources.values()] == [src]
+    url = next(iter(resources))
+    assert html.endswith(f'src="{url}"{rest}</p>')
+    assert html.count("cpimg://") == 1
+
+@pytest.mark.parametrize("tag", ["<img alt='src=y.png'>", '<img data-src="y.png">', '<img srcset="y.png 2x">',
+                                 "<img src=http://example.com/y.png>"])
+def test_tags_without_local_src_are_left_alone(qapp, tag):
+    assert ImageCache().prepareHtml(tag) == (tag, {})
+
+@pytest.fixture
+def images(tmp_path):
+    paths = []
+    for i in range(3):
+        image = QImage(32, 32, QImage.Format.Format_ARGB32)  # 4 KB
+        image.fill(QColor(i * 100, 0, 0))
+        paths.append(str(tmp_path / f"{i}.png"))
+        image.save(paths[-1])
+    return paths
+
+def resource(label, html):
+    document = label.findChild(QTextDocument)
+    url = next(iter(ImageCache().prepareHtml(html)[1]))
+    return document.resource(QTextDocument.ResourceType.ImageResource, QUrl(url))
+
+def test_images_held_by_a_document_count_against_the_budget(qapp, images):
+    cache = ImageCache(budget_bytes=10 * 1024)
+    label = QLabel()
+    shown = f'<img src="{images[0]}" width=32 height=32>'
+    label.setText(cache.prepareLabel(label, shown))
+    for path in images[1:]:
+        cache.pixmap(path, 32, 32)
+    # 显示中的图片不淘汰，淘汰了文档也还引用着它，内存并不会减少
+    assert cache.pins and all(key in cache._entries for key in cache.pins)
+    assert cache.used_bytes <= cache.budget_bytes
+    cache.clear()
+    assert list(cache._entries) == list(cache.pins)
+    # 内容更换后旧图片从文档和缓存里一起释放
+    label.setText(cache.prepareLabel(label, "<p>没有图片</p>"))
+    assert resource(label, shown) is None
+    assert cache.pins == {} and cache.held == {}
+    cache.clear()
+    assert cache.used_bytes == 0
+
+def test_destroyed_documents_release_their_images(qapp, images):
+    cache = ImageCache()
+    labels = [QLabel() for _ in range(2)]
+    for label in labels:
+        label.setText(cache.prepareLabel(label, f'<img src="{images[0]}">'))
+    assert list(cache.pins.values()) == [2]  # 同一张图片在两个小组件间共享
+    labels[0].deleteLater()
+    spin()
+    assert list(cache.pins.values()) == [1]
+    labels[1].deleteLater()
+    spin()
+    assert cache.pins == {} and cache.held == {}
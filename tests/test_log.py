@@ -0,0 +1,48 @@
+import sys
+import logging
+from CPCore.Log import RateLimitFilter, entryOf
+
+def record(created, message="同步失败: 第%d次", args=(1,), level=logging.WARNING, lineno=10, exc_info=None):
+    """时间由created指定的日志记录"""
+    record = logging.LogRecord("CPCore.Sync", level, "Sync.py", lineno, message, args, exc_info)
+    record.created = created
+    return record
+
+def passed(limit, *records):
+    return [limit.filter(item) for item in records]
+
+def test_duplicates_are_suppressed_inside_the_window():
+    limit = RateLimitFilter(interval=60)
+    assert passed(limit, record(1000), record(1010, args=(2,)), record(1059.9, args=(3,))) == [True, False, False]
+    assert passed(limit, record(1020, "另一条消息", ())) == [True]
+    assert passed(limit, record(1020, lineno=11)) == [True]  # 不同位置的同一消息
+    assert passed(limit, record(1020, level=logging.INFO), record(1021, level=logging.INFO)) == [True, True]
+
+def test_release_after_window_carries_repeat_count():
+    limit = RateLimitFilter(interval=60)
+    first, *_ = records = [record(1000), record(1030), record(1040)]
+    assert passed(limit, *records) == [True, False, False]
+    assert first.repeated == 0
+    released = record(1060)
+    assert limit.filter(released)
+    assert released.repeated == 2
+    assert entryOf(released)["repeated"] == 2
+    # 新窗口从放行的那一刻算起，计数清零
+    assert passed(limit, record(1119), record(1120)) == [False, True]
+    assert limit.seen[next(iter(limit.seen))] == [1120, 0]
+
+def test_exception_type_is_part_of_the_key():
+    limit = RateLimitFilter(interval=60)
+    infos = []
+    for error in (OSError, ValueError, OSError):
+        try:
+            raise error("x")
+        except error:
+            infos.append(sys.exc_info())
+    assert passed(limit, *(record(1000 + i, exc_info=info) for i, info in enumerate(infos))) == [True, True, False]
+
+def test_oldest_keys_are_evicted():
+    limit = RateLimitFilter(interval=60, max_keys=2)
+    assert passed(limit, record(1000, lineno=1), record(1001, lineno=2), record(1002, lineno=3)) == [True] * 3
+    assert len(limit.seen) == 2
+    assert passed(limit, record(1003, lineno=1), record(1004, lineno=3)) == [True, False]
@@ -0,0 +1,40 @@
+import time
+import pytest
+from PySide6.QtNetwork import QTcpSocket, QHostAddress
+from CPCore.Metrics import MetricsServer, metrics
+from conftest import spin
+
+def fetch(port, path):
+    """像Prometheus一样发一次请求，读到对方断开为止"""
+    socket = QTcpSocket()
+    data = []
+    closed = []
+    socket.readyRead.connect(lambda: data.append(bytes(socket.readAll())))
+    socket.disconnected.connect(lambda: closed.append(True))
+    socket.connectToHost(QHostAddress(QHostAddress.SpecialAddress.LocalHost), port)
+    socket.connected.connect(lambda: socket.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1")))
+    deadline = time.monotonic() + 2
+    while not closed and time.monotonic() < deadline:
+        spin()
+        time.sleep(0.005)
+    socket.deleteLater()
+    return b"".join(data).decode("utf-8")
+
+@pytest.fixture
+def server(qapp):
+    server = MetricsServer(0)
+    yield server
+    server.server.close()
+    server.deleteLater()
+    spin()
+
+def test_scrapes_are_answered_and_released(server):
+    metrics().counter("classpro_test_total", "测试").inc(3)
+    port = server.server.serverPort()
+    for _ in range(3):
+        response = fetch(port, "/metrics")
+        assert response.startswith("HTTP/1.1 200 OK")
+        assert "classpro_test_total 3" in response
+    assert fetch(port, "/other").startswith("HTTP/1.1 404")
+    spin()
+    assert server.server.findChildren(QTcpSocket) == []
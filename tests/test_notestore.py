@@ -0,0 +1,69 @@
+import os
+import json
+import gzip
+import base64
+import pytest
+from CPCore import NoteStore as note_store_module
+from CPCore.NoteStore import NoteFile, NOTE_WRITES, COMPRESS_THRESHOLD
+
+LONG = "长" * (COMPRESS_THRESHOLD + 1)
+
+@pytest.fixture
+def note(tmp_path):
+    return NoteFile(str(tmp_path / "a.json"))
+
+def names(note):
+    return sorted(name for name in os.listdir(os.path.dirname(note.config_path)) if name.startswith("a."))
+
+def test_legacy_base64_content_is_read_and_converted(note):
+    meta = {"position": {"x": 1, "y": 2}, "content": base64.b64encode("# 旧笔记".encode("utf-8")).decode("ascii")}
+    with open(note.config_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    meta, content = note.load()
+    assert content == "# 旧笔记"
+    del meta["content"]
+    assert note.save(meta, content) is False  # 正文没有变，只是换成新格式
+    assert names(note) == ["a.content", "a.json"]
+    with open(note.config_path, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert "content" not in saved and saved["content_file"] == "a.content"
+    assert NoteFile(note.config_path).load() == (saved, "# 旧笔记")
+
+def test_switching_compression_removes_the_other_file(note):
+    note.save({}, "短")
+    assert names(note) == ["a.content", "a.json"]
+    assert note.save({}, LONG) is True
+    assert names(note) == ["a.content.gz", "a.json"]
+    with gzip.open(note.base + ".content.gz", "rb") as f:
+        assert f.read().decode("utf-8") == LONG
+    assert NoteFile(note.config_path).load()[1] == LONG
+    note.save({}, "又短了")
+    assert names(note) == ["a.content", "a.json"]
+    assert NoteFile(note.config_path).load() == ({"content_file": "a.content"}, "又短了")
+
+def test_unchanged_parts_are_not_written(note, monkeypatch):
+    note.save({"position": {"x": 0, "y": 0}}, "正文")
+    written = []
+    real_write = note_store_module.writeAtomic
+    monkeypatch.setattr(note_store_module, "writeAtomic",
+                        lambda path, data: (written.append(os.path.basename(path)), real_write(path, data)))
+    count = NOTE_WRITES.value
+    assert note.save({"position": {"x": 0, "y": 0}}, "正文") is False
+    assert written == []
+    note.save({"position": {"x": 5, "y": 0}}, "正文")  # 只移动了位置
+    assert written == ["a.json"]
+    assert note.save({"position": {"x": 5, "y": 0}}, "改过的正文") is True
+    assert written == ["a.json", "a.content"]
+    assert NOTE_WRITES.value == count + 2
+    # 刚读取的笔记原样保存也不写盘
+    reloaded = NoteFile(note.config_path)
+    meta, content = reloaded.load()
+    del meta["content_file"]
+    assert reloaded.save(meta, content) is False
+    assert written == ["a.json", "a.content"]
+
+def test_missing_content_file_is_rewritten(note):
+    note.save({}, "正文")
+    os.remove(note.base + ".content")
+    note.save({}, "正文")
+    assert NoteFile(note.config_path).load()[1] == "正文"
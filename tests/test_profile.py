@@ -0,0 +1,94 @@
+import os
+import pytest
+import shiboken6
+from CPCore import Profile
+from CPCore.NoteStore import NoteFile
+from CPBlock.MarkdownWidgetManager import MarkdownWidgetManager
+from CPBlock.HtmlWidgetManager import HtmlWidgetManager
+from conftest import spin
+
+MANAGERS = {"md": MarkdownWidgetManager, "html": HtmlWidgetManager}
+
+def writeNotes(kind, name, contents):
+    note_dir = Profile.noteDir(kind, name)
+    os.makedirs(note_dir, exist_ok=True)
+    for i, content in enumerate(contents):
+        NoteFile(os.path.join(note_dir, f"{i}.json")).save(
+            {"position": {"x": 40 + i * 220, "y": 40}, "draggable": True}, content)
+
+def visible(manager):
+    assert all(shiboken6.isValid(widget) for widget in manager.widgets)
+    return sorted(widget.raw_text for widget in manager.widgets if not widget.isHidden())
+
+@pytest.fixture(params=sorted(MANAGERS))
+def profiles(request, qapp, workdir):
+    """默认配置三条笔记，配置B复制后改一条、删一条"""
+    kind = request.param
+    writeNotes(kind, Profile.DEFAULT_PROFILE, ["一", "二", "三"])
+    Profile.create("B", copy_from=Profile.DEFAULT_PROFILE)
+    NoteFile(os.path.join(Profile.noteDir(kind, "B"), "1.json")).save(
+        {"position": {"x": 260, "y": 40}, "draggable": True}, "二（B）")
+    NoteFile(os.path.join(Profile.noteDir(kind, "B"), "2.json")).delete()
+    manager = MANAGERS[kind]()
+    spin()
+    yield manager
+    for widget in manager.widgets:
+        manager.destroyWidget(widget)
+    manager.releasePreloaded()
+    spin()
+
+@pytest.mark.parametrize("preload", [True, False])
+def test_switch_back_and_forth(profiles, preload):
+    manager = profiles
+    if preload:
+        manager.preloadProfiles()
+    assert visible(manager) == ["一", "三", "二"]
+    for _ in range(2):
+        manager.switchProfile("B")
+        spin()  # 换下来的小组件不能在这里被删除
+        assert visible(manager) == ["一", "二（B）"]
+        manager.switchProfile(Profile.DEFAULT_PROFILE)
+        spin()
+        assert visible(manager) == ["一", "三", "二"]
+    assert all(shiboken6.isValid(widget) for widgets in manager.preloaded.values() for widget in widgets)
+
+def test_switch_saves_outgoing_notes(profiles):
+    manager = profiles
+    widget = next(widget for widget in manager.widgets if widget.raw_text == "一")
+    widget.updateText("一（已编辑）")
+    manager.switchProfile("B")
+    spin()
+    meta, content = NoteFile(manager.notePaths(Profile.DEFAULT_PROFILE)[0]).load()
+    assert content == "一（已编辑）"
+    manager.switchProfile(Profile.DEFAULT_PROFILE)
+    spin()
+    assert "一（已编辑）" in visible(manager)
+
+def test_closed_widgets_are_released(profiles):
+    manager = profiles
+    closed = next(widget for widget in manager.widgets if widget.raw_text == "三")
+    closed.hide()
+    manager.switchProfile("B")
+    spin()
+    assert not shiboken6.isValid(closed)
+    assert all(shiboken6.isValid(widget) for widget in manager.preloaded[Profile.DEFAULT_PROFILE])
+
+@pytest.mark.parametrize("args", [["switch"], ["create"], ["create", "--copy"], ["create", "C", "--copy"], ["delete"]])
+def test_cli_missing_arguments_print_usage(workdir, capsys, args):
+    Profile.main(args)
+    assert capsys.readouterr().out.strip() == Profile.main.__doc__.strip()
+    assert Profile.names() == [Profile.DEFAULT_PROFILE]
+
+@pytest.mark.parametrize("args", [["create", ".."], ["create", "a/b"], ["switch", "没有"], ["delete", Profile.DEFAULT_PROFILE]])
+def test_cli_invalid_names_exit_with_message(workdir, capsys, args):
+    with pytest.raises(SystemExit) as exit_info:
+        Profile.main(args)
+    assert exit_info.value.code == 1
+    assert capsys.readouterr().err.startswith("操作失败")
+
+def test_cli_create_copy_and_switch(workdir):
+    writeNotes("md", Profile.DEFAULT_PROFILE, ["一"])
+    Profile.main(["create", "C", "--copy", Profile.DEFAULT_PROFILE])
+    Profile.main(["switch", "C"])
+    assert Profile.current() == "C"
+    assert sorted(os.listdir(Profile.noteDir("md", "C"))) == sorted(os.listdir(Profile.noteDir("md", Profile.DEFAULT_PROFILE)))
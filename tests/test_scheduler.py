@@ -0,0 +1,106 @@
+import pytest
+from CPCore import Scheduler as scheduler_module
+from CPCore.Scheduler import Scheduler, LOOP_LAG
+
+class FakeClock:
+    """单调时钟和挂钟分开拨动"""
+    def __init__(self, monotonic, wall):
+        self.monotonic = monotonic
+        self.wall = wall
+
+    def advance(self, ms):
+        self.monotonic += ms
+        self.wall += ms
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(monotonic=5_000, wall=1_700_000_000_500)
+    monkeypatch.setattr(scheduler_module, "_now", lambda: clock.monotonic)
+    monkeypatch.setattr(scheduler_module, "_wall", lambda: clock.wall)
+    monkeypatch.setattr(scheduler_module, "_wall_offset", None)
+    return clock
+
+@pytest.fixture
+def sched(qapp, clock):
+    sched = Scheduler()
+    yield sched
+    sched.timer.stop()
+
+def record(sched, interval, name, **kwargs):
+    runs = []
+    sched.register(interval, lambda: runs.append(scheduler_module._now()), name, **kwargs)
+    return runs
+
+def fireAt(sched, clock, monotonic):
+    clock.advance(monotonic - clock.monotonic)
+    sched.fire()
+
+def test_jobs_align_to_wall_clock_phase(sched, clock):
+    second = sched.register(1000, lambda: None, "second")
+    two = sched.register(2000, lambda: None, "two")
+    minute = sched.register(60_000, lambda: None, "minute")
+    assert second.due == 5_500  # 挂钟…001.000
+    assert two.due == 6_500  # 下一个2秒的整数倍是挂钟…002.000
+    assert minute.due == 5_000 + 60_000 - (1_700_000_000_500 % 60_000)
+    assert sched.deadline == min(job.due + job.tolerance for job in sched.jobs)
+    assert sched.timer.interval() == sched.deadline - clock.monotonic
+
+def test_jobs_with_related_intervals_share_wakeups(sched, clock):
+    second = record(sched, 1000, "second")
+    two = record(sched, 2000, "two")
+    for _ in range(6):
+        fireAt(sched, clock, sched.deadline)
+    assert len(second) == 6
+    assert len(two) == 3
+    assert set(two) <= set(second)
+
+def test_exact_boundary_runs_once(sched, clock):
+    runs = record(sched, 1000, "second", tolerance=0)
+    for jitter in (0, 1, -1, 0):
+        clock.wall += jitter  # 两次取时之间的毫秒误差
+        fireAt(sched, clock, sched.deadline)
+    assert len(runs) == 4
+    assert runs == sorted(set(runs))
+    assert all(later - earlier == 1000 for earlier, later in zip(runs, runs[1:]))
+
+def test_wall_clock_moving_backwards_does_not_stall(sched, clock):
+    runs = record(sched, 1000, "autosave")
+    fireAt(sched, clock, sched.deadline)
+    clock.wall -= 3_600_000  # 校时把挂钟往回拨了一小时
+    for _ in range(3):
+        fireAt(sched, clock, sched.deadline)
+    assert len(runs) == 4
+    assert all(0 < later - earlier <= 1100 for earlier, later in zip(runs, runs[1:]))
+
+def test_wall_clock_jumping_forward_does_not_fire_everything(sched, clock):
+    fast = record(sched, 1000, "second")
+    slow = record(sched, 300_000, "weather")
+    fireAt(sched, clock, sched.deadline)
+    clock.wall += 3_600_000
+    fireAt(sched, clock, clock.monotonic + 10)  # 挂钟跳变后马上唤醒
+    assert len(slow) == 0
+    assert len(fast) == 1
+    fireAt(sched, clock, sched.deadline)
+    assert len(fast) == 2
+    assert len(slow) == 0
+
+def test_loop_lag_uses_monotonic_deadline(sched, clock):
+    sched.register(1000, lambda: None, "second", tolerance=0)
+    count, total = LOOP_LAG.count, LOOP_LAG.sum
+    clock.wall -= 3_600_000
+    fireAt(sched, clock, sched.deadline + 30)
+    assert LOOP_LAG.count == count + 1
+    assert LOOP_LAG.sum - total == pytest.approx(0.03)
+
+def test_suspended_jobs_run_once_on_resume(sched, clock):
+    normal = record(sched, 1000, "normal")
+    catch_up = record(sched, 1000, "catch-up", catch_up=True)
+    essential = record(sched, 1000, "essential", essential=True)
+    sched.suspend("locked")
+    for _ in range(3):
+        fireAt(sched, clock, sched.deadline)
+    assert (len(normal), len(catch_up), len(essential)) == (0, 0, 3)
+    clock.advance(5000)
+    sched.resume("locked")
+    assert (len(normal), len(catch_up)) == (0, 1)
+    assert all(job.due > clock.monotonic for job in sched.jobs)
@@ -0,0 +1,117 @@
+import os
+import time
+import pytest
+from PySide6.QtNetwork import QLocalSocket
+from CPCore import Search
+from CPCore.Search import NoteIndex, SearchServer, SearchPopup, Request
+from conftest import spin, waitFor
+
+def ask(kind, message):
+    responses = []
+    Request(kind, message).finished.connect(responses.append)
+    assert waitFor(lambda: responses)
+    return responses[0]
+
+@pytest.fixture
+def index():
+    index = NoteIndex()
+    index.build()
+    return index
+
+def test_update_replaces_old_tokens(index):
+    index.update("a", "今天的作业是数学")
+    index.update("b", "明天考数学")
+    assert [result["id"] for result in index.search("作业")] == ["a"]
+    index.update("a", "今天没有安排")
+    assert index.search("作业") == []
+    assert "作业" not in index.postings
+    assert {result["id"] for result in index.search("数学")} == {"b"}
+    assert all(index.postings[token]["a"] == count for token, count in index.documents["a"][1].items())
+
+def test_remove_drops_every_posting(index):
+    index.update("a", "# English notes\n\n![图](data:image/png;base64,QUJD) homework 作业")
+    index.update("b", "<p>homework <b>作业</b></p><script>secret()</script>", "html")
+    assert {result["id"] for result in index.search("HOMEWORK 作业")} == {"a", "b"}
+    assert index.search("secret") == [] and index.search("QUJD") == []
+    index.remove("a")
+    index.remove("a")  # 重复删除不报错
+    assert {result["id"] for result in index.search("作业")} == {"b"}
+    index.remove("b")
+    assert index.postings == {} and len(index) == 0
+
+def test_pending_notes_are_indexed_on_first_search():
+    index = NoteIndex()
+    index.update("a", "开机时加载的笔记")
+    index.update("b", "马上被删除的笔记")
+    index.remove("b")
+    assert index.postings == {} and len(index) == 1
+    assert [result["id"] for result in index.search("笔记")] == ["a"]
+    assert index.pending == {}
+
+def test_phrase_must_be_contiguous(index):
+    index.update("a", "数学作业")
+    index.update("b", "学作 数学 业")  # 二元组都在但不连续
+    assert [result["id"] for result in index.search("数学作业")] == ["a"]
+
+@pytest.fixture
+def servers(qapp, monkeypatch):
+    monkeypatch.setattr(Search, "SERVER_NAME", f"ClassPro_test_search_{os.getpid()}_{{kind}}")
+    index = NoteIndex()
+    index.build()
+    monkeypatch.setattr(Search, "_note_index", index)
+    servers = {kind: SearchServer(kind, lambda doc_id: doc_id == "a") for kind in Search.NOTE_KINDS}
+    yield index, servers
+    for server in servers.values():
+        server.server.close()
+        server.deleteLater()
+    spin()
+
+@pytest.mark.parametrize("message", [{"query": 5}, {"query": None}, {"query": "x", "limit": "3"}, [1], "query",
+                                     {"focus": ["a"]}, {"limit": 3}])
+def test_malformed_requests_get_an_error(servers, message):
+    response = ask("md", message)
+    assert "error" in response
+    assert ask("md", {"focus": "a"}) is True  # 服务仍然正常
+
+def test_finished_connections_are_released(servers):
+    index, servers = servers
+    index.update("a", "作业")
+    for _ in range(3):
+        assert [result["id"] for result in ask("md", {"query": "作业"})] == ["a"]
+    assert waitFor(lambda: not servers["md"].server.findChildren(QLocalSocket))
+
+def test_request_without_server_fails_fast(qapp, monkeypatch):
+    monkeypatch.setattr(Search, "SERVER_NAME", f"ClassPro_test_missing_{os.getpid()}_{{kind}}")
+    start = time.monotonic()
+    assert ask("md", {"query": "作业"}) is None
+    assert time.monotonic() - start < 0.4  # 不是等到超时
+
+def test_popup_merges_results_without_blocking(servers):
+    index, servers = servers
+    index.update("a", "作业 作业 作业")
+    index.update("b", "作业")
+    popup = SearchPopup()
+    popup.query_edit.setText("作业")
+    start = time.perf_counter()
+    popup.query()
+    assert time.perf_counter() - start < 0.05  # 只发出请求，不等回复
+    assert waitFor(lambda: popup.waiting == 0)
+    # 两个进程共用同一个索引，各返回两条
+    assert [popup.result_list.item(i).text().split("\n")[0] for i in range(popup.result_list.count())] == \
+        ["作业 作业 作业", "作业 作业 作业", "作业", "作业"]
+    assert popup.status_label.text().startswith("4条结果")
+    popup.deleteLater()
+
+def test_stale_results_are_dropped(servers):
+    index, servers = servers
+    index.update("a", "作业")
+    popup = SearchPopup()
+    popup.query_edit.setText("作业")
+    popup.query()
+    popup.query_edit.setText("没有")
+    popup.query()
+    assert waitFor(lambda: popup.waiting == 0)
+    spin()
+    assert popup.result_list.count() == 0
+    assert popup.status_label.text() == "没有找到"
+    popup.deleteLater()
@@ -0,0 +1,25 @@
+import os
+import json
+from CPCore.Startup import BootScheduler, TIMELINE_DIR
+from conftest import waitFor
+
+def test_failing_deferred_task_does_not_stop_the_rest(qapp, workdir, caplog):
+    boot = BootScheduler()
+    boot.boot = False  # 不等待系统空闲
+    ran = []
+
+    def fail():
+        ran.append("fail")
+        raise RuntimeError("天气接口不可用")
+
+    boot.defer(fail, "weather")
+    boot.defer(lambda: ran.append("index"), "search-index")
+    boot.start("test")
+    timeline = os.path.join(TIMELINE_DIR, "test.json")
+    assert waitFor(lambda: os.path.exists(timeline))
+    assert ran == ["fail", "index"]
+    assert "weather" in caplog.text and "天气接口不可用" in caplog.text
+    with open(timeline) as f:
+        assert "deferred:search-index" in json.load(f)["marks"]
+    boot.defer(fail, "late")  # 第二阶段开始后立即执行，同样不抛出
+    assert ran[-1] == "fail"
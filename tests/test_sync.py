@@ -0,0 +1,59 @@
+import os
+import gzip
+import json
+import pytest
+from CPCore.NoteStore import NoteFile, writeAtomic
+from CPCore.NoteSync import SyncClient, SyncResult, publish, noteHash
+
+def publishManifest(out_dir, notes):
+    """直接写出清单和笔记，模拟不可信的发布方"""
+    digests = {}
+    for key, data in notes.items():
+        os.makedirs(os.path.dirname(os.path.join(out_dir, key)), exist_ok=True)
+        writeAtomic(os.path.join(out_dir, key + ".json.gz"), gzip.compress(data))
+        digests[key] = noteHash(data)
+    manifest = json.dumps({"version": 1, "notes": digests}, sort_keys=True).encode("utf-8")
+    writeAtomic(os.path.join(out_dir, "manifest.json.gz"), gzip.compress(manifest))
+    writeAtomic(os.path.join(out_dir, "manifest.sha256"), noteHash(manifest).encode("utf-8"))
+
+def bundle(content):
+    return json.dumps({"meta": {"position": {"x": 0, "y": 0}}, "content": content}).encode("utf-8")
+
+def test_pull_copies_published_notes(tmp_path):
+    admin = tmp_path / "admin"
+    os.makedirs(admin / "md")
+    NoteFile(str(admin / "md" / "a.json")).save({"position": {"x": 1, "y": 2}}, "内容")
+    publish(str(tmp_path / "pub"), str(admin))
+    client = SyncClient(str(tmp_path / "pub"), "md", str(tmp_path / "note"))
+    assert set(client.pull().changes) == {"a"}
+    assert NoteFile(str(tmp_path / "note" / "md" / "a.json")).load()[1] == "内容"
+    assert client.pull().changes == {}  # 清单没变时什么都不取
+
+@pytest.mark.parametrize("key", ["md/../../../escaped", "md/../escaped", "md/sub/escaped", "md/", "md/a\n", "md/..",
+                                 "html/../md/escaped"])
+def test_manifest_keys_outside_note_dir_are_ignored(tmp_path, key):
+    publishManifest(str(tmp_path / "pub" / "x" / "y"), {key: bundle("恶意"), "md/ok": bundle("正常")})
+    client = SyncClient(str(tmp_path / "pub" / "x" / "y"), "md", str(tmp_path / "client" / "note"))
+    result = client.pull()
+    assert set(result.changes) == {"ok"}
+    written = {os.path.relpath(os.path.join(root, name), tmp_path)
+               for root, _, names in os.walk(tmp_path) for name in names if "pub" not in root}
+    assert written == {os.path.join("client", "note", name)
+                       for name in ("sync_state_md.json", os.path.join("md", "ok.json"), os.path.join("md", "ok.content"))}
+
+def test_poisoned_state_is_not_deleted_through(tmp_path):
+    outside = tmp_path / "outside.json"
+    outside.write_text("{}")
+    os.makedirs(tmp_path / "note")
+    (tmp_path / "note" / "sync_state_md.json").write_text(json.dumps({"manifest": "", "notes": {"md/../../outside": "x"}}))
+    publishManifest(str(tmp_path / "pub"), {"md/ok": bundle("正常")})
+    result = SyncClient(str(tmp_path / "pub"), "md", str(tmp_path / "note")).pull()
+    assert set(result.changes) == {"ok"}
+    assert outside.exists()
+
+def test_write_changes_rejects_invalid_ids(tmp_path):
+    client = SyncClient(str(tmp_path / "pub"), "md", str(tmp_path / "note"))
+    with pytest.raises(ValueError):
+        client.writeChanges(SyncResult({"ok": bundle("正常"), "../escaped": bundle("恶意")}, {}, 0))
+    assert not os.path.exists(tmp_path / "note" / "md" / "ok.json")
+    assert not os.path.exists(tmp_path / "escaped.json")
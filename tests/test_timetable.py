@@ -0,0 +1,138 @@
+import json
+import pytest
+from datetime import date, datetime
+from CPCore import Timetable as timetable_module
+from CPCore.Timetable import Timetable, TimetableClock, WeeklyIndex, Lesson, parseCsv, importFile, describe
+
+MONDAY = date(2026, 10, 19)
+WEEKLY = [
+    {"weekday": "周一", "start": "08:55", "end": "09:40", "name": "数学"},
+    {"weekday": 1, "start": "08:00", "end": "08:45", "name": "语文"},
+    {"weekday": "Wed", "start": "14:00", "end": "14:45", "name": "英语"},
+    {"weekday": "日", "start": "23:00", "end": "24:00", "name": "晚自习"},
+]
+
+def at(hour, minute=0, second=0, day=MONDAY):
+    return datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute, second=second)
+
+@pytest.mark.parametrize("seconds, expected", [
+    (7 * 3600 + 59 * 60 + 59, (None, 0)),
+    (8 * 3600, (0, 1)),  # 上课铃响的那一秒已经在上课
+    (8 * 3600 + 44 * 60 + 59, (0, 1)),
+    (8 * 3600 + 45 * 60, (None, 1)),  # 下课铃响的那一秒已经下课
+    (9 * 3600 + 40 * 60, (None, None)),  # 周一最后一节之后不会找到周三的课
+])
+def test_index_lookup_at_period_boundaries(seconds, expected):
+    assert WeeklyIndex(WEEKLY).at(1, seconds) == expected
+
+def test_index_days_do_not_overlap():
+    index = WeeklyIndex(WEEKLY)
+    assert index.names == ["语文", "数学", "英语", "晚自习"]
+    assert [index.day(weekday) for weekday in range(1, 8)] == [(0, 2), (2, 2), (2, 3), (3, 3), (3, 3), (3, 3), (3, 4)]
+    assert index.at(7, 86399) == (3, None)
+    assert index.lessons(MONDAY)[1] == Lesson("数学", at(8, 55), at(9, 40))
+
+@pytest.mark.parametrize("entry", [
+    {"weekday": "周八", "start": "08:00", "end": "08:45"},
+    {"weekday": 1, "start": "08:45", "end": "08:45"},
+    {"weekday": 1, "start": "08:60", "end": "09:00"},
+])
+def test_invalid_periods_are_rejected(entry):
+    with pytest.raises(ValueError):
+        WeeklyIndex([entry])
+
+def test_lookup_crosses_into_following_days():
+    timetable = Timetable({"weekly": WEEKLY, "days": {"2026-10-21": []}})  # 周三放假
+    assert timetable.lookup(at(8, 30)) == (Lesson("语文", at(8, 0), at(8, 45)), Lesson("数学", at(8, 55), at(9, 40)))
+    sunday = date(2026, 10, 25)
+    assert timetable.lookup(at(10)) == (None, Lesson("晚自习", at(23, day=sunday), at(0, day=date(2026, 10, 26))))
+
+def test_terms_and_day_overrides():
+    timetable = Timetable({
+        "weekly": WEEKLY,
+        "terms": [{"name": "期中", "start": "2026-10-20", "end": "2026-10-20",
+                   "weekly": [{"weekday": 2, "start": "10:00", "end": "11:00", "name": "考试"}]}],
+        "days": {"2026-10-24": {"as": "周一"}, "2026-10-22": [{"start": "19:00", "end": "20:00", "name": "晚会"}]},
+    })
+    tuesday, thursday, saturday = (date(2026, 10, day) for day in (20, 22, 24))
+    assert [item.name for item in timetable.lessons(tuesday)] == ["考试"]
+    assert timetable.lessons(date(2026, 10, 27)) == []  # 学期结束后回到默认课表
+    assert timetable.lessons(thursday) == [Lesson("晚会", at(19, day=thursday), at(20, day=thursday))]
+    assert timetable.lessons(saturday) == [Lesson("语文", at(8, day=saturday), at(8, 45, day=saturday)),
+                                           Lesson("数学", at(8, 55, day=saturday), at(9, 40, day=saturday))]
+    assert timetable.transitions(at(9), at(0, day=date(2026, 10, 21))) == [at(9, 40), at(10, day=tuesday),
+                                                                            at(11, day=tuesday)]
+
+def test_grid_csv_in_gbk(tmp_path):
+    path = tmp_path / "课表.csv"
+    path.write_bytes("时间,周一,周二,,周三\n08:00-08:45,语文,,备注,英语\n08:55~09:40,数学,体育,,\n".encode("gbk"))
+    assert parseCsv(str(path)) == {"weekly": [
+        {"weekday": 1, "start": "08:00", "end": "08:45", "name": "语文"},
+        {"weekday": 3, "start": "08:00", "end": "08:45", "name": "英语"},
+        {"weekday": 1, "start": "08:55", "end": "09:40", "name": "数学"},
+        {"weekday": 2, "start": "08:55", "end": "09:40", "name": "体育"},
+    ]}
+
+def test_list_csv_with_terms(tmp_path):
+    path = tmp_path / "list.csv"
+    path.write_text("﻿星期,开始,结束,课程,学期,学期开始,学期结束\n"
+                    "1,08:00,08:45,语文,,,\n"
+                    "2,08:00,08:45,物理,秋季,2026-09-01,2027-01-20\n", encoding="utf-8")
+    data = parseCsv(str(path))
+    assert data["weekly"] == [{"weekday": "1", "start": "08:00", "end": "08:45", "name": "语文"}]
+    assert data["terms"] == [{"name": "秋季", "start": "2026-09-01", "end": "2027-01-20",
+                              "weekly": [{"weekday": "2", "start": "08:00", "end": "08:45", "name": "物理"}]}]
+    assert Timetable(data).lessons(date(2026, 10, 20))[0].name == "物理"
+
+def test_bad_import_keeps_existing_timetable(tmp_path):
+    out = tmp_path / "data" / "timetable.json"
+    good = tmp_path / "good.csv"
+    good.write_text("weekday,start,end,name\nMon,08:00,08:45,语文\n", encoding="utf-8")
+    assert len(importFile(str(good), str(out)).weekly) == 1
+    before = out.read_bytes()
+    for name, text in (("missing.csv", "weekday,start,name\n1,08:00,语文\n"),
+                       ("reversed.csv", "weekday,start,end,name\n1,09:00,08:00,语文\n")):
+        (tmp_path / name).write_text(text, encoding="utf-8")
+        with pytest.raises(ValueError):
+            importFile(str(tmp_path / name), str(out))
+    assert out.read_bytes() == before
+    assert json.loads(before)["weekly"][0]["name"] == "语文"
+
+def test_describe():
+    now = at(8, 30)
+    current = Lesson("语文", at(8), at(8, 45))
+    assert describe(None, None, now) == "近期无课"
+    assert describe(current, Lesson("数学", at(8, 55), at(9, 40)), now) == "语文 至08:45 | 下节 数学 08:55"
+    assert describe(None, Lesson("英语", at(8, day=date(2026, 10, 20)), at(9)), now) == "下节 英语 明天 08:00"
+    assert describe(None, Lesson("英语", at(8, day=date(2026, 10, 21)), at(9)), now) == "下节 英语 周三 08:00"
+
+class FakeDatetime(datetime):
+    """可以拨动的datetime.now()"""
+    current = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+@pytest.fixture
+def clock(qapp, tmp_path, monkeypatch):
+    monkeypatch.setattr(timetable_module, "datetime", FakeDatetime)
+    monkeypatch.setattr(FakeDatetime, "current", at(8, 30))
+    path = tmp_path / "timetable.json"
+    path.write_text(json.dumps({"weekly": WEEKLY}), encoding="utf-8")
+    clock = TimetableClock(str(path))
+    yield clock
+    clock.timer.stop()
+
+def test_clock_wakes_only_at_transitions(clock):
+    changes = []
+    clock.changed.connect(lambda current, following: changes.append((current and current.name, following.name)))
+    clock.reload()
+    assert changes == [("语文", "数学")]
+    assert clock.timer.interval() == 15 * 60 * 1000 + 1  # 08:45下课时再唤醒
+    FakeDatetime.current = at(8, 45)
+    clock.fire()
+    assert changes[-1] == (None, "数学")
+    assert clock.timer.interval() == 10 * 60 * 1000 + 1
+    clock.fire()  # 没有变化时不重复通知
+    assert len(changes) == 2